@@ -0,0 +1,149 @@
+"""
+Bot startup (BotActions.create_jobs) against a synthetic database,
+reports wall time and peak python memory.
+
+python -m benchmarks.bench_create_jobs [subscriptions]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Optional, Union
+
+from sqlalchemy import delete, insert
+
+import config
+from benchmarks.bench_seed import synthetic_week
+from src.sql.async_sql_service import flush
+from src.sql.models import Base
+from src.sql.models.scheduled_reminder import ScheduledReminder
+from src.sql.models.subscription import Subscription
+from src.sql.models.user import User
+from src.sql.sql_service import (
+    DayRepo,
+    GroupRepo,
+    ScheduleRepo,
+    SqlService,
+    ZoneRepo,
+)
+from src.tg.bot_actions import BotActions
+
+GROUPS = 6
+
+
+class CountingJobQueue:
+    def __init__(self) -> None:
+        self.jobs = 0
+
+    def run_once(
+        self,
+        callback: Any,
+        when: Union[float, datetime],
+        data: Any = None,
+        name: Optional[str] = None,
+        chat_id: Optional[Union[int, str]] = None,
+    ) -> None:
+        self.jobs += 1
+
+    def run_repeating(self, callback: Any, interval: Any, **kwargs: Any) -> None:
+        pass
+
+
+class BenchApplication:
+    def __init__(self) -> None:
+        self.job_queue = CountingJobQueue()
+
+
+def create_db(subscriptions: int) -> None:
+    Base.metadata.create_all(config.get_engine())
+    with config.get_session_maker()() as session:
+        for day_name in config.DAYS_OF_WEEK:
+            DayRepo(session).add(day_name)
+        for zone in config.ZONES:
+            ZoneRepo(session).add(zone)
+        groups = []
+        for i in range(GROUPS):
+            group = GroupRepo(session).add(f"group{i + 1}", custom=False)
+            ScheduleRepo(session).replace_group_schedule(group, synthetic_week(i))
+            groups.append(group.group_id)
+        users = subscriptions // 2
+        session.execute(
+            insert(User),
+            [
+                {
+                    "tg_id": str(tg_id),
+                    "show_help": False,
+                    "remind_before": config.NOTIFY_BEFORE_OPTIONS[
+                        tg_id % len(config.NOTIFY_BEFORE_OPTIONS)
+                    ],
+                    "suppress_night": tg_id % 3 == 0,
+                }
+                for tg_id in range(users)
+            ],
+        )
+        session.execute(
+            insert(Subscription),
+            [
+                {
+                    "user_tg_id": str(i % users),
+                    "group_id": groups[(i % users + i // users) % GROUPS],
+                }
+                for i in range(subscriptions)
+            ],
+        )
+        session.commit()
+
+
+def per_subscription(actions: BotActions) -> None:
+    """startup before reminders were bucketed"""
+    for sub in SqlService.get_all_subs():
+        remind_obj = actions.next_remind(
+            actions.schedule_cache.get(sub.group.group_name),
+            sub.user.remind_before,
+            sub.user.suppress_night,
+        )
+        actions.run_notification_job(sub.user.tg_id, remind_obj)
+
+
+def bucketed(actions: BotActions) -> None:
+    actions.create_jobs()
+
+
+def clear_reminders() -> None:
+    flush()
+    with config.get_session_maker()() as session:
+        session.execute(delete(ScheduledReminder))
+        session.commit()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BLACKOUT_DB"] = os.path.join(tmp, "bench.db")
+        config.dispose_engines()
+        create_db(n)
+        for name, start in [
+            ("per subscription", per_subscription),
+            ("bucketed", bucketed),
+            ("restart", bucketed),
+        ]:
+            if name != "restart":
+                clear_reminders()
+            app = BenchApplication()
+            actions = BotActions(app)  # type: ignore[arg-type]
+            actions.schedule_cache.get("group1")
+            tracemalloc.start()
+            started = time.perf_counter()
+            start(actions)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{name:<18} {app.job_queue.jobs} jobs in {elapsed:7.2f} s, "
+                f"peak memory {peak / 1024 / 1024:7.1f} MiB"
+            )
+        flush()
+        config.dispose_engines()
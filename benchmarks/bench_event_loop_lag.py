@@ -0,0 +1,60 @@
+"""
+Event loop lag while a burst of "Today schedule" presses hits the database,
+blocking SqlService calls vs AsyncSqlService.
+
+BLACKOUT_DB=blackout-test.db python -m benchmarks.bench_event_loop_lag
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from src.sql.async_sql_service import AsyncSqlService
+from src.sql.sql_service import SqlService
+
+UPDATES = 300
+TICK = 0.005
+DAY = "Monday"
+GROUP = "group5"
+
+
+async def blocking_update() -> None:
+    SqlService.get_schedule_for(DAY, GROUP)
+
+
+async def async_update() -> None:
+    await AsyncSqlService.get_schedule_for(DAY, GROUP)
+
+
+async def measure_lag(update: Callable[[], Awaitable[None]]) -> tuple[float, float]:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK)
+    started = time.perf_counter()
+    await asyncio.gather(*(update() for _ in range(UPDATES)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    return max(lags) * 1000, elapsed
+
+
+async def main() -> None:
+    SqlService.get_schedule_for(DAY, GROUP)
+    for name, update in [("blocking", blocking_update), ("async", async_update)]:
+        max_lag, elapsed = await measure_lag(update)
+        print(
+            f"{name:<10} {UPDATES} updates in {elapsed * 1000:8.1f} ms, "
+            f"max loop lag {max_lag:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
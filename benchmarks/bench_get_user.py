@@ -0,0 +1,39 @@
+"""
+Per-call overhead of SqlService.get_user with a new engine per call
+(old behaviour) and with the shared pooled engine.
+
+BLACKOUT_DB=blackout-test.db python -m benchmarks.bench_get_user
+"""
+
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import config
+from src.sql.sql_service import SqlService, UsersRepo
+
+TG_ID = 12345
+CALLS = 500
+
+
+def get_user_new_engine() -> None:
+    session_maker = sessionmaker(
+        bind=create_engine(config.get_db_url()), expire_on_commit=False
+    )
+    with session_maker() as session:
+        UsersRepo(session).get_user(TG_ID)
+
+
+def get_user_shared_engine() -> None:
+    SqlService.get_user(TG_ID)
+
+
+if __name__ == "__main__":
+    SqlService.get_user(TG_ID)
+    for name, func in [
+        ("new engine per call", get_user_new_engine),
+        ("shared engine", get_user_shared_engine),
+    ]:
+        total = timeit.timeit(func, number=CALLS)
+        print(f"{name:<20} {total / CALLS * 1e6:10.1f} us/call")
@@ -0,0 +1,51 @@
+"""
+Cost of metrics collection in the hot paths: counter and histogram
+updates, and SqlService.get_user with and without the statement timing
+events on the engine, best of REPEAT runs.
+
+BLACKOUT_DB=blackout-test.db python -m benchmarks.bench_metrics
+"""
+
+import timeit
+from functools import partial
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import config
+from src.metrics import Counter, Histogram, instrument_engine
+from src.sql.sql_service import UsersRepo
+
+TG_ID = 12345
+CALLS = 100_000
+QUERIES = 1000
+REPEAT = 5
+
+
+def get_user_with(session_maker: sessionmaker) -> None:
+    with session_maker() as session:
+        UsersRepo(session).get_user(TG_ID)
+
+
+if __name__ == "__main__":
+    counter = Counter("bench_total", "bench")
+    histogram = Histogram("bench_seconds", "bench", ("command",))
+    for name, func in [
+        ("Counter.inc", lambda: counter.inc()),
+        ("Histogram.observe", lambda: histogram.observe(0.02, "status")),
+    ]:
+        total = min(timeit.repeat(func, number=CALLS, repeat=REPEAT))
+        print(f"{name:<20} {total / CALLS * 1e9:10.1f} ns/call")
+
+    plain = create_engine(config.get_db_url())
+    timed = create_engine(config.get_db_url())
+    instrument_engine(timed)
+    for name, engine in [("get_user", plain), ("get_user timed", timed)]:
+        session_maker = sessionmaker(bind=engine, expire_on_commit=False)
+        get_user_with(session_maker)
+        total = min(
+            timeit.repeat(
+                partial(get_user_with, session_maker), number=QUERIES, repeat=REPEAT
+            )
+        )
+        print(f"{name:<20} {total / QUERIES * 1e6:10.1f} us/call")
@@ -0,0 +1,179 @@
+"""
+Group image reader: table detection, cell cropping and cell classification
+timed separately for every image in resources/, and the classified grid
+of every classifier checked against the golden CSVs in benchmarks/golden.
+Exits with 1 when any cell differs from its golden table.
+
+python -m benchmarks.bench_reader [--repeat N] [--json results.json]
+python -m benchmarks.bench_reader --update-golden
+"""
+
+import csv
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from importlib.metadata import version as package_version
+from typing import Any
+
+import cv2
+
+import config
+from src.group_reader.read_group import (
+    GRID_CLASSIFIER,
+    KMEANS_CLASSIFIER,
+    ReadDtekGroup,
+)
+
+RESOURCES = pathlib.Path(config.BASE_PATH, "resources")
+GOLDEN = pathlib.Path(__file__).parent.joinpath("golden")
+CLASSIFIERS = [KMEANS_CLASSIFIER, GRID_CLASSIFIER]
+
+
+def golden_path(image: pathlib.Path) -> pathlib.Path:
+    return GOLDEN.joinpath(f"{image.stem}.csv")
+
+
+def read_golden(image: pathlib.Path) -> list[list[str]]:
+    with open(golden_path(image), encoding="UTF-8") as csvfile:
+        rows = list(csv.reader(csvfile))
+    # first row is the hour header, same layout as ReadDtekGroup.save_to_csv
+    return rows[1:]
+
+
+def write_golden(image: pathlib.Path, table: list[list[str]]) -> None:
+    GOLDEN.mkdir(exist_ok=True)
+    with open(golden_path(image), mode="w", encoding="UTF-8", newline="") as csvfile:
+        write = csv.writer(csvfile)
+        write.writerow(range(0, 24))
+        write.writerows(table)
+
+
+def mismatches(
+    table: list[list[str]], golden: list[list[str]]
+) -> list[tuple[int, int, str, str]]:
+    """
+    (day, hour, read, golden) of every differing cell, a missing day or
+    hour counts as read "-"
+    """
+    cells = []
+    for day in range(max(len(table), len(golden))):
+        read_day = table[day] if day < len(table) else []
+        golden_day = golden[day] if day < len(golden) else []
+        for hour in range(max(len(read_day), len(golden_day))):
+            read = read_day[hour] if hour < len(read_day) else "-"
+            expected = golden_day[hour] if hour < len(golden_day) else "-"
+            if read != expected:
+                cells.append((day, hour, read, expected))
+    return cells
+
+
+def timed(func: Any, *args: Any) -> tuple[Any, float]:
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def classify(reader: ReadDtekGroup, cells: Any) -> list[list[str]]:
+    return reader.classify_cells(reader.cell_colours(cells))
+
+
+def bench_image(image: pathlib.Path, repeat: int) -> list[dict[str, Any]]:
+    """
+    One result per classifier, stage times are medians over repeat runs.
+    Detection does not depend on the classifier and is shared
+    """
+    detect_times = []
+    crop_times: dict[str, list[float]] = {name: [] for name in CLASSIFIERS}
+    classify_times: dict[str, list[float]] = {name: [] for name in CLASSIFIERS}
+    tables: dict[str, list[list[str]]] = {}
+    for _ in range(repeat):
+        reader = ReadDtekGroup(str(image))
+        _, elapsed = timed(reader.detect)
+        detect_times.append(elapsed)
+        reader.read_cells()
+        for name in CLASSIFIERS:
+            classifier = ReadDtekGroup(str(image), classifier=name)
+            classifier.cells = reader.cells
+            cells, elapsed = timed(classifier.crop_cells)
+            crop_times[name].append(elapsed)
+            tables[name], elapsed = timed(classify, classifier, cells)
+            classify_times[name].append(elapsed)
+    golden = read_golden(image) if golden_path(image).is_file() else None
+    results = []
+    for name in CLASSIFIERS:
+        diff = mismatches(tables[name], golden) if golden is not None else None
+        results.append(
+            {
+                "image": image.name,
+                "classifier": name,
+                "detect_ms": statistics.median(detect_times) * 1000,
+                "crop_ms": statistics.median(crop_times[name]) * 1000,
+                "classify_ms": statistics.median(classify_times[name]) * 1000,
+                "cells": sum(len(day) for day in tables[name]),
+                "mismatches": None if diff is None else len(diff),
+                "diff": diff,
+                "table": tables[name],
+            }
+        )
+    return results
+
+
+def run(repeat: int) -> dict[str, Any]:
+    images = sorted(RESOURCES.glob("group*.jpg"))
+    return {
+        "timestamp": datetime.now(config.tz).isoformat(),
+        "python": platform.python_version(),
+        "img2table": package_version("img2table"),
+        "opencv": cv2.__version__,
+        "repeat": repeat,
+        "results": [
+            result for image in images for result in bench_image(image, repeat)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    repeat = 1
+    json_path = None
+    if "--repeat" in argv:
+        i = argv.index("--repeat")
+        repeat = int(argv[i + 1])
+        del argv[i : i + 2]
+    if "--json" in argv:
+        i = argv.index("--json")
+        json_path = argv[i + 1]
+        del argv[i : i + 2]
+
+    report = run(repeat)
+    if "--update-golden" in argv:
+        # the k-means reader is the reference the golden tables come from
+        for result in report["results"]:
+            if result["classifier"] == KMEANS_CLASSIFIER:
+                write_golden(RESOURCES.joinpath(result["image"]), result["table"])
+                print(f"wrote {golden_path(RESOURCES.joinpath(result['image']))}")
+        sys.exit(0)
+
+    print(
+        f"{'image':<11} {'classifier':<10} {'detect ms':>10} {'crop ms':>9} "
+        f"{'classify ms':>12} {'mismatches':>11}"
+    )
+    for result in report["results"]:
+        diff = "no golden" if result["mismatches"] is None else result["mismatches"]
+        print(
+            f"{result['image']:<11} {result['classifier']:<10} "
+            f"{result['detect_ms']:>10.1f} {result['crop_ms']:>9.2f} "
+            f"{result['classify_ms']:>12.2f} {diff:>11}"
+        )
+        for day, hour, read, expected in result["diff"] or []:
+            print(f"    day {day} hour {hour}: {read}, golden {expected}")
+    if json_path is not None:
+        for result in report["results"]:
+            del result["table"]
+        with open(json_path, mode="w", encoding="UTF-8") as output:
+            json.dump(report, output, indent=2)
+    sys.exit(1 if any(result["mismatches"] for result in report["results"]) else 0)
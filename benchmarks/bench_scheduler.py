@@ -0,0 +1,150 @@
+"""
+Reminder scheduler backends: insert, cancel (10%) and fire throughput
+and resident memory for N reminders. Each case runs in a fresh process
+so ru_maxrss belongs to that case only. The APScheduler backend is
+skipped above --jobqueue-max reminders, it needs minutes at 1M.
+
+python -m benchmarks.bench_scheduler [sizes] [--jobqueue-max N]
+python -m benchmarks.bench_scheduler 10000,100000 --jobqueue-max 10000
+"""
+
+import asyncio
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from telegram.ext import Application
+
+import config
+from src.sql.remind_obj import RemindObj
+from src.tg.reminder_scheduler import (
+    HEAP_BACKEND,
+    JOBQUEUE_BACKEND,
+    make_scheduler,
+)
+
+CANCEL_SHARE = 10
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def remind_obj(now: datetime, i: int) -> RemindObj:
+    change_time = now + timedelta(minutes=15 + i % (7 * 24 * 60))
+    return RemindObj(
+        group=f"group{i % 60}",
+        old_zone="white",
+        new_zone="black",
+        change_time=change_time,
+        remind_time=change_time - timedelta(minutes=15),
+        notify_now=False,
+    )
+
+
+async def run_case(backend: str, n: int) -> dict[str, Any]:
+    app = Application.builder().token("123:bench").build()
+    job_queue = app.job_queue
+    assert job_queue is not None
+    scheduler = make_scheduler(app, backend)
+    now = datetime.now(config.tz)
+    payloads = [remind_obj(now, i) for i in range(n)]
+    fired = 0
+    done = asyncio.Event()
+
+    async def callback(context: Any) -> None:
+        nonlocal fired
+        fired += 1
+        if fired == n:
+            done.set()
+
+    base_rss = rss_mb()
+    started = time.perf_counter()
+    handles = [
+        scheduler.run_once(
+            callback, when=payload.remind_time, data=payload, name=str(i), chat_id=i
+        )
+        for i, payload in enumerate(payloads)
+    ]
+    insert = time.perf_counter() - started
+    rss = rss_mb() - base_rss
+
+    cancelled = random.Random(n).sample(handles, n // CANCEL_SHARE)
+    started = time.perf_counter()
+    for handle in cancelled:
+        handle.schedule_removal()
+    cancel = time.perf_counter() - started
+    del handles, cancelled
+
+    # fire: a second scheduler with everything already due
+    if backend == JOBQUEUE_BACKEND:
+        for job in job_queue.jobs():
+            job.schedule_removal()
+    scheduler = make_scheduler(app, backend)
+    for payload in payloads:
+        if backend == JOBQUEUE_BACKEND:
+            job_queue.run_once(
+                callback,
+                when=0,
+                data=payload,
+                job_kwargs={"misfire_grace_time": None},
+            )
+        else:
+            scheduler.run_once(callback, when=0, data=payload)
+    started = time.perf_counter()
+    if backend == JOBQUEUE_BACKEND:
+        await job_queue.start()
+    else:
+        scheduler.start()
+    await done.wait()
+    fire = time.perf_counter() - started
+    if backend == JOBQUEUE_BACKEND:
+        await job_queue.stop()
+    else:
+        await scheduler.stop()
+    return {
+        "backend": backend,
+        "n": n,
+        "insert_per_s": n / insert,
+        "cancel_per_s": (n // CANCEL_SHARE) / cancel,
+        "fire_per_s": n / fire,
+        "rss_mb": rss,
+    }
+
+
+def case(args: tuple[str, int]) -> dict[str, Any]:
+    return asyncio.run(run_case(*args))
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    jobqueue_max = 100_000
+    if "--jobqueue-max" in argv:
+        i = argv.index("--jobqueue-max")
+        jobqueue_max = int(argv[i + 1])
+        del argv[i : i + 2]
+    sizes = [
+        int(size) for size in (argv[0] if argv else "10000,100000,1000000").split(",")
+    ]
+    cases = [
+        (backend, n)
+        for n in sizes
+        for backend in (JOBQUEUE_BACKEND, HEAP_BACKEND)
+        if backend == HEAP_BACKEND or n <= jobqueue_max
+    ]
+    print(
+        f"{'backend':<9} {'n':>9} {'insert/s':>11} {'cancel/s':>11} "
+        f"{'fire/s':>11} {'rss MB':>8}"
+    )
+    for args in cases:
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            result = pool.apply(case, (args,))
+        print(
+            f"{result['backend']:<9} {result['n']:>9} "
+            f"{result['insert_per_s']:>11.0f} {result['cancel_per_s']:>11.0f} "
+            f"{result['fire_per_s']:>11.0f} {result['rss_mb']:>8.1f}"
+        )
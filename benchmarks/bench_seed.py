@@ -0,0 +1,72 @@
+"""
+Seeding N synthetic groups into an empty database, one commit per hour
+(HourRepo.add) vs ScheduleRepo.replace_group_schedule.
+
+python -m benchmarks.bench_seed [groups]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+import config
+from src.sql.models import Base
+from src.sql.models.group import Group
+from src.sql.sql_service import DayRepo, GroupRepo, HourRepo, ScheduleRepo, ZoneRepo
+
+
+def synthetic_week(seed: int) -> list[list[str]]:
+    return [
+        [
+            config.ZONES[(seed + day + hour // 3) % len(config.ZONES)]
+            for hour in range(24)
+        ]
+        for day in range(7)
+    ]
+
+
+def per_cell(session: Session, group: Group, table: list[list[str]]) -> None:
+    for day_index, row in enumerate(table):
+        day = DayRepo(session).get(day_index + 1)
+        for hour, zone_name in enumerate(row):
+            zone = ZoneRepo(session).get_zone(zone_name)
+            HourRepo(session).add(hour, zone, day, group)
+
+
+def bulk(session: Session, group: Group, table: list[list[str]]) -> None:
+    ScheduleRepo(session).replace_group_schedule(group, table)
+
+
+def seed(
+    groups: int, write_week: Callable[[Session, Group, list[list[str]]], None]
+) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BLACKOUT_DB"] = os.path.join(tmp, "bench.db")
+        config.dispose_engines()
+        Base.metadata.create_all(config.get_engine())
+        with config.get_session_maker()() as session:
+            for day_name in config.DAYS_OF_WEEK:
+                DayRepo(session).add(day_name)
+            for zone in config.ZONES:
+                ZoneRepo(session).add(zone)
+            started = time.perf_counter()
+            for i in range(groups):
+                group = GroupRepo(session).add(f"group{i}", custom=False)
+                write_week(session, group, synthetic_week(i))
+            elapsed = time.perf_counter() - started
+        config.dispose_engines()
+    return elapsed
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for name, write_week in [("per cell", per_cell), ("bulk", bulk)]:
+        elapsed = seed(n, write_week)
+        print(
+            f"{name:<10} {n} groups in {elapsed:8.3f} s "
+            f"({elapsed / n * 1000:.1f} ms/group)"
+        )
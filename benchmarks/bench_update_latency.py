@@ -0,0 +1,190 @@
+"""
+Update-to-reply latency of /start in polling and webhook mode, against a
+local fake Bot API served by src.rest.server. Polling: the fake API answers
+the pending getUpdates long poll. Webhook: the fake API posts the update
+to the bot's HTTP server. Latency ends when the bot's sendMessage arrives.
+
+python -m benchmarks.bench_update_latency [updates]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from typing import Any, Optional
+
+import httpx
+from telegram.ext import Application, CommandHandler
+
+from src.rest.hello import make_server
+from src.rest.server import HttpServer, Request, Response
+from src.tg.message_sender import MessageSender
+from src.tg.outage_bot import OutageBot
+from src.tg.webhook import SECRET_HEADER, WEBHOOK_PATH, webhook_handler
+
+TOKEN = "123:bench"
+SECRET = "bench-secret"
+HOST = "127.0.0.1"
+
+
+def start_update(update_id: int) -> dict[str, Any]:
+    # a new chat per update keeps MessageSender's per chat limit out of it
+    user = {"id": 1000 + update_id, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private", "first_name": "Bench"},
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+class FakeBotApi:
+    """
+    The Bot API methods the bench needs: getMe, deleteWebhook, setWebhook,
+    getUpdates (long poll) and sendMessage
+    """
+
+    def __init__(self) -> None:
+        self.server = HttpServer()
+        self.updates: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.reply: Optional[asyncio.Future] = None
+        methods = {
+            "getMe": self.get_me,
+            "deleteWebhook": self.ok,
+            "setWebhook": self.ok,
+            "getUpdates": self.get_updates,
+            "sendMessage": self.send_message,
+        }
+        for name, handler in methods.items():
+            self.server.route("POST", f"/bot{TOKEN}/{name}", handler)
+
+    async def ok(self, request: Request) -> Response:
+        return Response.json({"ok": True, "result": True})
+
+    async def get_me(self, request: Request) -> Response:
+        return Response.json(
+            {
+                "ok": True,
+                "result": {
+                    "id": 123,
+                    "is_bot": True,
+                    "first_name": "bench",
+                    "username": "bench_bot",
+                },
+            }
+        )
+
+    async def get_updates(self, request: Request) -> Response:
+        timeout = float(request.form().get("timeout", "0"))
+        updates = []
+        try:
+            updates.append(await asyncio.wait_for(self.updates.get(), timeout))
+        except asyncio.TimeoutError:
+            pass
+        while not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return Response.json({"ok": True, "result": updates})
+
+    async def send_message(self, request: Request) -> Response:
+        form = request.form()
+        if self.reply is not None and not self.reply.done():
+            self.reply.set_result(time.perf_counter())
+        return Response.json(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": 1,
+                    "date": int(time.time()),
+                    "chat": {"id": int(form["chat_id"]), "type": "private"},
+                    "text": form["text"],
+                },
+            }
+        )
+
+    def expect_reply(self) -> asyncio.Future:
+        self.reply = asyncio.get_running_loop().create_future()
+        return self.reply
+
+
+def build_app(api_port: int) -> Application:
+    app = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(f"http://{HOST}:{api_port}/bot")
+        .build()
+    )
+    outage_bot = OutageBot(app)
+    outage_bot.actions.sender = MessageSender(global_rate=1e6, chat_rate=1e6)
+    app.add_handler(CommandHandler("start", outage_bot.start_handler))
+    return app
+
+
+async def measure(api: FakeBotApi, deliver: Any, n: int) -> list[float]:
+    latencies = []
+    for update_id in range(1, n + 1):
+        reply = api.expect_reply()
+        started = time.perf_counter()
+        await deliver(start_update(update_id))
+        latencies.append(await asyncio.wait_for(reply, 10) - started)
+    return latencies
+
+
+async def polling(api: FakeBotApi, api_port: int, n: int) -> list[float]:
+    app = build_app(api_port)
+    updater = app.updater
+    assert updater is not None
+    await app.initialize()
+    await updater.start_polling(poll_interval=0, timeout=10)
+    await app.start()
+    try:
+        return await measure(api, api.updates.put, n)
+    finally:
+        await updater.stop()
+        await app.stop()
+        await app.shutdown()
+
+
+async def webhook(api: FakeBotApi, api_port: int, n: int) -> list[float]:
+    app = build_app(api_port)
+    server = make_server()
+    server.route("POST", WEBHOOK_PATH, webhook_handler(app, SECRET))
+    await app.initialize()
+    await app.start()
+    port = await server.start(HOST, 0)
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{port}") as telegram:
+
+        async def post(update: dict[str, Any]) -> None:
+            response = await telegram.post(
+                WEBHOOK_PATH, json=update, headers={SECRET_HEADER: SECRET}
+            )
+            response.raise_for_status()
+
+        try:
+            return await measure(api, post, n)
+        finally:
+            await server.stop()
+            await app.stop()
+            await app.shutdown()
+
+
+async def main(n: int) -> None:
+    api = FakeBotApi()
+    api_port = await api.server.start(HOST, 0)
+    print(f"{'mode':<8} {'n':>5} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, mode in [("polling", polling), ("webhook", webhook)]:
+        latencies = sorted(await mode(api, api_port, n))
+        print(
+            f"{name:<8} {n:>5} {statistics.mean(latencies) * 1000:>8.2f} "
+            f"{latencies[len(latencies) // 2] * 1000:>8.2f} "
+            f"{latencies[int(len(latencies) * 0.95)] * 1000:>8.2f}"
+        )
+    await api.server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -1,27 +1,116 @@
 import os
 import pathlib
+import threading
+from datetime import timedelta
+from typing import Any
 
 import pytz
-from sqlalchemy import create_engine, Engine
+from sqlalchemy import create_engine, Engine, event
 from sqlalchemy.orm import sessionmaker, Session
 
+from src.metrics import instrument_engine, instrument_sessions
+
 BLACK_ZONE = "black"
 GREY_ZONE = "grey"
 WHITE_ZONE = "white"
 ZONES = [BLACK_ZONE, GREY_ZONE, WHITE_ZONE]
 UNDEFINED_ZONE = "und"
+DAYS_OF_WEEK = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
 DEFAULT_NOTIF = 15
 NOTIFY_BEFORE_OPTIONS = [5, DEFAULT_NOTIF, 20, 30]
 SILENT_PERIOD_START = 23
 SILENT_PERIOD_STOP = 8
+# one notification job per group and notify option instead of per subscriber
+FANOUT_NOTIFICATIONS = os.environ.get("BLACKOUT_FANOUT", "0") == "1"
+# reminders are loaded from scheduled_reminders when due within this horizon
+REMINDER_HORIZON = timedelta(hours=2)
+# "jobqueue" (one APScheduler job per reminder) or "heap"
+SCHEDULER_BACKEND = os.environ.get("BLACKOUT_SCHEDULER", "jobqueue")
+# processes parsing schedule images in seed_groups
+SEED_WORKERS = int(os.environ.get("BLACKOUT_SEED_WORKERS", os.cpu_count() or 1))
 BASE_PATH = pathlib.Path(__file__).parent.absolute()
+# img2table extraction results keyed by image content
+READER_CACHE_DIR = os.environ.get(
+    "BLACKOUT_READER_CACHE", str(BASE_PATH.joinpath(".cache", "tables"))
+)
+# public https base url of the bot, set - webhook mode, unset - polling
+WEBHOOK_URL = os.environ.get("BLACKOUT_WEBHOOK_URL")
+# required in webhook mode, Telegram sends it with every update
+WEBHOOK_SECRET = os.environ.get("BLACKOUT_WEBHOOK_SECRET")
+# in-process http server (health check, webhook), 0 - off in polling mode
+HTTP_HOST = os.environ.get("BLACKOUT_HTTP_HOST", "0.0.0.0")
+HTTP_PORT = int(os.environ.get("PORT", "0"))
+# handler calls taking longer are logged with their SQL statement count
+SLOW_UPDATE_SECONDS = float(os.environ.get("BLACKOUT_SLOW_UPDATE", "0.5"))
 tz = pytz.timezone("Europe/Kyiv")
 
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 64 * 1024 * 1024,
+}
 
-def get_engine() -> Engine:
+_engines: dict[str, Engine] = {}
+_session_makers: dict[str, sessionmaker[Session]] = {}
+_engine_lock = threading.Lock()
+
+
+def get_db_url() -> str:
     dbname = os.environ.get("BLACKOUT_DB", "blackout.db")
-    return create_engine(f"sqlite:///{BASE_PATH.joinpath(dbname)}")
+    return f"sqlite:///{BASE_PATH.joinpath(dbname)}"
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+def get_engine() -> Engine:
+    """
+    Engine for the current BLACKOUT_DB, created on first use and shared
+    by every session afterwards
+    """
+    url = get_db_url()
+    engine = _engines.get(url)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = create_engine(url)
+                event.listen(engine, "connect", _set_sqlite_pragmas)
+                instrument_engine(engine)
+                _engines[url] = engine
+    return engine
 
 
 def get_session_maker() -> sessionmaker[Session]:
-    return sessionmaker(bind=get_engine(), expire_on_commit=False)
+    url = get_db_url()
+    session_maker = _session_makers.get(url)
+    if session_maker is None:
+        session_maker = sessionmaker(bind=get_engine(), expire_on_commit=False)
+        instrument_sessions(session_maker)
+        _session_makers[url] = session_maker
+    return session_maker
+
+
+def dispose_engines() -> None:
+    """
+    Close pooled connections and forget cached engines, next call to
+    get_engine() builds a new one for the current BLACKOUT_DB
+    """
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_makers.clear()
@@ -6,18 +6,13 @@ create_venv() {
   pip install -r requirements.txt -U
 }
 
-run_flask() {
-  python3 run_flask.py &
-}
-
 
 if [ "$1" == "venv" ]; then
     create_venv
 fi
 
-if [ "$2" == "flask" ]; then
-    run_flask
-fi
+# $2 is kept for compatibility, the health check is served by the bot
+# itself when PORT is set
 
 if [ "$3" == "replicate" ]; then
     ./replicate.sh
@@ -1,16 +1,35 @@
 import logging
+import multiprocessing
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 
+from sqlalchemy import inspect
 
-from config import get_session_maker, ZONES
-from src.group_reader.read_group import ReadDtekGroup
+from config import (
+    get_engine,
+    get_session_maker,
+    ZONES,
+    DAYS_OF_WEEK,
+    SEED_WORKERS,
+    READER_CACHE_DIR,
+)
+from src.group_reader.read_group import GRID_CLASSIFIER, ReadDtekGroup
 from src.sql.models.day import Day
 from src.sql.models.group import Group
 from src.sql.models.hour import Hour
+from src.sql.models.scheduled_reminder import ScheduledReminder
 from src.sql.models.subscription import Subscription
 from src.sql.models.user import User
 from src.sql.models.zone import Zone
-from src.sql.sql_service import DayRepo, ZoneRepo, GroupRepo, HourRepo
+from src.sql.models.zone_segment import ZoneSegment
+from src.sql.sql_service import (
+    DayRepo,
+    ZoneRepo,
+    GroupRepo,
+    ScheduleRepo,
+    SqlService,
+)
 
 RESOURCES = "resources"
 
@@ -19,21 +38,44 @@ logging.basicConfig(
 )
 
 
-def seed_groups() -> None:
-    days_of_week = [
-        "Monday",
-        "Tuesday",
-        "Wednesday",
-        "Thursday",
-        "Friday",
-        "Saturday",
-        "Sunday",
-    ]
+def read_group_table(path: str) -> list[list[str]]:
+    rg = ReadDtekGroup(path, classifier=GRID_CLASSIFIER, cache_dir=READER_CACHE_DIR)
+    rg.extract()
+    return rg.outage_table
+
+
+def read_group_tables(
+    files: list[pathlib.Path], workers: int
+) -> Iterator[tuple[pathlib.Path, list[list[str]]]]:
+    """
+    Parse images in a process pool, tables come back in the order of files
+    """
+    if workers <= 1 or len(files) <= 1:
+        for file in files:
+            yield file, read_group_table(str(file))
+        return
+    # spawn, forking a process that runs sql threads can deadlock the child
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(files)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        yield from zip(files, pool.map(read_group_table, map(str, files)))
+
+
+def existing_tables() -> set[str]:
+    return set(inspect(get_engine()).get_table_names())
+
+
+def seed_groups(workers: int = SEED_WORKERS) -> None:
+    """
+    Fill an empty database with the head schema, the seed revision writes
+    the initial schema on its own
+    """
     session_maker = get_session_maker()
     with session_maker() as session:
         day_serv = DayRepo(session)
         # Insert days into Days table
-        for day_name in days_of_week:
+        for day_name in DAYS_OF_WEEK:
             day_serv.add(day_name)
 
         zone_serv = ZoneRepo(session)
@@ -44,33 +86,50 @@ def seed_groups() -> None:
         group_serv = GroupRepo(session)
         # Insert groups into Groups table
 
-        files = [f for f in pathlib.Path(RESOURCES).iterdir() if f.is_file()]
-        for file in files:
+        files = sorted(f for f in pathlib.Path(RESOURCES).iterdir() if f.is_file())
+        for file, outage_table in read_group_tables(files, workers):
             group_serv.add(file.stem, custom=False)
             group = group_serv.get_group(file.stem)
-            rg = ReadDtekGroup(str(file))
-            rg.extract()
-            hour_serv = HourRepo(session)
-            for day_index, row in enumerate(rg.outage_table):
-                logging.info(f"adding {day_index} {row}")
-                day_id = day_index + 1  # Day IDs start from 1 to 7
-                day = day_serv.get(day_id)
-                for hour, zone_name in enumerate(row):
-                    zone = zone_serv.get_zone(zone_name)
-                    hour_serv.add(hour, zone, day, group)
+            logging.info(f"adding {file.stem} {outage_table}")
+            ScheduleRepo(session).write_version(group, outage_table)
 
         session.commit()
 
 
+def update_groups(
+    files: list[pathlib.Path], workers: int = SEED_WORKERS
+) -> dict[str, list[tuple[int, int]]]:
+    """
+    Read new images of existing groups and store every changed week as a
+    full new schedule version, users and subscriptions are kept
+    :return: group name -> changed [start, stop) ranges in hours of the week
+    """
+    changed = {}
+    for file, outage_table in read_group_tables(sorted(files), workers):
+        changed[file.stem] = SqlService.update_group_schedule(file.stem, outage_table)
+        logging.info(f"updated {file.stem}, changed hours {changed[file.stem]}")
+    return changed
+
+
 def delete_groups() -> None:
+    """
+    Empty the seeded tables that exist in the current schema
+    """
+    tables = existing_tables()
     sesh = get_session_maker()
     with sesh() as session:
-        session.query(Hour).delete()
-        session.query(Zone).delete()
-        session.query(Group).delete()
-        session.query(Subscription).delete()
-        session.query(User).delete()
-        session.query(Day).delete()
+        for model in [
+            ScheduledReminder,
+            ZoneSegment,
+            Hour,
+            Zone,
+            Group,
+            Subscription,
+            User,
+            Day,
+        ]:
+            if model.__tablename__ in tables:
+                session.query(model).delete()
         session.commit()
 
 
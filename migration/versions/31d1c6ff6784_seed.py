@@ -6,9 +6,15 @@ Create Date: 2024-07-11 01:19:42.027571
 
 """
 
+import logging
+import pathlib
 from typing import Sequence, Union
 
-from migration.seed import delete_groups, seed_groups
+from alembic import op
+import sqlalchemy as sa
+
+from config import DAYS_OF_WEEK, SEED_WORKERS, ZONES
+from migration.seed import RESOURCES, read_group_tables
 
 # revision identifiers, used by Alembic.
 revision: str = "31d1c6ff6784"
@@ -16,10 +22,64 @@ down_revision: Union[str, None] = "972c34565a6b"
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# tables as the initial revision creates them, the models follow the head
+# schema and can not be used here
+days = sa.table("days", sa.column("day_id"), sa.column("day_name"))
+zones = sa.table("zones", sa.column("zone_id"), sa.column("zone_name"))
+groups = sa.table(
+    "groups", sa.column("group_id"), sa.column("custom"), sa.column("group_name")
+)
+hours = sa.table(
+    "hours",
+    sa.column("hour_id"),
+    sa.column("day_id"),
+    sa.column("hour"),
+    sa.column("zone_id"),
+    sa.column("group_id"),
+)
+users = sa.table("users", sa.column("tg_id"))
+subscriptions = sa.table("subscriptions", sa.column("user_tg_id"))
+
 
 def upgrade() -> None:
-    seed_groups()
+    op.bulk_insert(
+        days,
+        [
+            {"day_id": day_id, "day_name": day_name}
+            for day_id, day_name in enumerate(DAYS_OF_WEEK, start=1)
+        ],
+    )
+    zone_ids = {zone: zone_id for zone_id, zone in enumerate(ZONES, start=1)}
+    op.bulk_insert(
+        zones,
+        [{"zone_id": zone_id, "zone_name": zone} for zone, zone_id in zone_ids.items()],
+    )
+
+    files = sorted(f for f in pathlib.Path(RESOURCES).iterdir() if f.is_file())
+    group_rows = []
+    hour_rows = []
+    tables = read_group_tables(files, SEED_WORKERS)
+    for group_id, (file, outage_table) in enumerate(tables, start=1):
+        logging.info(f"adding {file.stem} {outage_table}")
+        group_rows.append(
+            {"group_id": group_id, "custom": False, "group_name": file.stem}
+        )
+        for day_id, day_row in enumerate(outage_table, start=1):
+            for hour, zone_name in enumerate(day_row):
+                if zone_name not in zone_ids:
+                    raise ValueError(f"Unknown zone {zone_name} in {file.stem}")
+                hour_rows.append(
+                    {
+                        "day_id": day_id,
+                        "hour": hour,
+                        "zone_id": zone_ids[zone_name],
+                        "group_id": group_id,
+                    }
+                )
+    op.bulk_insert(groups, group_rows)
+    op.bulk_insert(hours, hour_rows)
 
 
 def downgrade() -> None:
-    delete_groups()
+    for table in (hours, subscriptions, users, groups, zones, days):
+        op.execute(table.delete())
@@ -0,0 +1,56 @@
+"""lookup_indexes
+
+Revision ID: 5b2f0c7e1a94
+Revises: 90ed171f8ae6
+Create Date: 2026-10-18 12:10:31.402515
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2f0c7e1a94"
+down_revision: Union[str, None] = "90ed171f8ae6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("days", schema=None) as batch_op:
+        batch_op.create_index("ix_days_day_name", ["day_name"], unique=True)
+
+    with op.batch_alter_table("groups", schema=None) as batch_op:
+        batch_op.create_index("ix_groups_group_name", ["group_name"], unique=True)
+
+    with op.batch_alter_table("zones", schema=None) as batch_op:
+        batch_op.create_index("ix_zones_zone_name", ["zone_name"], unique=True)
+
+    with op.batch_alter_table("hours", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_hours_group_day_hour", ["group_id", "day_id", "hour"], unique=True
+        )
+        batch_op.create_index("ix_hours_day_id", ["day_id"], unique=False)
+
+    with op.batch_alter_table("subscriptions", schema=None) as batch_op:
+        batch_op.create_index("ix_subscriptions_group_id", ["group_id"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("subscriptions", schema=None) as batch_op:
+        batch_op.drop_index("ix_subscriptions_group_id")
+
+    with op.batch_alter_table("hours", schema=None) as batch_op:
+        batch_op.drop_index("ix_hours_day_id")
+        batch_op.drop_index("ix_hours_group_day_hour")
+
+    with op.batch_alter_table("zones", schema=None) as batch_op:
+        batch_op.drop_index("ix_zones_zone_name")
+
+    with op.batch_alter_table("groups", schema=None) as batch_op:
+        batch_op.drop_index("ix_groups_group_name")
+
+    with op.batch_alter_table("days", schema=None) as batch_op:
+        batch_op.drop_index("ix_days_day_name")
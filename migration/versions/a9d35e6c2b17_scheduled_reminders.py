@@ -0,0 +1,43 @@
+"""scheduled_reminders
+
+Revision ID: a9d35e6c2b17
+Revises: e71d09b5a3c8
+Create Date: 2026-10-18 15:21:40.873151
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a9d35e6c2b17"
+down_revision: Union[str, None] = "e71d09b5a3c8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduled_reminders",
+        sa.Column("chat_id", sa.String(), nullable=False),
+        sa.Column("group_name", sa.String(), nullable=False),
+        sa.Column("remind_time", sa.DateTime(), nullable=False),
+        sa.Column("change_time", sa.DateTime(), nullable=False),
+        sa.Column("payload", sa.String(), nullable=False),
+        sa.Column("sent", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("chat_id", "group_name"),
+    )
+    with op.batch_alter_table("scheduled_reminders", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_scheduled_reminders_due", ["sent", "remind_time"], unique=False
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("scheduled_reminders", schema=None) as batch_op:
+        batch_op.drop_index("ix_scheduled_reminders_due")
+
+    op.drop_table("scheduled_reminders")
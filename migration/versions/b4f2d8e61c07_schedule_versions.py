@@ -0,0 +1,75 @@
+"""schedule_versions
+
+Revision ID: b4f2d8e61c07
+Revises: a9d35e6c2b17
+Create Date: 2026-10-18 16:05:12.408331
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4f2d8e61c07"
+down_revision: Union[str, None] = "a9d35e6c2b17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("hours", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("version", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.drop_index("ix_hours_group_day_hour")
+        batch_op.create_index(
+            "ix_hours_group_version_day_hour",
+            ["group_id", "version", "day_id", "hour"],
+            unique=True,
+        )
+
+    with op.batch_alter_table("zone_segments", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column("version", sa.Integer(), nullable=False, server_default="0")
+        )
+        batch_op.drop_index("ix_zone_segments_group_day_start")
+        batch_op.create_index(
+            "ix_zone_segments_group_version_day_start",
+            ["group_id", "version", "day_id", "start_hour"],
+            unique=True,
+        )
+
+    # existing schedules become the active version of their group
+    for table in ("hours", "zone_segments"):
+        op.execute(
+            f"UPDATE {table} SET version = (SELECT schedule_revision FROM groups "
+            f"WHERE groups.group_id = {table}.group_id)"
+        )
+
+
+def downgrade() -> None:
+    # keep the active version only, the old unique indexes allow one week
+    for table in ("hours", "zone_segments"):
+        op.execute(
+            f"DELETE FROM {table} WHERE version != (SELECT schedule_revision "
+            f"FROM groups WHERE groups.group_id = {table}.group_id)"
+        )
+
+    with op.batch_alter_table("zone_segments", schema=None) as batch_op:
+        batch_op.drop_index("ix_zone_segments_group_version_day_start")
+        batch_op.create_index(
+            "ix_zone_segments_group_day_start",
+            ["group_id", "day_id", "start_hour"],
+            unique=True,
+        )
+        batch_op.drop_column("version")
+
+    with op.batch_alter_table("hours", schema=None) as batch_op:
+        batch_op.drop_index("ix_hours_group_version_day_hour")
+        batch_op.create_index(
+            "ix_hours_group_day_hour", ["group_id", "day_id", "hour"], unique=True
+        )
+        batch_op.drop_column("version")
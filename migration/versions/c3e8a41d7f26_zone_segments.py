@@ -0,0 +1,83 @@
+"""zone_segments
+
+Revision ID: c3e8a41d7f26
+Revises: 5b2f0c7e1a94
+Create Date: 2026-10-18 13:02:47.118204
+
+"""
+
+from itertools import groupby
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.sql.models.zone_segment import build_segments
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8a41d7f26"
+down_revision: Union[str, None] = "5b2f0c7e1a94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    zone_segments = op.create_table(
+        "zone_segments",
+        sa.Column("segment_id", sa.Integer(), nullable=False),
+        sa.Column("group_id", sa.Integer(), nullable=False),
+        sa.Column("day_id", sa.Integer(), nullable=False),
+        sa.Column("start_hour", sa.Integer(), nullable=False),
+        sa.Column("length", sa.Integer(), nullable=False),
+        sa.Column("zone_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["day_id"],
+            ["days.day_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["group_id"],
+            ["groups.group_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["zone_id"],
+            ["zones.zone_id"],
+        ),
+        sa.PrimaryKeyConstraint("segment_id"),
+    )
+    with op.batch_alter_table("zone_segments", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_zone_segments_group_day_start",
+            ["group_id", "day_id", "start_hour"],
+            unique=True,
+        )
+
+    # backfill from existing hours
+    hours = op.get_bind().execute(
+        sa.text(
+            "SELECT group_id, day_id, hour, zone_id FROM hours "
+            "ORDER BY group_id, day_id, hour"
+        )
+    )
+    rows = []
+    for group_id, group_hours in groupby(hours, key=lambda row: row[0]):
+        for day_id, start_hour, length, zone_id in build_segments(
+            (row[1], row[2], row[3]) for row in group_hours
+        ):
+            rows.append(
+                {
+                    "group_id": group_id,
+                    "day_id": day_id,
+                    "start_hour": start_hour,
+                    "length": length,
+                    "zone_id": zone_id,
+                }
+            )
+    if rows:
+        op.bulk_insert(zone_segments, rows)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("zone_segments", schema=None) as batch_op:
+        batch_op.drop_index("ix_zone_segments_group_day_start")
+
+    op.drop_table("zone_segments")
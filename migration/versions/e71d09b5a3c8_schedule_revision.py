@@ -0,0 +1,36 @@
+"""schedule_revision
+
+Revision ID: e71d09b5a3c8
+Revises: c3e8a41d7f26
+Create Date: 2026-10-18 13:48:05.620913
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e71d09b5a3c8"
+down_revision: Union[str, None] = "c3e8a41d7f26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("groups", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "schedule_revision",
+                sa.Integer(),
+                nullable=False,
+                server_default="0",
+            )
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("groups", schema=None) as batch_op:
+        batch_op.drop_column("schedule_revision")
@@ -1,10 +1,15 @@
 import csv
+import hashlib
+import json
 import logging
 import os
+from importlib.metadata import version as package_version
 from math import sqrt
+from typing import Optional
 
 import cv2
 import numpy as np
+import numpy.typing as npt
 from cv2 import kmeans, TERM_CRITERIA_MAX_ITER, TERM_CRITERIA_EPS, KMEANS_RANDOM_CENTERS
 from img2table.document import Image
 from img2table.tables.objects.extraction import ExtractedTable
@@ -14,6 +19,21 @@ logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(message)s", datefmt="%d-%b-%y %H:%M:%S"
 )
 
+# k-means over the pixels of every cell, one cell at a time
+KMEANS_CLASSIFIER = "kmeans"
+# median colour of all cells at once
+GRID_CLASSIFIER = "grid"
+CELL_TYPES = ["black", "grey", "white"]
+MAX_COLOR_DELTA = 7
+EXTRACT_PARAMS = {
+    "detect_rotation": True,
+    "implicit_rows": True,
+    "borderless_tables": True,
+    "min_confidence": 50,
+}
+# bump when the cached result format or the cell reading changes
+CACHE_VERSION = 1
+
 
 def display_table(img: np.ndarray) -> None:
     cv2.imshow("ImageWindow", img)
@@ -29,8 +49,18 @@ def visualise_cells(
 
 class ReadDtekGroup:
 
-    def __init__(self, image_path: str):
+    def __init__(
+        self,
+        image_path: str,
+        classifier: str = KMEANS_CLASSIFIER,
+        cache_dir: Optional[str] = None,
+    ):
+        self.classifier = classifier
+        # extraction results are cached here by image content, None - no cache
+        self.cache_dir = cache_dir
         self.outage_table: list[list[str]] = []
+        # cell geometry, x1/x2 of every hour column and y1 of every day row
+        self.cells: dict[str, list] = {}
         self.extracted_table: list[ExtractedTable] = []
         self.image_path = image_path
         file_name = os.path.basename(self.image_path)
@@ -41,46 +71,72 @@ class ReadDtekGroup:
         self.grey_cell = (238, 240, 239)
         self.black_cell = (210, 212, 214)
 
-    def __read_rows(self) -> None:
+    def crop_cells(self) -> list[list[np.ndarray]] | np.ndarray:
+        """
+        Cut the square hour cells out of the image using self.cells
+        :return: k-means - per day a list of cells as wide as their column,
+        grid - one (days, hours, size, size, rgb) array cut to the
+        narrowest column
+        """
         myimg = cv2.cvtColor(cv2.imread(self.image_path), cv2.COLOR_BGR2RGB)
+        columns = self.cells["columns"]
+        rows = self.cells["rows"]
+        if self.classifier != GRID_CLASSIFIER:
+            # visualise_cells(myimg, (x1, y), (x2, y + x2 - x1)) to debug
+            return [[myimg[y : y + x2 - x1, x1:x2] for x1, x2 in columns] for y in rows]
+        x1 = np.array([column[0] for column in columns])
+        size = int((np.array([column[1] for column in columns]) - x1).min())
+        ys = np.array(rows)[:, None] + np.arange(size)
+        xs = x1[:, None] + np.arange(size)
+        return myimg[ys[:, None, :, None], xs[None, :, None, :]]
 
-        table = self.extracted_table[0]
-        header_row = table.content[0]
-        # skip first colum and header with labels (day name, time interval)
-        table.content.popitem(last=False)
-        for row in table.content.values():
-            day: list[str] = []
-            first_cell = row[1]
-            cur_y = first_cell.bbox.y1
-            for i in range(1, 25):
-                header_cell = header_row[i]
-                cell_l = (header_cell.bbox.x1, cur_y)
-                cell_r = (
-                    header_cell.bbox.x2,
-                    cur_y + header_cell.bbox.x2 - header_cell.bbox.x1,
-                )
-                cropped_image = myimg[cell_l[1] : cell_r[1], cell_l[0] : cell_r[0]]
-
-                # display_table(cropped_image)
-
-                img_data = cropped_image.reshape(-1, 3)
-                criteria = (TERM_CRITERIA_MAX_ITER + TERM_CRITERIA_EPS, 10, 1.0)
-                _, labels, centers = kmeans(
-                    data=img_data.astype(float32),
-                    K=5,
-                    bestLabels=None,
-                    criteria=criteria,
-                    attempts=10,
-                    flags=KMEANS_RANDOM_CENTERS,
-                )
-                colours = centers[labels].reshape(-1, 3)
-                u_colors = unique(colours, axis=0, return_counts=True)
-                max_index = np.where(u_colors[1] == u_colors[1].max())[0][0]
-                max_fr_color = u_colors[0][max_index]
-                # visualise_cells(myimg, cell_l, cell_r)
-                self.determine_cell_type(max_fr_color, day)
-            self.outage_table.append(day)
-        # display_table(myimg)
+    def cell_colours(self, cells: list[list[np.ndarray]] | np.ndarray) -> np.ndarray:
+        """
+        Representative rgb colour of every cell from crop_cells
+        :return: (days, hours, 3)
+        """
+        if self.classifier != GRID_CLASSIFIER:
+            return np.array(
+                [[self.dominant_colour(cell) for cell in day] for day in cells]
+            )
+        assert isinstance(cells, np.ndarray), "grid cells come in one array"
+        pixels: npt.NDArray[np.uint8] = cells.reshape(*cells.shape[:2], -1, 3)
+        return np.median(pixels, axis=2)
+
+    @staticmethod
+    def dominant_colour(cell: np.ndarray) -> np.ndarray:
+        """
+        Most frequent of 5 k-means colour centers of the cell pixels
+        """
+        img_data = cell.reshape(-1, 3)
+        criteria = (TERM_CRITERIA_MAX_ITER + TERM_CRITERIA_EPS, 10, 1.0)
+        _, labels, centers = kmeans(
+            data=img_data.astype(float32),
+            K=5,
+            bestLabels=None,
+            criteria=criteria,
+            attempts=10,
+            flags=KMEANS_RANDOM_CENTERS,
+        )
+        colours = centers[labels].reshape(-1, 3)
+        u_colors = unique(colours, axis=0, return_counts=True)
+        max_index = np.where(u_colors[1] == u_colors[1].max())[0][0]
+        return u_colors[0][max_index]
+
+    def classify_cells(self, colours: np.ndarray) -> list[list[str]]:
+        """
+        Vectorised determine_cell_type for an array of rgb colours
+        :param colours: (days, hours, 3)
+        """
+        references = np.array([self.black_cell, self.grey_cell, self.white_cell])
+        deltas = np.sqrt(
+            ((colours[:, :, None, :] - references[None, None, :, :]) ** 2).sum(axis=-1)
+        )
+        close = deltas < MAX_COLOR_DELTA
+        # first matching reference wins, in the order of determine_cell_type
+        first = close.argmax(axis=-1)
+        names = np.array(CELL_TYPES + ["und"])
+        return names[np.where(close.any(axis=-1), first, len(CELL_TYPES))].tolist()
 
     def determine_cell_type(
         self, cell_color: tuple[float, float, float], day_array: list[str]
@@ -109,11 +165,85 @@ class ReadDtekGroup:
             day_array.append("und")
 
     def extract(self) -> None:
-        img = Image(src=self.image_path, detect_rotation=True)
+        cache_path = None
+        if self.cache_dir is not None:
+            cache_path = os.path.join(self.cache_dir, f"{self.cache_key()}.json")
+            if self.load_cached(cache_path):
+                logging.info(f"{self.image_path} read from cache")
+                return
+        self.detect()
+        self.read_table()
+        if cache_path is not None:
+            self.save_cached(cache_path)
+
+    def cache_key(self) -> str:
+        """
+        sha256 of the image bytes and everything the result depends on
+        """
+        digest = hashlib.sha256()
+        with open(self.image_path, "rb") as image:
+            digest.update(image.read())
+        params = {
+            "version": CACHE_VERSION,
+            "img2table": package_version("img2table"),
+            "extract": EXTRACT_PARAMS,
+            "classifier": self.classifier,
+            "colours": [self.black_cell, self.grey_cell, self.white_cell],
+        }
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def load_cached(self, cache_path: str) -> bool:
+        try:
+            with open(cache_path, encoding="UTF-8") as cached:
+                result = json.load(cached)
+            self.cells = result["cells"]
+            self.outage_table = result["outage_table"]
+        except (OSError, ValueError, KeyError):
+            return False
+        return True
+
+    def save_cached(self, cache_path: str) -> None:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # write and rename, parallel seeding may read the same key
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, mode="w", encoding="UTF-8") as cached:
+            json.dump({"cells": self.cells, "outage_table": self.outage_table}, cached)
+        os.replace(tmp_path, cache_path)
+
+    def detect(self) -> None:
+        """
+        Find the schedule table in the image
+        """
+        img = Image(
+            src=self.image_path, detect_rotation=EXTRACT_PARAMS["detect_rotation"]
+        )
         self.extracted_table = img.extract_tables(
-            implicit_rows=True, borderless_tables=True, min_confidence=50
+            implicit_rows=EXTRACT_PARAMS["implicit_rows"],
+            borderless_tables=EXTRACT_PARAMS["borderless_tables"],
+            min_confidence=EXTRACT_PARAMS["min_confidence"],
         )
-        self.__read_rows()
+
+    def read_cells(self) -> None:
+        """
+        Cell geometry of the extracted table, x1/x2 of the hour columns
+        from the header and y1 of the day rows below it
+        """
+        table = self.extracted_table[0]
+        header_row = table.content[0]
+        self.cells = {
+            "columns": [
+                [header_row[i].bbox.x1, header_row[i].bbox.x2] for i in range(1, 25)
+            ],
+            "rows": [row[1].bbox.y1 for row in list(table.content.values())[1:]],
+        }
+
+    def read_table(self) -> None:
+        """
+        Classify the cells of the extracted table into outage_table
+        """
+        self.read_cells()
+        self.outage_table = self.classify_cells(self.cell_colours(self.crop_cells()))
 
     def save_to_csv(self, check_csv_exists: bool = True) -> None:
         if check_csv_exists:
@@ -0,0 +1,315 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+from sqlalchemy import Engine, Result, event
+from sqlalchemy.orm import ORMExecuteState, sessionmaker
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# seconds, from a cached SQLite read to a slow Telegram round trip
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 1000)
+STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA"}
+# seconds past remind_time after which a fired reminder counts as late
+LATE_AFTER = 60.0
+
+Labels = tuple[str, ...]
+Samples = dict[Labels, float]
+
+
+def format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)] + (
+        [extra] if extra else []
+    )
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+    Monotonic counter, one value per label combination. inc() is a dict
+    update under an uncontended lock, SQL events come from worker threads
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Labels = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: Samples = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for values, value in sorted(self.values.items()):
+            label_text = format_labels(self.labels, values)
+            yield f"{self.name}{label_text} {format_value(value)}"
+
+
+class Histogram:
+    """
+    Bucketed observations, per bucket counts are kept and only made
+    cumulative when rendered
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # labels -> [count per bucket + overflow, sum, count]
+        self.values: dict[Labels, list[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self.values[labels] = state
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labels: str) -> int:
+        state = self.values.get(labels)
+        return 0 if state is None else state[2]
+
+    def sum(self, *labels: str) -> float:
+        state = self.values.get(labels)
+        return 0.0 if state is None else state[1]
+
+    def samples(self) -> Iterable[str]:
+        for values, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = format_labels(self.labels, values, f'le="{format_value(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            label_text = format_labels(self.labels, values)
+            yield f"{self.name}_sum{label_text} {format_value(total)}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class Sampled:
+    """
+    Value read from an existing counter or queue when /metrics is scraped,
+    costs nothing in between
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        read: Callable[[], Union[float, Samples]],
+        labels: Labels = (),
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.labels = labels
+        self.kind = kind
+
+    def samples(self) -> Iterable[str]:
+        value = self.read()
+        values = value if isinstance(value, dict) else {(): value}
+        for labels, sample in sorted(values.items()):
+            label_text = format_labels(self.labels, labels)
+            yield f"{self.name}{label_text} {format_value(sample)}"
+
+
+Metric = Union[Counter, Histogram, Sampled]
+
+
+class Registry:
+    """
+    Metrics by name, registering a name again replaces the metric
+    """
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        :return: Prometheus text exposition format
+        """
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REMINDERS_SCHEDULED = REGISTRY.register(
+    Counter("blackout_reminders_scheduled_total", "Reminder jobs scheduled")
+)
+REMINDERS_FIRED = REGISTRY.register(
+    Counter("blackout_reminders_fired_total", "Reminders sent to subscribers")
+)
+REMINDERS_LATE = REGISTRY.register(
+    Counter(
+        "blackout_reminders_late_total",
+        f"Reminders fired more than {LATE_AFTER:g}s after their remind time",
+    )
+)
+HANDLER_LATENCY = REGISTRY.register(
+    Histogram(
+        "blackout_handler_seconds",
+        "Keyboard command handling time",
+        labels=("command",),
+    )
+)
+DB_QUERIES = REGISTRY.register(
+    Histogram(
+        "blackout_db_query_seconds",
+        "SQL statement execution time, _count is the number of statements",
+        labels=("statement",),
+    )
+)
+
+UPDATE_SECONDS = REGISTRY.register(
+    Histogram(
+        "blackout_update_seconds",
+        "Handler and action wall time",
+        labels=("handler",),
+    )
+)
+UPDATE_STATEMENTS = REGISTRY.register(
+    Histogram(
+        "blackout_update_statements",
+        "SQL statements per handler or action call",
+        labels=("handler",),
+        buckets=COUNT_BUCKETS,
+    )
+)
+UPDATE_ROWS = REGISTRY.register(
+    Histogram(
+        "blackout_update_rows",
+        "Rows fetched per handler or action call",
+        labels=("handler",),
+        buckets=COUNT_BUCKETS,
+    )
+)
+
+
+class UpdateStats:
+    """
+    SQL cost of one update, filled by the engine and session events while
+    it is current_update. Calls of one update may run on several sql
+    threads at once (gather, background writes), so counts go through add
+    """
+
+    __slots__ = ("statements", "rows", "_lock")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, statements: int = 0, rows: int = 0) -> None:
+        with self._lock:
+            self.statements += statements
+            self.rows += rows
+
+
+# copied into the sql thread pool by src.sql.async_sql_service
+current_update: ContextVar[Optional[UpdateStats]] = ContextVar(
+    "current_update", default=None
+)
+
+
+@contextmanager
+def track_update() -> Iterator[UpdateStats]:
+    """
+    Count the statements and rows of everything run inside the block
+    """
+    stats = UpdateStats()
+    token = current_update.set(stats)
+    try:
+        yield stats
+    finally:
+        current_update.reset(token)
+
+
+def statement_kind(statement: str) -> str:
+    kind = statement.lstrip().partition(" ")[0].upper()
+    return kind if kind in STATEMENTS else "OTHER"
+
+
+def _before_execute(
+    conn: Any, cursor: Any, statement: str, *args: Any, **kwargs: Any
+) -> None:
+    # statements of one connection do not overlap
+    conn.info["query_start"] = time.perf_counter()
+
+
+def _after_execute(
+    conn: Any, cursor: Any, statement: str, *args: Any, **kwargs: Any
+) -> None:
+    DB_QUERIES.observe(
+        time.perf_counter() - conn.info["query_start"], statement_kind(statement)
+    )
+    stats = current_update.get()
+    if stats is not None:
+        stats.add(statements=1)
+
+
+def _count_rows(state: ORMExecuteState) -> Optional[Result]:
+    stats = current_update.get()
+    if stats is None or not state.is_select:
+        return None
+    # buffer the rows to count them, only while an update is tracked
+    frozen = state.invoke_statement().freeze()
+    stats.add(rows=len(frozen.data))
+    return frozen()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Time every statement the engine runs into DB_QUERIES
+    """
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+def instrument_sessions(session_maker: sessionmaker) -> None:
+    """
+    Count rows fetched by ORM selects into current_update
+    """
+    event.listen(session_maker, "do_orm_execute", _count_rows)
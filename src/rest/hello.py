@@ -1,12 +1,21 @@
-from flask import Flask
+from src.metrics import CONTENT_TYPE, REGISTRY
+from src.rest.server import HttpServer, Request, Response
 
-app = Flask(__name__)
 
+async def hello(request: Request) -> Response:
+    return Response("Hello!")
 
-@app.route("/")
-def hello() -> str:
-    return "Hello!"
 
+async def metrics(request: Request) -> Response:
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
-def run_server(port: int) -> None:
-    app.run(host="0.0.0.0", port=port)
+
+def make_server() -> HttpServer:
+    """
+    HTTP server with the health check and Prometheus metrics, the bot adds
+    its own routes to it
+    """
+    server = HttpServer()
+    server.route("GET", "/", hello)
+    server.route("GET", "/metrics", metrics)
+    return server
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY = 1024 * 1024
+# request line and headers together, also the longest line the reader takes
+MAX_HEADER_BYTES = 16 * 1024
+MAX_HEADERS = 100
+# seconds an open connection may wait for its next request
+IDLE_TIMEOUT = 60.0
+# seconds a started request has to arrive in full, and a response to drain
+READ_TIMEOUT = 10.0
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    408: "Request Timeout",
+    413: "Payload Too Large",
+    414: "URI Too Long",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    501: "Not Implemented",
+}
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        query: dict[str, list[str]],
+        headers: dict[str, str],
+        body: bytes,
+    ):
+        self.method = method
+        self.path = path
+        self.query = query
+        # header names are lower case
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def form(self) -> dict[str, str]:
+        """
+        application/x-www-form-urlencoded body, last value of every field
+        """
+        return {
+            name: values[-1] for name, values in parse_qs(self.body.decode()).items()
+        }
+
+
+class Response:
+    __slots__ = ("status", "body", "content_type")
+
+    def __init__(
+        self,
+        body: str | bytes = b"",
+        status: int = 200,
+        content_type: str = "text/plain; charset=utf-8",
+    ):
+        self.status = status
+        self.body = body.encode() if isinstance(body, str) else body
+        self.content_type = content_type
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200) -> "Response":
+        return cls(json.dumps(data), status, "application/json")
+
+    def encode(self, keep_alive: bool) -> bytes:
+        head = (
+            f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}\r\n"
+            f"Content-Type: {self.content_type}\r\n"
+            f"Content-Length: {len(self.body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        return head.encode("latin-1") + self.body
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class BadRequest(Exception):
+    def __init__(self, status: int):
+        super().__init__(REASONS[status])
+        self.status = status
+
+
+class HttpServer:
+    """
+    Small HTTP/1.1 server on asyncio streams, runs in the bot's event loop
+    and serves the Telegram webhook, the health check and other API routes.
+    Keep-alive connections, bodies with a single Content-Length only,
+    Transfer-Encoding is refused. Requests are bounded in size and time,
+    a connection that idles or trickles bytes is closed
+    """
+
+    def __init__(
+        self, idle_timeout: float = IDLE_TIMEOUT, read_timeout: float = READ_TIMEOUT
+    ) -> None:
+        self.idle_timeout = idle_timeout
+        self.read_timeout = read_timeout
+        self.routes: dict[tuple[str, str], Handler] = {}
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.Server] = None
+        self._connections: set[asyncio.StreamWriter] = set()
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        self.routes[(method.upper(), path)] = handler
+
+    async def start(self, host: str, port: int) -> int:
+        """
+        :param port: 0 picks a free port
+        :return: the port the server listens on
+        """
+        self._server = await asyncio.start_server(
+            self._serve, host, port, limit=MAX_HEADER_BYTES
+        )
+        port = self._server.sockets[0].getsockname()[1]
+        self.port = port
+        logger.info(f"http server listening on {host}:{port}")
+        return port
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # wait_closed waits for idle keep-alive connections as well
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def dispatch(self, request: Request) -> Response:
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                return Response(REASONS[405], 405)
+            return Response(REASONS[404], 404)
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.error(f"{request.method} {request.path} failed: {e}")
+            return Response(REASONS[500], 500)
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_request(
+                        reader, self.idle_timeout, self.read_timeout
+                    )
+                except BadRequest as e:
+                    writer.write(Response(str(e), e.status).encode(keep_alive=False))
+                    await asyncio.wait_for(writer.drain(), self.read_timeout)
+                    break
+                if request is None:
+                    break
+                response = await self.dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                writer.write(response.encode(keep_alive))
+                await asyncio.wait_for(writer.drain(), self.read_timeout)
+                if not keep_alive:
+                    break
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            asyncio.TimeoutError,
+        ):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+async def read_request(
+    reader: asyncio.StreamReader,
+    idle_timeout: float = IDLE_TIMEOUT,
+    read_timeout: float = READ_TIMEOUT,
+) -> Optional[Request]:
+    """
+    :return: the next request of the connection, None once it is closed
+    or has been idle for idle_timeout
+    """
+    try:
+        line = await asyncio.wait_for(reader.readline(), idle_timeout)
+    except asyncio.TimeoutError:
+        return None
+    except (ValueError, asyncio.LimitOverrunError):
+        raise BadRequest(414)
+    if not line.strip():
+        return None
+    try:
+        return await asyncio.wait_for(_read_rest(reader, line), read_timeout)
+    except asyncio.TimeoutError:
+        raise BadRequest(408)
+
+
+async def _read_rest(reader: asyncio.StreamReader, line: bytes) -> Request:
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise BadRequest(400)
+    headers: dict[str, str] = {}
+    size = len(line)
+    count = 0
+    while True:
+        try:
+            header = await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            # readline turns an over-long line into ValueError
+            raise BadRequest(431)
+        if header in (b"\r\n", b"\n", b""):
+            break
+        size += len(header)
+        count += 1
+        if size > MAX_HEADER_BYTES or count > MAX_HEADERS:
+            raise BadRequest(431)
+        name, colon, value = header.decode("latin-1").partition(":")
+        name = name.lower()
+        if not colon or not name or name != name.strip():
+            raise BadRequest(400)
+        if name == "content-length" and name in headers:
+            # repeated lengths are how requests get smuggled past proxies
+            raise BadRequest(400)
+        headers[name] = value.strip()
+    if "transfer-encoding" in headers:
+        # bodies are read by Content-Length only, a chunked body would be
+        # parsed as the next request of the connection
+        raise BadRequest(501)
+    length_text = headers.get("content-length", "0")
+    if not (length_text.isascii() and length_text.isdigit()):
+        raise BadRequest(400)
+    length = int(length_text)
+    if length > MAX_BODY:
+        raise BadRequest(413)
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, parse_qs(url.query), headers, body)
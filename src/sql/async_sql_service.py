@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from pytz.tzinfo import BaseTzInfo
+
+from src.sql.models.group import Group
+from src.sql.models.subscription import Subscription
+from src.sql.models.user import User
+from src.sql.remind_obj import RemindObj
+from src.sql.sql_service import SqlService
+from src.sql.sql_time_finder import SqlTimeFinder
+
+T = TypeVar("T")
+logger = logging.getLogger(__name__)
+
+SQL_WORKERS = 4
+_executor = ThreadPoolExecutor(max_workers=SQL_WORKERS, thread_name_prefix="sql")
+# scheduled_reminders writes run in submission order, a save queued before
+# an unsubscribe can not land after its delete
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sql-writer")
+
+
+async def _run(func: Callable[..., T], *args: object, **kwargs: object) -> T:
+    loop = asyncio.get_running_loop()
+    # run_in_executor does not carry context, metrics.current_update needs it
+    call = partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(_executor, call)
+
+
+async def _write(func: Callable[..., T], *args: object) -> T:
+    loop = asyncio.get_running_loop()
+    call = partial(contextvars.copy_context().run, func, *args)
+    return await loop.run_in_executor(_writer, call)
+
+
+_pending: set[Future] = set()
+
+
+def submit(func: Callable[..., T], *args: object) -> "Future[T]":
+    """
+    Queue func on the serial writer without waiting for it, errors are logged
+    """
+    future = _writer.submit(contextvars.copy_context().run, func, *args)
+    _pending.add(future)
+    future.add_done_callback(_log_failure)
+    return future
+
+
+def flush(timeout: Optional[float] = None) -> None:
+    """
+    Block until every submitted call has finished
+    """
+    wait(list(_pending), timeout=timeout)
+
+
+def _log_failure(future: Future) -> None:
+    _pending.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"background sql call failed: {future.exception()}")
+
+
+class AsyncSqlService:
+    """
+    Non-blocking counterpart of SqlService for the telegram handlers,
+    every call runs the SqlService method on a dedicated thread pool
+    so SQLite I/O does not stall the event loop
+    """
+
+    @staticmethod
+    async def delete_subs_for_user_group(tg_id: int, group_name: str) -> None:
+        await _write(SqlService.delete_subs_for_user_group, tg_id, group_name)
+
+    @staticmethod
+    async def delete_no_sub_user(tg_id: int) -> None:
+        await _write(SqlService.delete_no_sub_user, tg_id)
+
+    @staticmethod
+    async def delete_user_with_subs(tg_id: int) -> None:
+        await _write(SqlService.delete_user_with_subs, tg_id)
+
+    @staticmethod
+    async def subscribe_user(tg_id: int, group_name: str) -> bool:
+        return await _run(SqlService.subscribe_user, tg_id, group_name)
+
+    @staticmethod
+    async def get_all_users() -> list[User]:
+        return await _run(SqlService.get_all_users)
+
+    @staticmethod
+    async def get_all_groups() -> list[Group]:
+        return await _run(SqlService.get_all_groups)
+
+    @staticmethod
+    async def update_user(
+        tg_id: int,
+        show_help: Optional[bool] = None,
+        remind_before: Optional[int] = None,
+        suppress_night: Optional[bool] = None,
+    ) -> User:
+        return await _run(
+            SqlService.update_user,
+            tg_id,
+            show_help=show_help,
+            remind_before=remind_before,
+            suppress_night=suppress_night,
+        )
+
+    @staticmethod
+    async def toggle_suppress_at_night(tg_id: int) -> User:
+        return await _run(SqlService.toggle_suppress_at_night, tg_id)
+
+    @staticmethod
+    async def get_user(tg_id: int) -> User:
+        return await _run(SqlService.get_user, tg_id)
+
+    @staticmethod
+    async def get_subs_for_user(tg_id: int) -> list[Subscription]:
+        return await _run(SqlService.get_subs_for_user, tg_id)
+
+    @staticmethod
+    async def get_revision(group_name: str) -> Optional[int]:
+        return await _run(SqlService.get_revision, group_name)
+
+    @staticmethod
+    async def read_time_finder(group_name: str, timezone: BaseTzInfo) -> SqlTimeFinder:
+        finder = SqlTimeFinder(group_name, timezone)
+        await _run(finder.read_schedule)
+        return finder
+
+    @staticmethod
+    async def get_schedule_for(day: str, group: str) -> list:
+        return await _run(SqlService.get_schedule_for, day, group)
+
+    @staticmethod
+    async def get_due_reminders(
+        now: datetime, until: datetime
+    ) -> list[tuple[str, RemindObj]]:
+        return await _run(SqlService.get_due_reminders, now, until)
+
+    @staticmethod
+    async def get_group_reminders(
+        group_name: str,
+    ) -> list[tuple[str, int, bool, Optional[datetime]]]:
+        return await _run(SqlService.get_group_reminders, group_name)
+
+    @staticmethod
+    async def update_group_schedule(
+        group_name: str, table: list[list[str]]
+    ) -> list[tuple[int, int]]:
+        return await _run(SqlService.update_group_schedule, group_name, table)
+
+    @staticmethod
+    async def mark_reminder_sent(chat_id: int | str, group_name: str) -> None:
+        await _write(SqlService.mark_reminder_sent, chat_id, group_name)
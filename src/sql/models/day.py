@@ -7,4 +7,4 @@ from src.sql.models import Base
 class Day(Base):
     __tablename__ = "days"
     day_id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    day_name: Mapped[str]
+    day_name: Mapped[str] = mapped_column(unique=True, index=True)
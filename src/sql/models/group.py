@@ -8,4 +8,6 @@ class Group(Base):
     __tablename__ = "groups"
     group_id: Mapped[int] = mapped_column(Integer, primary_key=True)
     custom: Mapped[bool]
-    group_name: Mapped[str]
+    group_name: Mapped[str] = mapped_column(unique=True, index=True)
+    # bumped on every schedule write, lets in-process caches notice changes
+    schedule_revision: Mapped[int] = mapped_column(server_default="0")
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, ForeignKey
+from sqlalchemy import Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 
 from src.sql.models import Base
@@ -10,11 +10,24 @@ from src.sql.models.zone import Zone
 
 class Hour(Base):
     __tablename__ = "hours"
+    __table_args__ = (
+        Index(
+            "ix_hours_group_version_day_hour",
+            "group_id",
+            "version",
+            "day_id",
+            "hour",
+            unique=True,
+        ),
+    )
     hour_id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    day_id: Mapped[int] = mapped_column(Integer, ForeignKey("days.day_id"))
+    day_id: Mapped[int] = mapped_column(Integer, ForeignKey("days.day_id"), index=True)
     hour: Mapped[int]
     zone_id: Mapped[int] = mapped_column(Integer, ForeignKey("zones.zone_id"))
     group_id: Mapped[int] = mapped_column(Integer, ForeignKey("groups.group_id"))
+    # schedule version, readers only see the one groups.schedule_revision
+    # points at
+    version: Mapped[int] = mapped_column(server_default="0")
     day: Mapped[Day] = relationship(Day)
     zone: Mapped[Zone] = relationship(Zone)
     group: Mapped[Group] = relationship(Group)
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import String, Index, DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+
+from src.sql.models import Base
+
+
+class ScheduledReminder(Base):
+    """
+    Next pending reminder of a subscription, times are stored in UTC
+    """
+
+    __tablename__ = "scheduled_reminders"
+    __table_args__ = (Index("ix_scheduled_reminders_due", "sent", "remind_time"),)
+    chat_id: Mapped[str] = mapped_column(String, primary_key=True)
+    group_name: Mapped[str] = mapped_column(String, primary_key=True)
+    remind_time: Mapped[datetime] = mapped_column(DateTime)
+    change_time: Mapped[datetime] = mapped_column(DateTime)
+    # json with the rest of RemindObj
+    payload: Mapped[str]
+    sent: Mapped[bool] = mapped_column(default=False)
@@ -12,7 +12,7 @@ class Subscription(Base):
         String, ForeignKey("users.tg_id"), primary_key=True
     )
     group_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("groups.group_id"), primary_key=True
+        Integer, ForeignKey("groups.group_id"), primary_key=True, index=True
     )
     group: Mapped[Group] = relationship(Group)
     user: Mapped["User"] = relationship(back_populates="subs")
@@ -7,4 +7,4 @@ from src.sql.models import Base
 class Zone(Base):
     __tablename__ = "zones"
     zone_id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    zone_name: Mapped[str]
+    zone_name: Mapped[str] = mapped_column(unique=True, index=True)
@@ -0,0 +1,58 @@
+from typing import Iterable
+
+from sqlalchemy import Integer, ForeignKey, Index
+from sqlalchemy.orm import relationship, mapped_column, Mapped
+
+from src.sql.models import Base
+
+from src.sql.models.day import Day
+from src.sql.models.group import Group
+from src.sql.models.zone import Zone
+
+
+class ZoneSegment(Base):
+    """
+    Run of consecutive hours in the same zone within one day,
+    precomputed from hours when a group schedule is written
+    """
+
+    __tablename__ = "zone_segments"
+    __table_args__ = (
+        Index(
+            "ix_zone_segments_group_version_day_start",
+            "group_id",
+            "version",
+            "day_id",
+            "start_hour",
+            unique=True,
+        ),
+    )
+    segment_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    group_id: Mapped[int] = mapped_column(Integer, ForeignKey("groups.group_id"))
+    # schedule version of the hours the segment was built from
+    version: Mapped[int] = mapped_column(server_default="0")
+    day_id: Mapped[int] = mapped_column(Integer, ForeignKey("days.day_id"))
+    start_hour: Mapped[int]
+    length: Mapped[int]
+    zone_id: Mapped[int] = mapped_column(Integer, ForeignKey("zones.zone_id"))
+    day: Mapped[Day] = relationship(Day)
+    zone: Mapped[Zone] = relationship(Zone)
+    group: Mapped[Group] = relationship(Group)
+
+
+def build_segments(
+    hours: Iterable[tuple[int, int, int]]
+) -> list[tuple[int, int, int, int]]:
+    """
+    :param hours: (day_id, hour, zone_id) sorted by day and hour
+    :return: (day_id, start_hour, length, zone_id) for every run of one zone
+    """
+    segments: list[tuple[int, int, int, int]] = []
+    for day_id, hour, zone_id in hours:
+        if segments:
+            last_day, start, length, last_zone = segments[-1]
+            if last_day == day_id and last_zone == zone_id:
+                segments[-1] = (last_day, start, length + 1, last_zone)
+                continue
+        segments.append((day_id, hour, 1, zone_id))
+    return segments
@@ -0,0 +1,142 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from pytz.tzinfo import BaseTzInfo
+
+from config import get_session_maker
+from src.sql.async_sql_service import AsyncSqlService
+from src.sql.sql_service import GroupRepo
+from src.sql.sql_time_finder import SqlTimeFinder
+
+CACHE_SIZE = 64
+REVISION_CHECK_INTERVAL = 30.0
+
+
+class ScheduleCache:
+    """
+    LRU cache of SqlTimeFinder per group, a finder is reloaded when
+    groups.schedule_revision no longer matches the revision it was read at
+    """
+
+    def __init__(
+        self,
+        timezone: BaseTzInfo,
+        max_size: int = CACHE_SIZE,
+        check_interval: float = REVISION_CHECK_INTERVAL,
+    ):
+        self.tz = timezone
+        self.max_size = max_size
+        # seconds a finder is trusted before its revision is checked again
+        self.check_interval = check_interval
+        self.finders: OrderedDict[str, SqlTimeFinder] = OrderedDict()
+        self.checked_at: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, group: str) -> SqlTimeFinder:
+        """
+        Blocking lookup for startup, before the event loop runs
+        """
+        finder = self.finders.get(group)
+        if finder is None:
+            self.misses += 1
+            finder = self._load(group)
+        elif self._is_stale(group, finder):
+            self.reloads += 1
+            finder = self._load(group)
+        else:
+            self.hits += 1
+            self.finders.move_to_end(group)
+        return finder
+
+    async def get_async(self, group: str) -> SqlTimeFinder:
+        """
+        get for coroutines, the revision check and the load run on the
+        sql thread pool
+        """
+        finder = self.finders.get(group)
+        if finder is None:
+            self.misses += 1
+            return self._store(
+                group, await AsyncSqlService.read_time_finder(group, self.tz)
+            )
+        if self._check_due(group):
+            if await AsyncSqlService.get_revision(group) != finder.revision:
+                self.reloads += 1
+                return self._store(
+                    group, await AsyncSqlService.read_time_finder(group, self.tz)
+                )
+        self.hits += 1
+        if group in self.finders:
+            self.finders.move_to_end(group)
+        return finder
+
+    def reload(self, group: str) -> SqlTimeFinder:
+        """
+        Read the active schedule version of the group and swap it in,
+        callers keep using the previous finder until the new one is built
+        """
+        self.reloads += 1
+        return self._load(group)
+
+    def checked_revision(self, group: str) -> Optional[int]:
+        """
+        Revision of the cached finder while it is trusted, None when the
+        group is not cached or its revision is due for a check. Never
+        touches the database
+        """
+        finder = self.finders.get(group)
+        if finder is None:
+            return None
+        now = time.monotonic()
+        if now - self.checked_at.get(group, now) >= self.check_interval:
+            return None
+        return finder.revision
+
+    def invalidate(self, group: Optional[str] = None) -> None:
+        if group is None:
+            self.finders.clear()
+            self.checked_at.clear()
+        else:
+            self.finders.pop(group, None)
+            self.checked_at.pop(group, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.finders),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "evictions": self.evictions,
+        }
+
+    def _check_due(self, group: str) -> bool:
+        now = time.monotonic()
+        if now - self.checked_at.get(group, now) < self.check_interval:
+            return False
+        self.checked_at[group] = now
+        return True
+
+    def _is_stale(self, group: str, finder: SqlTimeFinder) -> bool:
+        if not self._check_due(group):
+            return False
+        with get_session_maker()() as session:
+            return GroupRepo(session).get_revision(group) != finder.revision
+
+    def _load(self, group: str) -> SqlTimeFinder:
+        finder = SqlTimeFinder(group, self.tz)
+        finder.read_schedule()
+        return self._store(group, finder)
+
+    def _store(self, group: str, finder: SqlTimeFinder) -> SqlTimeFinder:
+        self.finders[group] = finder
+        self.finders.move_to_end(group)
+        self.checked_at[group] = time.monotonic()
+        while len(self.finders) > self.max_size:
+            evicted, _ = self.finders.popitem(last=False)
+            self.checked_at.pop(evicted, None)
+            self.evictions += 1
+        return finder
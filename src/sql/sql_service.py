@@ -1,15 +1,33 @@
+import json
+from datetime import datetime
 from typing import List
 from typing import Optional
-from sqlalchemy import func, and_, over
+
+import pytz
+from sqlalchemy import (
+    ColumnElement,
+    func,
+    and_,
+    or_,
+    over,
+    insert,
+    delete,
+    select,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, joinedload
 
 import config
 from src.sql.models.day import Day
 from src.sql.models.group import Group
 from src.sql.models.hour import Hour
+from src.sql.models.scheduled_reminder import ScheduledReminder
 from src.sql.models.subscription import Subscription
 from src.sql.models.user import User
 from src.sql.models.zone import Zone
+from src.sql.models.zone_segment import ZoneSegment, build_segments
+from src.sql.remind_obj import RemindObj
 
 
 class ZoneRepo:
@@ -34,6 +52,11 @@ class GroupRepo:
     def get_group(self, name: str) -> Group:
         return self.db.query(Group).filter(Group.group_name == name).first()
 
+    def get_revision(self, name: str) -> Optional[int]:
+        return self.db.execute(
+            select(Group.schedule_revision).where(Group.group_name == name)
+        ).scalar()
+
     def get_groups(self) -> list[Group]:
         return self.db.query(Group).all()
 
@@ -92,6 +115,24 @@ class SubsRepo:
             .all()
         )
 
+    def get_reminder_settings(self) -> list[tuple[str, str, int, bool]]:
+        """
+        (tg_id, group_name, remind_before, suppress_night) for every
+        subscription, plain rows without ORM objects
+        """
+        return list(
+            self.db.execute(
+                select(
+                    Subscription.user_tg_id,
+                    Group.group_name,
+                    User.remind_before,
+                    User.suppress_night,
+                )
+                .join(Group, Group.group_id == Subscription.group_id)
+                .join(User, User.tg_id == Subscription.user_tg_id)
+            ).tuples()
+        )
+
     def add(self, user: User, grp: Group) -> Subscription:
         sub = Subscription(user_tg_id=user.tg_id, group_id=grp.group_id)
         self.db.add(sub)
@@ -157,6 +198,16 @@ class DayRepo:
         return day
 
 
+def active_version(model: type[Hour] | type[ZoneSegment]) -> ColumnElement[bool]:
+    """
+    Join condition of hours or zone segments with their group that keeps
+    only the active schedule version, groups.schedule_revision
+    """
+    return and_(
+        Group.group_id == model.group_id, Group.schedule_revision == model.version
+    )
+
+
 class HourRepo:
     def __init__(self, db: Session):
         self.db = db
@@ -164,20 +215,50 @@ class HourRepo:
     def get_hours_for_day_group(self, day: Day, grp: Group) -> list[Hour]:
         return (
             self.db.query(Hour)
-            .filter(Hour.day_id == day.day_id, Group.group_name == grp.group_name)
+            .join(Group, active_version(Hour))
+            .filter(Hour.group_id == grp.group_id, Hour.day_id == day.day_id)
+            .order_by(Hour.hour)
             .all()
         )
 
     def get_hours_for_day(self, day: Day) -> list[Hour]:
-        return self.db.query(Hour).filter(Hour.day_id == day.day_id).all()
+        return (
+            self.db.query(Hour)
+            .join(Group, active_version(Hour))
+            .filter(Hour.day_id == day.day_id)
+            .all()
+        )
 
     def get_hours_for_group(self, group: Group) -> list[Hour]:
         return (
             self.db.query(Hour)
+            .join(Group, active_version(Hour))
             .filter(Hour.group_id == group.group_id)
             .options(joinedload(Hour.zone), joinedload(Hour.day))
+            .order_by(Hour.day_id, Hour.hour)
         ).all()
 
+    def get_week_zones(self, group: Group) -> list[str]:
+        """
+        Zone names of the group for every hour of the week, Monday 00:00 first
+        """
+        return self.get_active_week(group)[1]
+
+    def get_active_week(self, group: Group) -> tuple[Optional[int], list[str]]:
+        """
+        Active version of the group's week and its zone names, Monday 00:00
+        first, read in one statement so both belong to the same version
+        :return: (version or None when the group has no hours, zone names)
+        """
+        rows = self.db.execute(
+            select(Zone.zone_name, Hour.version)
+            .join(Hour, Hour.zone_id == Zone.zone_id)
+            .join(Group, active_version(Hour))
+            .where(Hour.group_id == group.group_id)
+            .order_by(Hour.day_id, Hour.hour)
+        ).all()
+        return (rows[0].version if rows else None), [row.zone_name for row in rows]
+
     def add(self, hour: int, zone: Zone, day: Day, group: Group) -> bool:
         hour = Hour(hour=hour, zone=zone, day=day, group=group)
         self.db.add(hour)
@@ -185,6 +266,333 @@ class HourRepo:
         self.db.refresh(hour)
         return True
 
+    def add_many(
+        self,
+        group: Group,
+        table: list[list[str]],
+        commit: bool = True,
+        version: Optional[int] = None,
+    ) -> int:
+        """
+        Insert a week of hours for group in one executemany and one commit
+        :param group:
+        :param table: rows of zone names, one row per day starting from Monday
+        :param commit: False leaves the transaction open for the caller
+        :param version: schedule version of the hours, None - the column
+        default
+        :return: number of inserted hours
+        """
+        zone_ids = {zone.zone_name: zone.zone_id for zone in self.db.query(Zone)}
+        day_ids = [day.day_id for day in self.db.query(Day).order_by(Day.day_id)]
+        rows = []
+        for day_id, day_row in zip(day_ids, table):
+            for hour, zone_name in enumerate(day_row):
+                if zone_name not in zone_ids:
+                    raise ValueError(f"Unknown zone {zone_name} in {group.group_name}")
+                row = {
+                    "hour": hour,
+                    "zone_id": zone_ids[zone_name],
+                    "day_id": day_id,
+                    "group_id": group.group_id,
+                }
+                if version is not None:
+                    row["version"] = version
+                rows.append(row)
+        if rows:
+            self.db.execute(insert(Hour), rows)
+        if commit:
+            self.db.commit()
+        return len(rows)
+
+
+class ZoneSegmentRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def rebuild_for_group(self, group: Group, version: int) -> int:
+        """
+        Compute zone segments of a schedule version of the group from its
+        hours, does not commit
+        :return: number of segments
+        """
+        hours = self.db.execute(
+            select(Hour.day_id, Hour.hour, Hour.zone_id)
+            .where(Hour.group_id == group.group_id, Hour.version == version)
+            .order_by(Hour.day_id, Hour.hour)
+        ).tuples()
+        segments = [
+            {
+                "group_id": group.group_id,
+                "version": version,
+                "day_id": day_id,
+                "start_hour": start_hour,
+                "length": length,
+                "zone_id": zone_id,
+            }
+            for day_id, start_hour, length, zone_id in build_segments(hours)
+        ]
+        self.db.execute(
+            delete(ZoneSegment).where(
+                ZoneSegment.group_id == group.group_id,
+                ZoneSegment.version == version,
+            )
+        )
+        if segments:
+            self.db.execute(insert(ZoneSegment), segments)
+        return len(segments)
+
+
+class ScheduleRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def replace_group_schedule(self, group: Group, table: list[list[str]]) -> int:
+        """
+        Write table as a new schedule version of the group
+        :return: number of inserted hours
+        """
+        return self.write_version(group, table)[1]
+
+    def write_version(self, group: Group, table: list[list[str]]) -> tuple[int, int]:
+        """
+        Write the full week as the next schedule version next to the active
+        one, activate it by moving groups.schedule_revision and drop older
+        versions, in a single transaction. Readers join on the pointer
+        (active_version), so they see the old or the new week, never a mix,
+        and in WAL mode they do not wait for the writer.
+        :return: (new version, number of inserted hours)
+        """
+        version = (GroupRepo(self.db).get_revision(group.group_name) or 0) + 1
+        inserted = HourRepo(self.db).add_many(
+            group, table, commit=False, version=version
+        )
+        ZoneSegmentRepo(self.db).rebuild_for_group(group, version)
+        self.db.execute(
+            update(Group)
+            .where(Group.group_id == group.group_id)
+            .values(schedule_revision=version)
+        )
+        for model in (Hour, ZoneSegment):
+            self.db.execute(
+                delete(model).where(
+                    model.group_id == group.group_id, model.version != version
+                )
+            )
+        self.db.commit()
+        return version, inserted
+
+    def update_group_schedule(
+        self, group: Group, table: list[list[str]]
+    ) -> list[tuple[int, int]]:
+        """
+        Diff table against the active week of the group and, when any cell
+        changed, write the full week as a new version (write_version)
+        :param table: rows of zone names, one row per day starting from Monday
+        :return: changed [start, stop) ranges in hours of the week,
+        Monday 00:00 is 0
+        """
+        _, stored = HourRepo(self.db).get_active_week(group)
+        week = [zone_name for day_row in table for zone_name in day_row]
+        changed = [
+            hour
+            for hour, zone_name in enumerate(week)
+            if hour >= len(stored) or stored[hour] != zone_name
+        ]
+        if not changed:
+            return []
+        self.write_version(group, table)
+        return to_ranges(changed)
+
+
+def to_ranges(hours: list[int]) -> list[tuple[int, int]]:
+    """
+    Sorted hours merged into [start, stop) ranges of consecutive hours
+    """
+    ranges: list[tuple[int, int]] = []
+    for hour in hours:
+        if ranges and ranges[-1][1] == hour:
+            ranges[-1] = (ranges[-1][0], hour + 1)
+        else:
+            ranges.append((hour, hour + 1))
+    return ranges
+
+
+def to_utc(time: datetime) -> datetime:
+    return time.astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def from_utc(time: datetime) -> datetime:
+    return pytz.utc.localize(time).astimezone(config.tz)
+
+
+class ReminderRepo:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def save_many(self, reminders: list[tuple[str, RemindObj]]) -> None:
+        """
+        Store (chat_id, reminder) as the next pending reminder of the
+        subscription, replacing the previous one
+        """
+        if not reminders:
+            return
+        stmt = sqlite_insert(ScheduledReminder)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScheduledReminder.chat_id, ScheduledReminder.group_name],
+            set_={
+                "remind_time": stmt.excluded.remind_time,
+                "change_time": stmt.excluded.change_time,
+                "payload": stmt.excluded.payload,
+                "sent": stmt.excluded.sent,
+            },
+        )
+        self.db.execute(
+            stmt,
+            [
+                {
+                    "chat_id": str(chat_id),
+                    "group_name": remind.group,
+                    "remind_time": to_utc(remind.remind_time),
+                    "change_time": to_utc(remind.change_time),
+                    "payload": json.dumps(
+                        {"old_zone": remind.old_zone, "new_zone": remind.new_zone}
+                    ),
+                    "sent": False,
+                }
+                for chat_id, remind in reminders
+            ],
+        )
+        self.db.commit()
+
+    def get_due(self, now: datetime, until: datetime) -> list[tuple[str, RemindObj]]:
+        """
+        Unsent reminders due before until whose zone change is still ahead,
+        rows left behind by a removed subscription are skipped
+        """
+        rows = self.db.execute(
+            select(ScheduledReminder)
+            .join(Group, Group.group_name == ScheduledReminder.group_name)
+            .join(
+                Subscription,
+                and_(
+                    Subscription.user_tg_id == ScheduledReminder.chat_id,
+                    Subscription.group_id == Group.group_id,
+                ),
+            )
+            .where(
+                ScheduledReminder.sent.is_(False),
+                ScheduledReminder.remind_time <= to_utc(until),
+                ScheduledReminder.change_time > to_utc(now),
+            )
+        ).scalars()
+        reminders = []
+        for row in rows:
+            payload = json.loads(row.payload)
+            remind_time = from_utc(row.remind_time)
+            reminders.append(
+                (
+                    row.chat_id,
+                    RemindObj(
+                        group=row.group_name,
+                        old_zone=payload["old_zone"],
+                        new_zone=payload["new_zone"],
+                        remind_time=remind_time,
+                        change_time=from_utc(row.change_time),
+                        notify_now=remind_time <= now,
+                    ),
+                )
+            )
+        return reminders
+
+    def get_unscheduled_settings(
+        self, now: datetime
+    ) -> list[tuple[str, str, int, bool]]:
+        """
+        Reminder settings of subscriptions without a pending reminder
+        """
+        return list(
+            self.db.execute(
+                select(
+                    Subscription.user_tg_id,
+                    Group.group_name,
+                    User.remind_before,
+                    User.suppress_night,
+                )
+                .join(Group, Group.group_id == Subscription.group_id)
+                .join(User, User.tg_id == Subscription.user_tg_id)
+                .outerjoin(
+                    ScheduledReminder,
+                    and_(
+                        ScheduledReminder.chat_id == Subscription.user_tg_id,
+                        ScheduledReminder.group_name == Group.group_name,
+                    ),
+                )
+                .where(
+                    or_(
+                        ScheduledReminder.chat_id.is_(None),
+                        ScheduledReminder.sent.is_(True),
+                        ScheduledReminder.change_time <= to_utc(now),
+                    )
+                )
+            ).tuples()
+        )
+
+    def get_group_reminders(
+        self, group_name: str
+    ) -> list[tuple[str, int, bool, Optional[datetime]]]:
+        """
+        (chat_id, remind_before, suppress_night, change time of the pending
+        reminder or None) for every subscriber of the group
+        """
+        rows = self.db.execute(
+            select(
+                Subscription.user_tg_id,
+                User.remind_before,
+                User.suppress_night,
+                ScheduledReminder.change_time,
+                ScheduledReminder.sent,
+            )
+            .join(Group, Group.group_id == Subscription.group_id)
+            .join(User, User.tg_id == Subscription.user_tg_id)
+            .outerjoin(
+                ScheduledReminder,
+                and_(
+                    ScheduledReminder.chat_id == Subscription.user_tg_id,
+                    ScheduledReminder.group_name == Group.group_name,
+                ),
+            )
+            .where(Group.group_name == group_name)
+        ).tuples()
+        return [
+            (
+                chat_id,
+                remind_before,
+                suppress,
+                None if change_time is None or sent else from_utc(change_time),
+            )
+            for chat_id, remind_before, suppress, change_time, sent in rows
+        ]
+
+    def mark_sent(self, chat_id: int | str, group_name: str) -> None:
+        self.db.execute(
+            update(ScheduledReminder)
+            .where(
+                ScheduledReminder.chat_id == str(chat_id),
+                ScheduledReminder.group_name == group_name,
+            )
+            .values(sent=True)
+        )
+        self.db.commit()
+
+    def delete(self, chat_id: int | str, group_name: Optional[str] = None) -> None:
+        stmt = delete(ScheduledReminder).where(
+            ScheduledReminder.chat_id == str(chat_id)
+        )
+        if group_name is not None:
+            stmt = stmt.where(ScheduledReminder.group_name == group_name)
+        self.db.execute(stmt)
+        self.db.commit()
+
 
 class SqlService:
 
@@ -200,6 +608,7 @@ class SqlService:
             subs = subs_repo.get_subs_for_user_grp(user, group)
             for sub in subs:
                 subs_repo.delete(sub)
+            ReminderRepo(session).delete(tg_id, group_name)
 
     @staticmethod
     def delete_no_sub_user(tg_id: int) -> None:
@@ -219,6 +628,7 @@ class SqlService:
             user = user_repo.get_user(tg_id)
             if user is not None:
                 user_repo.delete(user)
+            ReminderRepo(session).delete(tg_id)
 
     @staticmethod
     def subscribe_user(tg_id: int, group_name: str) -> bool:
@@ -246,6 +656,69 @@ class SqlService:
             subs_repo = SubsRepo(session)
             return subs_repo.get_subs()
 
+    @staticmethod
+    def get_reminder_settings() -> list[tuple[str, str, int, bool]]:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            subs_repo = SubsRepo(session)
+            return subs_repo.get_reminder_settings()
+
+    @staticmethod
+    def save_reminders(reminders: list[tuple[str, RemindObj]]) -> None:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            ReminderRepo(session).save_many(reminders)
+
+    @staticmethod
+    def get_due_reminders(
+        now: datetime, until: datetime
+    ) -> list[tuple[str, RemindObj]]:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            return ReminderRepo(session).get_due(now, until)
+
+    @staticmethod
+    def get_unscheduled_settings(now: datetime) -> list[tuple[str, str, int, bool]]:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            return ReminderRepo(session).get_unscheduled_settings(now)
+
+    @staticmethod
+    def get_group_reminders(
+        group_name: str,
+    ) -> list[tuple[str, int, bool, Optional[datetime]]]:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            return ReminderRepo(session).get_group_reminders(group_name)
+
+    @staticmethod
+    def update_group_schedule(
+        group_name: str, table: list[list[str]]
+    ) -> list[tuple[int, int]]:
+        """
+        Diff table against the active week of the group and, when any cell
+        changed, store the full week as a new schedule version
+        :return: changed [start, stop) ranges in hours of the week
+        """
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            group = GroupRepo(session).get_group(group_name)
+            if group is None:
+                raise ValueError(f"Unknown group {group_name}")
+            return ScheduleRepo(session).update_group_schedule(group, table)
+
+    @staticmethod
+    def mark_reminder_sent(chat_id: int | str, group_name: str) -> None:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            ReminderRepo(session).mark_sent(chat_id, group_name)
+
+    @staticmethod
+    def delete_reminders(chat_id: int | str, group_name: Optional[str] = None) -> None:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            ReminderRepo(session).delete(chat_id, group_name)
+
     @staticmethod
     def get_all_users() -> list[User]:
         session_maker = config.get_session_maker()
@@ -305,9 +778,46 @@ class SqlService:
             user_repo = UsersRepo(session)
             return subs_repo.get_subs_for_user(user_repo.get_user(tg_id))
 
+    @staticmethod
+    def get_revision(group_name: str) -> Optional[int]:
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            return GroupRepo(session).get_revision(group_name)
+
     @staticmethod
     def get_schedule_for(day: str, group: str) -> list:
         """
+        Zone segments of the group for the day ordered by start hour,
+        rows have zone_name, hour and outage_hours
+        :param day:
+        :param group:
+        """
+        session_maker = config.get_session_maker()
+        with session_maker() as session:
+            return (
+                session.query(
+                    Zone.zone_name,
+                    Group.group_name,
+                    ZoneSegment.day_id,
+                    ZoneSegment.start_hour.label("hour"),
+                    ZoneSegment.zone_id,
+                    ZoneSegment.group_id,
+                    ZoneSegment.length.label("outage_hours"),
+                )
+                .select_from(ZoneSegment)
+                .join(Group, active_version(ZoneSegment))
+                .join(Day, Day.day_id == ZoneSegment.day_id)
+                .join(Zone, Zone.zone_id == ZoneSegment.zone_id)
+                .filter(and_(Day.day_name == day, Group.group_name == group))
+                .order_by(ZoneSegment.start_hour)
+                .all()
+            )
+
+    @staticmethod
+    def get_schedule_from_hours(day: str, group: str) -> list:
+        """
+        Schedule computed from hours with window functions, zone_segments
+        must always match it
         query:
             select zone_name, hour, count(*)
             from (
@@ -344,7 +854,7 @@ class SqlService:
                 )
                 .select_from(Hour)
                 .join(Zone, Zone.zone_id == Hour.zone_id)
-                .join(Group, Group.group_id == Hour.group_id)
+                .join(Group, active_version(Hour))
                 .join(Day, Day.day_id == Hour.day_id)
                 .filter(and_(Day.day_name == day, Group.group_name == group))
                 .subquery()
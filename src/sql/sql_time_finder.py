@@ -1,45 +1,205 @@
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 from datetime import timedelta
+from typing import Optional
 
 from pytz.tzinfo import BaseTzInfo
 
+import config
 from config import get_session_maker
-from src.sql.models.hour import Hour
 from src.sql.remind_obj import RemindObj
 from src.sql.sql_service import HourRepo, GroupRepo
 
 
+WEEK_HOURS = 7 * 24
+WEEK_MINUTES = WEEK_HOURS * 60
+
+# (start hour, stop hour) of a daily window, may wrap around midnight
+QuietWindow = tuple[int, int]
+
+
+def in_quiet_window(time: datetime, window: QuietWindow) -> bool:
+    start, stop = window
+    if start > stop:
+        return time.hour >= start or time.hour < stop
+    return start <= time.hour < stop
+
+
+def quiet_window_end(time: datetime, window: QuietWindow) -> datetime:
+    """
+    End of the window time is in, or of the next one
+    """
+    stop = time.replace(hour=window[1], minute=0, second=0, microsecond=0)
+    if stop <= time:
+        stop += timedelta(days=1)
+    return stop
+
+
+def touches_changes(
+    ranges: list[tuple[int, int]], now: datetime, change_time: datetime
+) -> bool:
+    """
+    True when a changed [start, stop) range of week hours (see
+    ScheduleRepo.update_group_schedule) falls between the current hour and
+    the hour of change_time, so a reminder for that change may be stale
+    """
+    start = now.weekday() * 24 + now.hour
+    span = (
+        change_time - now.replace(minute=0, second=0, microsecond=0)
+    ).total_seconds() // 3600
+    if span >= WEEK_HOURS:
+        return bool(ranges)
+    return any(
+        (hour - start) % WEEK_HOURS <= span
+        for range_start, range_stop in ranges
+        for hour in range(range_start, range_stop)
+    )
+
+
 class SqlTimeFinder:
     def __init__(self, group_name: str, timezone: BaseTzInfo):
         self.group_name = group_name
         self.tz = timezone
-        self.hours_in_week: list[Hour] = []
+        self.revision: Optional[int] = None
+        # zone code -> zone name
+        self.zone_names: list[str] = []
+        # zone code for every hour of the week, Monday 00:00 first
+        self.week = bytes()
+        # sorted hours of the week at which the zone changes
+        self.changes = array("H")
+        # notify_before -> (sorted remind minutes of the week, index in changes)
+        self.reminders: dict[int, tuple[array, array]] = {}
 
     def read_schedule(self) -> None:
         session_maker = get_session_maker()
         with session_maker() as session:
             grp = GroupRepo(session).get_group(self.group_name)
-            self.hours_in_week = HourRepo(session).get_hours_for_group(grp)
+            # version and hours in one read, a concurrent write can not
+            # pair the new revision with the old week
+            revision, zones = HourRepo(session).get_active_week(grp)
+            if revision is None:
+                revision = GroupRepo(session).get_revision(self.group_name)
+            self.revision = revision
+            self.load_week(zones)
+
+    def load_week(self, zones: list[str]) -> None:
+        """
+        Encode week of zone names and compile it into the timeline of
+        zone changes, with the remind timeline of every notify option
+        """
+        self.zone_names = sorted(set(zones))
+        codes = {name: code for code, name in enumerate(self.zone_names)}
+        week = bytes(codes[zone] for zone in zones)
+        # week[-1] is Sunday 23:00, so a change at Monday 00:00 wraps around
+        self.changes = array(
+            "H", [hour for hour in range(len(week)) if week[hour - 1] != week[hour]]
+        )
+        self.week = week
+        self.reminders = {
+            notify_before: self._remind_timeline(notify_before)
+            for notify_before in config.NOTIFY_BEFORE_OPTIONS
+        }
+
+    def _remind_timeline(self, notify_before: int) -> tuple[array, array]:
+        entries = sorted(
+            ((change * 60 - notify_before) % WEEK_MINUTES, index)
+            for index, change in enumerate(self.changes)
+        )
+        return (
+            array("I", [minute for minute, _ in entries]),
+            array("H", [index for _, index in entries]),
+        )
+
+    def remind_timeline(self, notify_before: int) -> tuple[array, array]:
+        """
+        Remind minutes of the week sorted, with the index in changes of
+        each, notify values outside NOTIFY_BEFORE_OPTIONS are compiled on
+        first use
+        """
+        timeline = self.reminders.get(notify_before)
+        if timeline is None:
+            timeline = self._remind_timeline(notify_before)
+            self.reminders[notify_before] = timeline
+        return timeline
 
     def get_hour(self, day: int, start_h: int) -> tuple[int, str]:
         hour_ind = day * 24 + start_h
-        zone = self.hours_in_week[hour_ind].zone.zone_name
+        zone = self.zone_names[self.week[hour_ind]]
         return hour_ind, zone
 
-    def __look_for_change_in_week(self, day: int, start_h: int) -> tuple[Hour, int]:
-        cur_hour_ind, cur_zone = self.get_hour(day, start_h)
-        # look for change from current hour to the end of the week
-        for hour in self.hours_in_week[cur_hour_ind:]:
-            if hour.zone.zone_name != cur_zone:
-                return hour, self.hours_in_week.index(hour) - cur_hour_ind
-
-        # look for change from start of the week to the current hour
-        for hour in self.hours_in_week[:cur_hour_ind]:
-            if hour.zone.zone_name != cur_zone:
-                return hour, len(
-                    self.hours_in_week
-                ) - cur_hour_ind + self.hours_in_week.index(hour)
-        raise ValueError("No change in zone found")
+    def change_zones(self, index: int) -> tuple[str, str]:
+        """
+        :return: (old zone, new zone) of changes[index]
+        """
+        hour = self.changes[index]
+        return (
+            self.zone_names[self.week[hour - 1]],
+            self.zone_names[self.week[hour]],
+        )
+
+    def next_change(self, hour_ind: int) -> tuple[int, int]:
+        """
+        First change after the hour of the week
+        :return: (hours until the change, index in changes)
+        """
+        if not self.changes:
+            raise ValueError("No change in zone found")
+        index = bisect_right(self.changes, hour_ind)
+        if index == len(self.changes):
+            return self.changes[0] + WEEK_HOURS - hour_ind, 0
+        return self.changes[index] - hour_ind, index
+
+    def next_allowed_reminder(
+        self,
+        after: datetime,
+        notify_before: int,
+        quiet_window: Optional[QuietWindow] = None,
+    ) -> RemindObj:
+        """
+        Reminder for the first zone change after the hour of the given time
+        whose reminder is not delivered inside quiet_window. The change is
+        found by a bisect over the remind timeline of notify_before, later
+        ones are only visited to skip the window. A reminder already due
+        at that time is sent right away (notify_now). If every change of
+        the week falls into the window, the first one is returned.
+        """
+        minutes, indexes = self.remind_timeline(notify_before)
+        if not indexes:
+            raise ValueError("No change in zone found")
+        hour_ind = after.weekday() * 24 + after.hour
+        # changes from the next hour on keep their order when shifted by
+        # notify_before, so the first of them is the first remind minute
+        # at or after the shifted start
+        start = ((hour_ind + 1) * 60 - notify_before) % WEEK_MINUTES
+        index = bisect_left(minutes, start)
+        next_hour = after.replace(minute=0, second=0, microsecond=0) + timedelta(
+            hours=1
+        )
+        first: Optional[RemindObj] = None
+        for step in range(len(indexes)):
+            pos = (index + step) % len(indexes)
+            change_time = next_hour + timedelta(
+                minutes=(minutes[pos] - start) % WEEK_MINUTES
+            )
+            remind_time = change_time - timedelta(minutes=notify_before)
+            notify_now = remind_time <= after
+            old_zone, new_zone = self.change_zones(indexes[pos])
+            remind = RemindObj(
+                group=self.group_name,
+                old_zone=old_zone,
+                new_zone=new_zone,
+                change_time=change_time,
+                remind_time=remind_time,
+                notify_now=notify_now,
+            )
+            delivered = after if notify_now else remind_time
+            if quiet_window is None or not in_quiet_window(delivered, quiet_window):
+                return remind
+            first = first or remind
+        if first is None:
+            raise ValueError("No change in zone found")
+        return first
 
     def find_next_remind_time(
         self, notify_before: int = 0, hours_add: int = 0
@@ -53,14 +213,12 @@ class SqlTimeFinder:
         else:
             start_time = datetime.now(tz=self.tz)
 
-        _, old_zone = self.get_hour(start_time.weekday(), start_time.hour)
-        change_h, hours_to_change = self.__look_for_change_in_week(
-            start_time.weekday(), start_time.hour
-        )
+        hour_ind, old_zone = self.get_hour(start_time.weekday(), start_time.hour)
+        hours_to_change, index = self.next_change(hour_ind)
+        _, new_zone = self.change_zones(index)
         zone_change_time = start_time.replace(minute=0, second=0) + timedelta(
             hours=hours_to_change
         )
-        new_zone = change_h.zone.zone_name
         diff = zone_change_time - datetime.now(self.tz)
         if diff.total_seconds() / 60 <= notify_before:
             notify_now = True
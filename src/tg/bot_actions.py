@@ -1,75 +1,141 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from math import floor
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional, cast
 
 from telegram import Update
 from telegram.ext import (
     Application,
     ContextTypes,
+    Job,
 )
 
 import config
+from src.metrics import (
+    LATE_AFTER,
+    REMINDERS_FIRED,
+    REMINDERS_LATE,
+    REMINDERS_SCHEDULED,
+    Registry,
+    Sampled,
+)
 from src.sql.models.subscription import Subscription
 from src.sql.models.user import User
 from src.sql.remind_obj import RemindObj
+from src.sql.schedule_cache import ScheduleCache
+from src.sql.async_sql_service import AsyncSqlService, submit
 from src.sql.sql_service import SqlService
-from src.sql.sql_time_finder import SqlTimeFinder
+from src.sql.sql_time_finder import (
+    SqlTimeFinder,
+    in_quiet_window,
+    quiet_window_end,
+    touches_changes,
+)
+from src.tg.instrumentation import instrument_methods
+from src.tg.job_index import JobIndex
+from src.tg.message_sender import MessageSender
+from src.tg.reminder_scheduler import JOBQUEUE_BACKEND, make_scheduler
+from src.tg.schedule_text_cache import ScheduleTextCache
+from src.tg.subscriber_index import SubscriberIndex
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 logger = logging.getLogger(__name__)
 
+FANOUT_JOB_PREFIX = "fanout_"
+
+
+SILENT_WINDOW = (config.SILENT_PERIOD_START, config.SILENT_PERIOD_STOP)
+
 
+def is_silent_period(time: datetime) -> bool:
+    return in_quiet_window(time, SILENT_WINDOW)
+
+
+def count_fired(remind_obj: RemindObj, delivered: int = 1) -> None:
+    REMINDERS_FIRED.inc(amount=delivered)
+    late = (datetime.now(config.tz) - remind_obj.remind_time).total_seconds()
+    if not remind_obj.notify_now and late > LATE_AFTER:
+        REMINDERS_LATE.inc(amount=delivered)
+
+
+@instrument_methods("_action")
 class BotActions:
-    time_finders: dict[str, SqlTimeFinder] = {}
+    schedule_cache = ScheduleCache(config.tz)
+    schedule_text = ScheduleTextCache()
 
-    def __init__(self, app: Application):
+    def __init__(
+        self,
+        app: Application,
+        fanout: bool = False,
+        scheduler_backend: str = JOBQUEUE_BACKEND,
+    ):
         self.app = app
+        # per-subscription reminders go through the scheduler backend,
+        # fan-out, help and housekeeping jobs stay on app.job_queue
+        self.scheduler = make_scheduler(app, scheduler_backend)
+        # fanout: one job per (group, remind_before) delivering to all its
+        # subscribers instead of one job per subscription
+        self.fanout = fanout
+        self.subscribers = SubscriberIndex()
+        self.fanout_jobs: dict[tuple[str, int], Job] = {}
+        self.sender = MessageSender()
+        self.reminder_jobs = JobIndex()
 
     async def subscribe_action(
         self, chat_id: int, group: str, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        if SqlService.subscribe_user(chat_id, group):
-            user = SqlService.get_user(chat_id)
-            self.schedule_notification_job(user, group)
-            await context.bot.send_message(
-                text=f"You are subscribed to {group}", chat_id=chat_id
+        if await AsyncSqlService.subscribe_user(chat_id, group):
+            user = await AsyncSqlService.get_user(chat_id)
+            await self.schedule_notification_job(user, group)
+            await self.sender.send(
+                context.bot, text=f"You are subscribed to {group}", chat_id=chat_id
             )
         else:
-            await context.bot.send_message(
-                text=f"You are already subscribed to {group}", chat_id=chat_id
+            await self.sender.send(
+                context.bot,
+                text=f"You are already subscribed to {group}",
+                chat_id=chat_id,
             )
 
     async def upd_notify_time_action(
         self, chat_id: int, notify_time: str, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        await context.bot.send_message(
+        await self.sender.send(
+            context.bot,
             chat_id=chat_id,
             text=f"You will be reminded {notify_time} minutes before zone change",
         )
-        subs = SqlService.get_subs_for_user(chat_id)
+        subs = await AsyncSqlService.get_subs_for_user(chat_id)
         await self.no_subscription_message(chat_id, subs, context)
         if len(subs) > 0:
-            user = SqlService.update_user(tg_id=chat_id, remind_before=int(notify_time))
-            for job in context.job_queue.get_jobs_by_name(str(chat_id)):
+            user = await AsyncSqlService.update_user(
+                tg_id=chat_id, remind_before=int(notify_time)
+            )
+            for job in self.reminder_jobs.remove_user(chat_id):
                 job.schedule_removal()
             for sub in subs:
-                self.schedule_notification_job(user, sub.group.group_name)
+                await self.schedule_notification_job(user, sub.group.group_name)
 
     async def suppress_notif_action(
         self, chat_id: int, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        user = SqlService.toggle_suppress_at_night(chat_id)
-        await context.bot.send_message(
+        user = await AsyncSqlService.toggle_suppress_at_night(chat_id)
+        await self.sender.send(
+            context.bot,
             chat_id=chat_id,
             text=f"Suppress at night status is "
             f"{'enabled' if user.suppress_night else 'disabled'}",
         )
-        jobs = context.job_queue.get_jobs_by_name(str(chat_id))
-
-        for job in jobs:
-            remind_obj = self._check_for_suppressed_notification(
+        if self.fanout:
+            self.subscribers.update_user(chat_id, suppress=user.suppress_night)
+            return
+        live = set()
+        for job in self.reminder_jobs.jobs_of(chat_id):
+            live.add(job.data.group)
+            remind_obj = await self._check_for_suppressed_notification(
                 job.data.group,
                 user.remind_before,
                 job.job.next_run_time,
@@ -77,103 +143,270 @@ class BotActions:
             )
             if remind_obj:
                 job.schedule_removal()
-                self.app.job_queue.run_once(
-                    self._notification,
-                    name=str(user.tg_id),
-                    when=1 if remind_obj.notify_now else remind_obj.remind_time,
-                    data=remind_obj,
-                    chat_id=user.tg_id,
-                )
+                self.run_notification_job(user.tg_id, remind_obj)
+        # reminders past config.REMINDER_HORIZON have no live job, only a
+        # stored row the load job would schedule with the old setting
+        now = datetime.now(config.tz)
+        stored = []
+        for sub in await AsyncSqlService.get_subs_for_user(chat_id):
+            if sub.group.group_name in live:
+                continue
+            remind_obj = self.next_remind(
+                await self.get_time_finder(sub.group.group_name),
+                user.remind_before,
+                user.suppress_night,
+                now,
+            )
+            if remind_obj.remind_time <= now + config.REMINDER_HORIZON:
+                self.run_notification_job(user.tg_id, remind_obj)
+            else:
+                stored.append((str(user.tg_id), remind_obj))
+        submit(SqlService.save_reminders, stored)
 
-    def get_time_finder(self, group: str) -> SqlTimeFinder:
-        if group not in self.time_finders:
-            self.time_finders[group] = SqlTimeFinder(group, config.tz)
-            self.time_finders[group].read_schedule()
-        return self.time_finders[group]
+    async def get_time_finder(self, group: str) -> SqlTimeFinder:
+        return await self.schedule_cache.get_async(group)
 
-    def schedule_notification_job(
-        self, user: User, group_name: str, hours_add: int = 0
+    async def schedule_notification_job(
+        self, user: User, group_name: str, after: Optional[datetime] = None
     ) -> None:
-        remind_obj = self._check_for_suppressed_notification(
-            group_name,
-            user.remind_before,
-            datetime.now(tz=config.tz) + timedelta(hours=hours_add),
-            suppress=user.suppress_night,
-        )
-        if remind_obj is None:
-            remind_obj = self.get_time_finder(group_name).find_next_remind_time(
-                notify_before=user.remind_before, hours_add=hours_add
+        finder = await self.get_time_finder(group_name)
+        if self.fanout:
+            self.subscribers.add(
+                user.tg_id, group_name, user.remind_before, user.suppress_night
             )
-        self.app.job_queue.run_once(
+            self.schedule_fanout_job(finder, user.remind_before)
+            return
+        remind_obj = self.next_remind(
+            finder, user.remind_before, user.suppress_night, after
+        )
+        self.run_notification_job(user.tg_id, remind_obj)
+
+    def next_remind(
+        self,
+        finder: SqlTimeFinder,
+        remind_before: int,
+        suppress: bool,
+        after: Optional[datetime] = None,
+    ) -> RemindObj:
+        """
+        Reminder for the first zone change after the given time (now by
+        default), past the silent period when suppress is set
+        """
+        return finder.next_allowed_reminder(
+            after or datetime.now(tz=config.tz),
+            remind_before,
+            SILENT_WINDOW if suppress else None,
+        )
+
+    def run_notification_job(
+        self, tg_id: int | str, remind_obj: RemindObj, persist: bool = True
+    ) -> None:
+        job = self.scheduler.run_once(
             self._notification,
-            name=str(user.tg_id),
+            name=str(tg_id),
             when=1 if remind_obj.notify_now else remind_obj.remind_time,
             data=remind_obj,
-            chat_id=user.tg_id,
+            chat_id=tg_id,
         )
+        REMINDERS_SCHEDULED.inc()
+        previous = self.reminder_jobs.add(tg_id, remind_obj.group, job)
+        if previous is not None and not previous.removed:
+            previous.schedule_removal()
+        if persist:
+            submit(SqlService.save_reminders, [(str(tg_id), remind_obj)])
+
+    def load_due_reminders(self, reminders: list[tuple[str, RemindObj]]) -> int:
+        """
+        Schedule stored reminders that have no live job yet
+        :return: number of scheduled reminders
+        """
+        loaded = 0
+        for chat_id, remind_obj in reminders:
+            if (chat_id, remind_obj.group) in self.reminder_jobs:
+                continue
+            self.run_notification_job(chat_id, remind_obj, persist=False)
+            loaded += 1
+        return loaded
+
+    async def _load_due_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        now = datetime.now(config.tz)
+        reminders = await AsyncSqlService.get_due_reminders(
+            now, now + config.REMINDER_HORIZON
+        )
+        self.load_due_reminders(reminders)
+
+    async def update_group_schedule(
+        self, group: str, table: list[list[str]]
+    ) -> list[tuple[int, int]]:
+        """
+        Store a new week for the group and reschedule the reminders it
+        invalidates
+        :return: changed [start, stop) ranges in hours of the week
+        """
+        changed = await AsyncSqlService.update_group_schedule(group, table)
+        if changed:
+            self.reschedule_group(
+                group, changed, await AsyncSqlService.get_group_reminders(group)
+            )
+        return changed
+
+    def reschedule_group(
+        self,
+        group: str,
+        changed: list[tuple[int, int]],
+        settings: list[tuple[str, int, bool, Optional[datetime]]],
+    ) -> int:
+        """
+        Recompute the reminders of the group subscribers whose pending
+        reminder lies past a changed hour, others are left alone. Reminders
+        due within config.REMINDER_HORIZON replace the live job, later ones
+        are only stored and picked up by the repeating load job.
+        :param settings: SqlService.get_group_reminders of the group
+        :return: number of recomputed reminders
+        """
+        finder = self.schedule_cache.reload(group)
+        self.schedule_text.invalidate(group)
+        now = datetime.now(config.tz)
+        if self.fanout:
+            keys = [
+                key
+                for key, job in self.fanout_jobs.items()
+                if key[0] == group
+                and touches_changes(changed, now, cast(RemindObj, job.data).change_time)
+            ]
+            for key in keys:
+                self.fanout_jobs.pop(key).schedule_removal()
+                self.schedule_fanout_job(finder, key[1])
+            return len(keys)
+        computed: dict[tuple[int, bool], RemindObj] = {}
+        rescheduled = []
+        for chat_id, remind_before, suppress, change_time in settings:
+            if (
+                change_time is not None
+                and change_time > now
+                and not touches_changes(changed, now, change_time)
+            ):
+                continue
+            if (remind_before, suppress) not in computed:
+                computed[(remind_before, suppress)] = self.next_remind(
+                    finder, remind_before, suppress, now
+                )
+            remind_obj = computed[(remind_before, suppress)]
+            rescheduled.append((chat_id, remind_obj))
+            if remind_obj.remind_time <= now + config.REMINDER_HORIZON:
+                self.run_notification_job(chat_id, remind_obj, persist=False)
+            else:
+                job = self.reminder_jobs.remove(chat_id, group)
+                if job is not None:
+                    job.schedule_removal()
+        submit(SqlService.save_reminders, rescheduled)
+        return len(rescheduled)
+
+    def schedule_fanout_job(
+        self, finder: SqlTimeFinder, remind_before: int, hours_add: int = 0
+    ) -> None:
+        """
+        Make sure the (group, remind_before) fan-out job exists,
+        hours_add > 0 replaces it with the reminder for the following change
+        """
+        group_name = finder.group_name
+        key = (group_name, remind_before)
+        job = self.fanout_jobs.get(key)
+        if job is not None and not job.removed and hours_add == 0:
+            return
+        remind_obj = finder.find_next_remind_time(
+            notify_before=remind_before, hours_add=hours_add
+        )
+        self.fanout_jobs[key] = self.app.job_queue.run_once(
+            self._fanout_notification,
+            name=f"{FANOUT_JOB_PREFIX}{group_name}_{remind_before}",
+            when=1 if remind_obj.notify_now else remind_obj.remind_time,
+            data=remind_obj,
+        )
+        REMINDERS_SCHEDULED.inc()
+
+    async def _fanout_notification(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        remind_obj = context.job.data
+        group = remind_obj.group
+        remind_before = round(
+            (remind_obj.change_time - remind_obj.remind_time).total_seconds() / 60
+        )
+        silent = is_silent_period(datetime.now(config.tz))
+        text = remind_obj.get_msg()
+        results = await asyncio.gather(
+            *(
+                self.sender.send(context.bot, chat_id=tg_id, text=text)
+                for tg_id, suppress in list(
+                    self.subscribers.subscribers(group, remind_before).items()
+                )
+                if not (suppress and silent)
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"{group} reminder was not delivered: {result}")
+        count_fired(
+            remind_obj, sum(not isinstance(result, Exception) for result in results)
+        )
+        if self.subscribers.subscribers(group, remind_before):
+            self.schedule_fanout_job(
+                await self.get_time_finder(group), remind_before, hours_add=1
+            )
+        else:
+            self.fanout_jobs.pop((group, remind_before), None)
 
     async def no_subscription_message(
         self, chat_id: int, subs: list[Subscription], context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         if len(subs) == 0:
-            await context.bot.send_message(
-                chat_id=chat_id, text=f"You are not subscribed, {chat_id}"
+            await self.sender.send(
+                context.bot, chat_id=chat_id, text=f"You are not subscribed, {chat_id}"
             )
 
     async def _notification(self, context: ContextTypes.DEFAULT_TYPE) -> None:
         chat_id = context.job.chat_id
-        user = SqlService.get_user(chat_id)
+        user = await AsyncSqlService.get_user(chat_id)
         remind_obj = context.job.data
-        await context.bot.send_message(
+        await self.sender.send(
+            context.bot,
             chat_id=chat_id,
             text=remind_obj.get_msg(),
         )
-        self.schedule_notification_job(user, remind_obj.group, hours_add=1)
+        count_fired(remind_obj)
+        self.reminder_jobs.discard(chat_id, remind_obj.group, context.job)
+        await AsyncSqlService.mark_reminder_sent(chat_id, remind_obj.group)
+        await self.schedule_notification_job(
+            user, remind_obj.group, after=remind_obj.change_time
+        )
 
-    def _check_for_suppressed_notification(
+    async def _check_for_suppressed_notification(
         self, group: str, remind_before: int, next_run: datetime, suppress: bool
     ) -> RemindObj | None:
+        """
+        Reminder replacing the one planned at next_run after suppress_night
+        was toggled, None when it can stay. Enabling moves reminders out of
+        the silent period, disabling brings back the ones pushed past it.
+        """
         now = datetime.now(config.tz)
-        today_silent_start = now.replace(
-            hour=config.SILENT_PERIOD_START, minute=0, second=0
-        )
-        tomorrow_silent_end = (now + timedelta(days=1)).replace(
-            hour=config.SILENT_PERIOD_STOP, minute=0, second=0
+        if suppress and not in_quiet_window(next_run, SILENT_WINDOW):
+            return None
+        if not suppress and next_run < quiet_window_end(now, SILENT_WINDOW):
+            return None
+        return self.next_remind(
+            await self.get_time_finder(group), remind_before, suppress, now
         )
 
-        if today_silent_start <= next_run <= tomorrow_silent_end and suppress:
-            hours_remaining = floor((tomorrow_silent_end - now).seconds / 3600)
-            next_remind = self.get_time_finder(group).find_next_remind_time(
-                notify_before=remind_before, hours_add=hours_remaining
-            )
-            return next_remind
-
-        if next_run >= tomorrow_silent_end and not suppress:
-            next_remind = self.get_time_finder(group).find_next_remind_time(
-                notify_before=remind_before
-            )
-            return next_remind
-
-        return None
-
     async def unsubscribe_action(
         self, chat_id: int, group: str, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        deleted_jobs = list(
-            map(
-                lambda job: job.schedule_removal(),
-                filter(
-                    lambda job: job.data.group == group,
-                    context.job_queue.get_jobs_by_name(str(chat_id)),
-                ),
-            )
-        )
-        if len(deleted_jobs) > 0:
-            await context.bot.send_message(
-                chat_id=chat_id, text=f"Removed jobs: {len(deleted_jobs)}"
-            )
-        SqlService.delete_subs_for_user_group(chat_id, group)
-        SqlService.delete_no_sub_user(chat_id)
+        job = self.reminder_jobs.remove(chat_id, group)
+        if job is not None:
+            job.schedule_removal()
+            await self.sender.send(context.bot, chat_id=chat_id, text="Removed jobs: 1")
+        self.subscribers.remove(chat_id, group)
+        await AsyncSqlService.delete_subs_for_user_group(chat_id, group)
+        await AsyncSqlService.delete_no_sub_user(chat_id)
 
     async def get_schedule_for_day(
         self,
@@ -183,56 +416,46 @@ class BotActions:
         today: bool = False,
     ) -> None:
         cur_date = datetime.now(tz=config.tz)
-
-        def fancy_schedule(raw_schedule: list, zone_arrow: bool) -> list[str]:
-            cur_zone_found = False
-            cur_hour = cur_date.hour
-            res = []
-            for row in raw_schedule:
-                line = ""
-                if cur_hour < row.hour and zone_arrow and not cur_zone_found:
-                    line += "→"
-                    cur_zone_found = True
-                line += (
-                    f"{RemindObj.symbol(row.zone_name)} {row.hour}:00 {row.zone_name}"
-                )
-                res.append(line)
-            return res
-
-        subs = SqlService.get_subs_for_user(chat_id)
+        subs = await AsyncSqlService.get_subs_for_user(chat_id)
         await self.no_subscription_message(chat_id, subs, context)
         for sub in subs:
-            schedule = fancy_schedule(
-                SqlService.get_schedule_for(day, sub.group.group_name), today
-            )
-            await context.bot.send_message(
+            group = sub.group.group_name
+            # the finder may need a load or a revision check, both block
+            revision = self.schedule_cache.checked_revision(group)
+            if revision is None:
+                revision = await AsyncSqlService.get_revision(group)
+            rendered = await self.schedule_text.get(day, group, revision)
+            schedule = rendered.overlay(cur_date.hour) if today else rendered.lines
+            await self.sender.send(
+                context.bot,
                 chat_id=chat_id,
-                text="\n".join(
-                    [f"Schedule for {day} for {sub.group.group_name}:"] + schedule
-                ),
+                text="\n".join([f"Schedule for {day} for {group}:"] + schedule),
             )
 
     async def status_action(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         chat_id = update.effective_user.id
-        subs = SqlService.get_subs_for_user(chat_id)
+        subs = await AsyncSqlService.get_subs_for_user(chat_id)
         await self.no_subscription_message(chat_id, subs, context)
         for sub in subs:
-            remind_obj = self.get_time_finder(
-                sub.group.group_name
-            ).find_next_remind_time(notify_before=sub.user.remind_before)
-            await context.bot.send_message(
+            finder = await self.get_time_finder(sub.group.group_name)
+            remind_obj = finder.find_next_remind_time(
+                notify_before=sub.user.remind_before
+            )
+            await self.sender.send(
+                context.bot,
                 chat_id=chat_id,
                 text=remind_obj.get_msg(),
             )
 
     def get_jobs(self) -> list[str]:
         df = "%m-%d-%Y, %H:%M %Z"
-        jobs = self.app.job_queue.jobs()
+        jobs = self.scheduler.jobs()
         header = (
             f"Server time {datetime.now().strftime(df)} \n"
             f"Server time in EEST {datetime.now(config.tz).strftime(df)} \n"
+            f"{self.schedule_text_stats()} \n"
         )
 
         ex_jobs = [
@@ -243,12 +466,64 @@ class BotActions:
         ]
         return [header] + ex_jobs
 
+    def schedule_text_stats(self) -> str:
+        stats = self.schedule_text.stats()
+        return (
+            f"Schedule text cache: hit rate {stats['hit_rate']:.1%}, "
+            f"{stats['misses']} renders, {stats['render_ms']:.2f} ms per render"
+        )
+
+    def register_metrics(self, registry: Registry) -> None:
+        """
+        Queue sizes and cache counters of this instance, read on scrape
+        """
+        for metric in [
+            Sampled(
+                "blackout_job_queue_size",
+                "Jobs in the application job queue",
+                lambda: len(self.app.job_queue.jobs()),
+            ),
+            Sampled(
+                "blackout_reminder_jobs",
+                "Live per-subscription reminder jobs",
+                lambda: len(self.reminder_jobs),
+            ),
+            Sampled(
+                "blackout_send_queue_depth",
+                "Messages waiting for or in a send_message call",
+                lambda: self.sender.pending,
+            ),
+            Sampled(
+                "blackout_messages_total",
+                "Send attempts by result",
+                lambda: {
+                    ("sent",): self.sender.sent,
+                    ("retried",): self.sender.retries,
+                    ("failed",): self.sender.failed,
+                },
+                labels=("result",),
+                kind="counter",
+            ),
+            Sampled(
+                "blackout_time_finder_cache_total",
+                "Time finder cache lookups by result",
+                lambda: {
+                    ("hit",): self.schedule_cache.hits,
+                    ("miss",): self.schedule_cache.misses,
+                    ("reload",): self.schedule_cache.reloads,
+                },
+                labels=("result",),
+                kind="counter",
+            ),
+        ]:
+            registry.register(metric)
+
     def show_help(self) -> None:
         users = SqlService.get_all_users()
 
         async def message_func(context: ContextTypes.DEFAULT_TYPE) -> None:
-            await context.bot.send_message(
-                chat_id=context.job.chat_id, text=context.job.data
+            await self.sender.send(
+                context.bot, chat_id=context.job.chat_id, text=context.job.data
             )
 
         for user in users:
@@ -263,6 +538,41 @@ class BotActions:
                 SqlService.update_user(user.tg_id, show_help=False)
 
     def create_jobs(self) -> None:
-        subs = SqlService.get_all_subs()
-        for sub in subs:
-            self.schedule_notification_job(sub.user, sub.group.group_name)
+        """
+        Compute reminders for subscriptions without a stored pending one,
+        once per (group, remind_before, suppress_night) bucket, then schedule
+        stored reminders due within config.REMINDER_HORIZON. Later reminders
+        are picked up by a repeating job. Fan-out mode keeps nothing on disk.
+        """
+        if self.fanout:
+            self.subscribers.load(SqlService.get_reminder_settings())
+            for group_name, remind_before in list(self.subscribers.buckets):
+                self.schedule_fanout_job(
+                    self.schedule_cache.get(group_name), remind_before
+                )
+            return
+        now = datetime.now(config.tz)
+        buckets: dict[tuple[str, int, bool], list[str]] = defaultdict(list)
+        for (
+            tg_id,
+            group_name,
+            remind_before,
+            suppress,
+        ) in SqlService.get_unscheduled_settings(now):
+            buckets[(group_name, remind_before, suppress)].append(tg_id)
+        computed: list[tuple[str, RemindObj]] = []
+        for (group_name, remind_before, suppress), tg_ids in buckets.items():
+            remind_obj = self.next_remind(
+                self.schedule_cache.get(group_name), remind_before, suppress
+            )
+            computed.extend((tg_id, remind_obj) for tg_id in tg_ids)
+        SqlService.save_reminders(computed)
+        self.load_due_reminders(
+            SqlService.get_due_reminders(now, now + config.REMINDER_HORIZON)
+        )
+        self.app.job_queue.run_repeating(
+            self._load_due_job,
+            interval=config.REMINDER_HORIZON / 2,
+            first=config.REMINDER_HORIZON / 2,
+            name="load_due_reminders",
+        )
@@ -0,0 +1,69 @@
+import functools
+import inspect
+import logging
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+import config
+from src.metrics import (
+    UPDATE_ROWS,
+    UPDATE_SECONDS,
+    UPDATE_STATEMENTS,
+    UpdateStats,
+    current_update,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+C = TypeVar("C", bound=type)
+
+
+def instrumented(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """
+    Record wall time, SQL statements and rows fetched of every call. The
+    outermost call owns the update and logs it when it takes longer than
+    config.SLOW_UPDATE_SECONDS, nested calls record their own share
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        stats = current_update.get()
+        token = None
+        if stats is None:
+            stats = UpdateStats()
+            token = current_update.set(stats)
+        statements, rows = stats.statements, stats.rows
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            UPDATE_SECONDS.observe(elapsed, name)
+            UPDATE_STATEMENTS.observe(stats.statements - statements, name)
+            UPDATE_ROWS.observe(stats.rows - rows, name)
+            if token is not None:
+                current_update.reset(token)
+                if elapsed > config.SLOW_UPDATE_SECONDS:
+                    logger.warning(
+                        f"slow update {name}: {elapsed * 1000:.0f} ms, "
+                        f"{stats.statements} statements, {stats.rows} rows"
+                    )
+
+    return wrapper
+
+
+def instrument_methods(suffix: str) -> Callable[[C], C]:
+    """
+    Class decorator applying instrumented to every coroutine method whose
+    name ends with suffix
+    """
+
+    def decorate(cls: C) -> C:
+        for name, method in list(vars(cls).items()):
+            if name.endswith(suffix) and inspect.iscoroutinefunction(method):
+                setattr(cls, name, instrumented(method))
+        return cls
+
+    return decorate
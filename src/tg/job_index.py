@@ -0,0 +1,65 @@
+from typing import Any
+
+
+class JobIndex:
+    """
+    Live reminder jobs per chat, chat_id -> {group: job}, so per-user
+    operations do not scan the whole job queue
+    """
+
+    def __init__(self) -> None:
+        self.chats: dict[str, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(jobs) for jobs in self.chats.values())
+
+    def __contains__(self, key: tuple[int | str, str]) -> bool:
+        return self.get(*key) is not None
+
+    def add(self, chat_id: int | str, group: str, job: Any) -> Any:
+        """
+        :return: the job previously indexed for (chat_id, group) or None
+        """
+        jobs = self.chats.setdefault(str(chat_id), {})
+        previous = jobs.get(group)
+        jobs[group] = job
+        return previous
+
+    def get(self, chat_id: int | str, group: str) -> Any:
+        job = self.chats.get(str(chat_id), {}).get(group)
+        if job is None or job.removed:
+            return None
+        return job
+
+    def jobs_of(self, chat_id: int | str) -> list[Any]:
+        return [
+            job for job in self.chats.get(str(chat_id), {}).values() if not job.removed
+        ]
+
+    def remove(self, chat_id: int | str, group: str) -> Any:
+        """
+        Drop (chat_id, group) from the index
+        :return: its live job or None
+        """
+        chat_id = str(chat_id)
+        jobs = self.chats.get(chat_id)
+        if jobs is None:
+            return None
+        job = jobs.pop(group, None)
+        if not jobs:
+            del self.chats[chat_id]
+        if job is None or job.removed:
+            return None
+        return job
+
+    def remove_user(self, chat_id: int | str) -> list[Any]:
+        jobs = self.jobs_of(chat_id)
+        self.chats.pop(str(chat_id), None)
+        return jobs
+
+    def discard(self, chat_id: int | str, group: str, job: Any) -> None:
+        """
+        Drop job once it has run, unless a newer one took its place
+        """
+        if self.chats.get(str(chat_id), {}).get(group) is job:
+            self.remove(chat_id, group)
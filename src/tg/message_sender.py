@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from telegram import Bot, Message
+from telegram.error import NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+# telegram flood limits: ~30 messages per second overall, ~1 per second per chat
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+CHAT_RATE = 1.0
+CHAT_BURST = 3
+MAX_CONCURRENT = 8
+MAX_RETRIES = 3
+BACKOFF = 0.5
+CHAT_BUCKETS = 10_000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def delay(self) -> float:
+        """
+        Take a token, return seconds to wait before it may be used
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hold every token back for seconds, e.g. after a flood limit
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def paused_for(self) -> float:
+        return max(self.paused_until - time.monotonic(), 0.0)
+
+
+class MessageSender:
+    """
+    Single way out for bot messages: global and per chat token buckets,
+    bounded concurrency and retries on flood control and timeouts. Only
+    the request itself holds a concurrency slot, throttling and retry
+    waits do not
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        max_concurrent: int = MAX_CONCURRENT,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.global_bucket = TokenBucket(global_rate, GLOBAL_BURST)
+        self.chat_rate = chat_rate
+        self.chat_buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pending = 0
+        self.max_pending = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.throttled_seconds = 0.0
+
+    async def send(
+        self, bot: Bot, chat_id: int | str, text: str, **kwargs: Any
+    ) -> Message:
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        try:
+            return await self._send_with_retry(bot, chat_id, text, **kwargs)
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "throttled_seconds": self.throttled_seconds,
+        }
+
+    async def _send_with_retry(
+        self, bot: Bot, chat_id: int | str, text: str, **kwargs: Any
+    ) -> Message:
+        attempt = 0
+        while True:
+            await self._throttle(chat_id)
+            try:
+                async with self._get_semaphore():
+                    message = await bot.send_message(
+                        chat_id=chat_id, text=text, **kwargs
+                    )
+                self.sent += 1
+                return message
+            except (RetryAfter, TimedOut, NetworkError) as e:
+                if attempt >= self.max_retries:
+                    self.failed += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                if isinstance(e, RetryAfter):
+                    wait = float(e.retry_after)
+                    # the flood limit is bot wide, every send waits it out
+                    # in _throttle
+                    self.global_bucket.pause(wait)
+                else:
+                    wait = BACKOFF * 2 ** (attempt - 1)
+                logger.warning(f"send to {chat_id} failed: {e}, retry in {wait}s")
+                if not isinstance(e, RetryAfter):
+                    # backoff is per message, outside the concurrency slot
+                    await asyncio.sleep(wait)
+            except Exception:
+                self.failed += 1
+                raise
+
+    async def _throttle(self, chat_id: int | str) -> None:
+        wait = max(self.global_bucket.delay(), self._chat_bucket(chat_id).delay())
+        while wait > 0:
+            self.throttled_seconds += wait
+            await asyncio.sleep(wait)
+            # a flood limit hit by another send while this one waited
+            wait = self.global_bucket.paused_for()
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        key = str(chat_id)
+        bucket = self.chat_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, CHAT_BURST)
+            self.chat_buckets[key] = bucket
+            if len(self.chat_buckets) > CHAT_BUCKETS:
+                self.chat_buckets.popitem(last=False)
+        else:
+            self.chat_buckets.move_to_end(key)
+        return bucket
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        return self._semaphore
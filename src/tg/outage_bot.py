@@ -1,4 +1,5 @@
 import logging
+import time
 from datetime import datetime, timedelta
 from enum import Enum
 
@@ -12,8 +13,13 @@ from telegram.ext import (
 )
 
 import config
-from src.sql.sql_service import SqlService
+from src.metrics import HANDLER_LATENCY, REGISTRY
+from src.rest.hello import make_server
+from src.sql.async_sql_service import AsyncSqlService, flush
 from src.tg.bot_actions import BotActions
+from src.tg.instrumentation import instrument_methods
+from src.tg.reminder_scheduler import JOBQUEUE_BACKEND
+from src.tg.webhook import WEBHOOK_PATH, run_webhook, webhook_handler
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -33,16 +39,25 @@ class KeyboardCommands(Enum):
     SUPPRESS = "suppress"
 
 
+COMMANDS = {command.value for command in KeyboardCommands}
+
+
+@instrument_methods("_handler")
 class OutageBot:
 
-    def __init__(self, app: Application):
+    def __init__(
+        self,
+        app: Application,
+        fanout: bool = False,
+        scheduler_backend: str = JOBQUEUE_BACKEND,
+    ):
         self.app = app
-        self.actions = BotActions(app)
+        self.actions = BotActions(app, fanout, scheduler_backend)
 
     async def subscribe_handler(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        groups = SqlService.get_all_groups()
+        groups = await AsyncSqlService.get_all_groups()
         grp_names = list(map(lambda grp: grp.group_name, groups))
         grp_names.sort()
         keyboard = [
@@ -55,7 +70,8 @@ class OutageBot:
             for grp_name in grp_names
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await context.bot.send_message(
+        await self.actions.sender.send(
+            context.bot,
             chat_id=update.effective_user.id,
             text="Choose group",
             reply_markup=reply_markup,
@@ -65,18 +81,16 @@ class OutageBot:
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         chat_id = update.effective_user.id
-        deleted_jobs = list(
-            map(
-                lambda job: job.schedule_removal(),
-                context.job_queue.get_jobs_by_name(str(chat_id)),
-            )
+        deleted_jobs = self.actions.reminder_jobs.remove_user(chat_id)
+        for job in deleted_jobs:
+            job.schedule_removal()
+        await self.actions.sender.send(
+            context.bot, chat_id=chat_id, text=f"Removed jobs: {len(deleted_jobs)}"
         )
-        await context.bot.send_message(
-            chat_id=chat_id, text=f"Removed jobs: {len(deleted_jobs)}"
-        )
-        SqlService.delete_user_with_subs(chat_id)
-        await context.bot.send_message(
-            chat_id=chat_id, text="Stopped notifications for all groups"
+        self.actions.subscribers.remove_user(chat_id)
+        await AsyncSqlService.delete_user_with_subs(chat_id)
+        await self.actions.sender.send(
+            context.bot, chat_id=chat_id, text="Stopped notifications for all groups"
         )
 
     async def start_handler(
@@ -116,7 +130,8 @@ class OutageBot:
         ]
 
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await context.bot.send_message(
+        await self.actions.sender.send(
+            context.bot,
             chat_id=update.effective_user.id,
             text="Please choose:",
             reply_markup=reply_markup,
@@ -125,7 +140,7 @@ class OutageBot:
     async def config_handler(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
-        user = SqlService.get_user(update.effective_user.id)
+        user = await AsyncSqlService.get_user(update.effective_user.id)
 
         keyboard = [
             [
@@ -148,7 +163,8 @@ class OutageBot:
         )
 
         reply_markup = InlineKeyboardMarkup(keyboard)
-        await context.bot.send_message(
+        await self.actions.sender.send(
+            context.bot,
             chat_id=update.effective_user.id,
             text=(
                 "Config options"
@@ -164,7 +180,7 @@ class OutageBot:
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> None:
         chat_id = update.effective_user.id
-        subs = SqlService.get_subs_for_user(chat_id)
+        subs = await AsyncSqlService.get_subs_for_user(chat_id)
         keyboard = [
             [
                 InlineKeyboardButton(
@@ -176,13 +192,15 @@ class OutageBot:
             for sub in subs
         ]
         if len(subs) == 0:
-            await context.bot.send_message(
+            await self.actions.sender.send(
+                context.bot,
                 chat_id=update.effective_user.id,
                 text="You are not subscribed to any group",
             )
         else:
             reply_markup = InlineKeyboardMarkup(keyboard)
-            await context.bot.send_message(
+            await self.actions.sender.send(
+                context.bot,
                 chat_id=update.effective_user.id,
                 text="Unsubscribe from",
                 reply_markup=reply_markup,
@@ -198,17 +216,20 @@ class OutageBot:
     ) -> None:
         df = "%m-%d-%Y, %H:%M %Z"
         chat_id = str(update.effective_user.id)
-        jobs = context.job_queue.jobs()
+        jobs = self.actions.scheduler.jobs()
         list_of_jobs = ""
         list_of_jobs += f"Server time {datetime.now().strftime(df)} \n"
         list_of_jobs += f"Server time in EEST {datetime.now(config.tz).strftime(df)} \n"
+        list_of_jobs += f"{self.actions.schedule_text_stats()} \n"
         for i, job in enumerate(jobs):
             list_of_jobs += (
                 f"Job queue: {i} '{job.job.next_run_time.strftime(df)}'"
                 f" '{job.job.id}' "
                 f" '{job.data}'\n\n"
             )
-        await context.bot.send_message(text=f"{list_of_jobs}", chat_id=chat_id)
+        await self.actions.sender.send(
+            context.bot, text=f"{list_of_jobs}", chat_id=chat_id
+        )
 
     async def today_handler(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
@@ -225,6 +246,19 @@ class OutageBot:
         await self.actions.get_schedule_for_day(chat_id, day, context)
 
     async def keyboard_handler(self, update: Update, callback: CallbackContext) -> None:
+        started = time.perf_counter()
+        command = update.callback_query.data.split("_")[0]
+        try:
+            await self._keyboard_command(update, callback)
+        finally:
+            HANDLER_LATENCY.observe(
+                time.perf_counter() - started,
+                command if command in COMMANDS else "unknown",
+            )
+
+    async def _keyboard_command(
+        self, update: Update, callback: CallbackContext
+    ) -> None:
         query = update.callback_query
         await query.answer(text=f"Selected option: {query.data}")
         match query.data.split("_"):
@@ -261,8 +295,41 @@ class OutageBot:
 
 
 def main(token: str) -> None:
-    application = Application.builder().token(token).build()
-    outage_bot = OutageBot(application)
+    """
+    Run the bot, in webhook mode when config.WEBHOOK_URL is set. The
+    health check and the webhook are served by one HTTP server in the bot's
+    event loop on config.HTTP_PORT.
+    """
+    if config.WEBHOOK_URL and not config.HTTP_PORT:
+        raise ValueError("Webhook mode needs PORT for the http server")
+    secret = config.WEBHOOK_SECRET or ""
+    if config.WEBHOOK_URL and not secret:
+        # without it anyone reaching the server could post updates
+        raise ValueError("Webhook mode needs BLACKOUT_WEBHOOK_SECRET")
+    server = make_server()
+
+    async def start_services(_: Application) -> None:
+        outage_bot.actions.scheduler.start()
+        if config.HTTP_PORT:
+            await server.start(config.HTTP_HOST, config.HTTP_PORT)
+
+    async def stop_services(_: Application) -> None:
+        await server.stop()
+        await outage_bot.actions.scheduler.stop()
+
+    application = (
+        Application.builder()
+        .token(token)
+        .post_init(start_services)
+        .post_shutdown(stop_services)
+        .build()
+    )
+    outage_bot = OutageBot(
+        application,
+        fanout=config.FANOUT_NOTIFICATIONS,
+        scheduler_backend=config.SCHEDULER_BACKEND,
+    )
+    outage_bot.actions.register_metrics(REGISTRY)
     start_handler = CommandHandler("start", outage_bot.start_handler)
     subscribe_handler = CommandHandler("subscribe", outage_bot.subscribe_handler)
     unsubscribe_handler = CommandHandler("unsubscribe", outage_bot.unsubscribe_handler)
@@ -282,4 +349,9 @@ def main(token: str) -> None:
     application.add_handler(tomorrow_handler)
     outage_bot.actions.create_jobs()
     outage_bot.actions.show_help()
-    application.run_polling()
+    if config.WEBHOOK_URL:
+        server.route("POST", WEBHOOK_PATH, webhook_handler(application, secret))
+        run_webhook(application, config.WEBHOOK_URL, secret)
+    else:
+        application.run_polling()
+    flush()
@@ -0,0 +1,263 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Coroutine, Optional, Union, cast
+
+from telegram.ext import Application, Job, JobQueue
+
+import config
+
+logger = logging.getLogger(__name__)
+
+JOBQUEUE_BACKEND = "jobqueue"
+HEAP_BACKEND = "heap"
+
+ReminderCallback = Callable[[Any], Coroutine[Any, Any, None]]
+
+
+class ReminderHandle:
+    """
+    Heap entry of one reminder, exposes the parts of telegram.ext.Job
+    the bot uses (name, chat_id, data, removed, schedule_removal, job)
+    """
+
+    __slots__ = (
+        "when",
+        "seq",
+        "callback",
+        "data",
+        "chat_id",
+        "name",
+        "removed",
+        "_owner",
+    )
+
+    def __init__(
+        self,
+        owner: "HeapScheduler",
+        when: float,
+        seq: int,
+        callback: ReminderCallback,
+        data: Any,
+        chat_id: Optional[int | str],
+        name: Optional[str],
+    ):
+        self._owner = owner
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.data = data
+        self.chat_id = chat_id
+        self.name = name
+        self.removed = False
+
+    def __lt__(self, other: "ReminderHandle") -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    @property
+    def next_run_time(self) -> datetime:
+        return datetime.fromtimestamp(self.when, config.tz)
+
+    @property
+    def id(self) -> str:
+        return str(self.seq)
+
+    @property
+    def job(self) -> "ReminderHandle":
+        # Job.job is the APScheduler job, only next_run_time is read from it
+        return self
+
+    def schedule_removal(self) -> None:
+        if not self.removed:
+            self.removed = True
+            self._owner._cancelled(self)
+
+
+class ReminderContext:
+    """
+    What a reminder callback receives instead of a CallbackContext
+    """
+
+    __slots__ = ("application", "bot", "job")
+
+    def __init__(self, application: Application, job: ReminderHandle):
+        self.application = application
+        self.bot = application.bot
+        self.job = job
+
+
+class JobQueueScheduler:
+    """
+    Default backend, one APScheduler job per reminder
+    """
+
+    def __init__(self, app: Application):
+        self.app = app
+
+    @property
+    def job_queue(self) -> JobQueue:
+        job_queue = self.app.job_queue
+        assert job_queue is not None, "application was built without a JobQueue"
+        return job_queue
+
+    def run_once(
+        self,
+        callback: ReminderCallback,
+        when: Union[float, datetime],
+        data: Any = None,
+        name: Optional[str] = None,
+        chat_id: Optional[int | str] = None,
+    ) -> Job:
+        # stored reminders carry str chat ids, the job only passes it through
+        return self.job_queue.run_once(
+            callback,
+            when=when,
+            data=data,
+            name=name,
+            chat_id=cast(Optional[int], chat_id),
+        )
+
+    def get_jobs_by_name(self, name: str) -> list:
+        return list(self.job_queue.get_jobs_by_name(name))
+
+    def jobs(self) -> list:
+        return list(self.job_queue.jobs())
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class HeapScheduler:
+    """
+    All reminders in one min-heap driven by a single asyncio task.
+    Insert is O(log n), cancel marks the entry and the heap is rebuilt
+    once more than half of it is cancelled
+    """
+
+    def __init__(self, app: Application):
+        self.app = app
+        self.heap: list[ReminderHandle] = []
+        self.removed = 0
+        self.fired = 0
+        self._seq = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self.heap) - self.removed
+
+    def run_once(
+        self,
+        callback: ReminderCallback,
+        when: Union[float, datetime],
+        data: Any = None,
+        name: Optional[str] = None,
+        chat_id: Optional[int | str] = None,
+    ) -> ReminderHandle:
+        """
+        :param when: datetime or seconds from now, like JobQueue.run_once
+        """
+        timestamp = (
+            when.timestamp() if isinstance(when, datetime) else time.time() + when
+        )
+        handle = ReminderHandle(
+            self, timestamp, next(self._seq), callback, data, chat_id, name
+        )
+        heapq.heappush(self.heap, handle)
+        if self.heap[0] is handle and self._wakeup is not None:
+            self._wakeup.set()
+        return handle
+
+    def _cancelled(self, handle: ReminderHandle) -> None:
+        self.removed += 1
+        if self.removed > len(self.heap) // 2:
+            self.heap = [entry for entry in self.heap if not entry.removed]
+            heapq.heapify(self.heap)
+            self.removed = 0
+
+    def get_jobs_by_name(self, name: str) -> list[ReminderHandle]:
+        return [
+            entry for entry in self.heap if not entry.removed and entry.name == name
+        ]
+
+    def jobs(self) -> list[ReminderHandle]:
+        return sorted(entry for entry in self.heap if not entry.removed)
+
+    def pop_due(self, now: float) -> list[ReminderHandle]:
+        """
+        Take every live reminder due at now off the heap
+        """
+        due = []
+        while self.heap and self.heap[0].when <= now:
+            handle = heapq.heappop(self.heap)
+            if handle.removed:
+                self.removed -= 1
+                continue
+            handle.removed = True
+            due.append(handle)
+        return due
+
+    def _fire(self, handle: ReminderHandle) -> None:
+        task: asyncio.Task = asyncio.create_task(
+            handle.callback(ReminderContext(self.app, handle))
+        )
+        self._running.add(task)
+        task.add_done_callback(self._finished)
+        self.fired += 1
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"reminder callback failed: {task.exception()}")
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        assert wakeup is not None, "started without a wakeup event"
+        while True:
+            wakeup.clear()
+            for handle in self.pop_due(time.time()):
+                self._fire(handle)
+            if not self.heap:
+                await wakeup.wait()
+                continue
+            try:
+                await asyncio.wait_for(
+                    wakeup.wait(), max(self.heap[0].when - time.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """
+        Start the driver task, needs a running event loop
+        """
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+
+def make_scheduler(
+    app: Application, backend: str = JOBQUEUE_BACKEND
+) -> JobQueueScheduler | HeapScheduler:
+    if backend == HEAP_BACKEND:
+        return HeapScheduler(app)
+    if backend == JOBQUEUE_BACKEND:
+        return JobQueueScheduler(app)
+    raise ValueError(f"Unknown scheduler backend {backend}")
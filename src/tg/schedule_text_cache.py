@@ -0,0 +1,95 @@
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Optional
+
+from src.sql.async_sql_service import AsyncSqlService
+from src.sql.remind_obj import RemindObj
+
+CACHE_SIZE = 64 * 7
+
+
+class RenderedDay:
+    """
+    Schedule lines of one group for one weekday, without the current
+    hour marker
+    """
+
+    __slots__ = ("revision", "hours", "lines")
+
+    def __init__(self, revision: Optional[int], hours: list[int], lines: list[str]):
+        self.revision = revision
+        self.hours = hours
+        self.lines = lines
+
+    def overlay(self, cur_hour: int) -> list[str]:
+        """
+        Lines with "→" in front of the first zone starting after cur_hour
+        """
+        index = bisect_right(self.hours, cur_hour)
+        if index == len(self.lines):
+            return self.lines
+        lines = list(self.lines)
+        lines[index] = "→" + lines[index]
+        return lines
+
+
+class ScheduleTextCache:
+    """
+    LRU cache of rendered (group, day) schedules, an entry is rendered
+    again when the group's schedule revision changes
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self.days: OrderedDict[tuple[str, str], RenderedDay] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.render_time = 0.0
+
+    async def get(self, day: str, group: str, revision: Optional[int]) -> RenderedDay:
+        key = (group, day)
+        rendered = self.days.get(key)
+        if rendered is not None and rendered.revision == revision:
+            self.hits += 1
+            self.days.move_to_end(key)
+            return rendered
+        self.misses += 1
+        started = time.perf_counter()
+        rendered = self.render(
+            await AsyncSqlService.get_schedule_for(day, group), revision
+        )
+        self.render_time += time.perf_counter() - started
+        self.days[key] = rendered
+        self.days.move_to_end(key)
+        while len(self.days) > self.max_size:
+            self.days.popitem(last=False)
+        return rendered
+
+    @staticmethod
+    def render(rows: list, revision: Optional[int]) -> RenderedDay:
+        return RenderedDay(
+            revision,
+            [row.hour for row in rows],
+            [
+                f"{RemindObj.symbol(row.zone_name)} {row.hour}:00 {row.zone_name}"
+                for row in rows
+            ],
+        )
+
+    def invalidate(self, group: Optional[str] = None) -> None:
+        if group is None:
+            self.days.clear()
+            return
+        for key in [key for key in self.days if key[0] == group]:
+            del self.days[key]
+
+    def stats(self) -> dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.days),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "render_ms": self.render_time / self.misses * 1000 if self.misses else 0.0,
+        }
@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+
+class SubscriberIndex:
+    """
+    In-memory view of subscriptions for fan-out notifications,
+    (group, remind_before) -> {tg_id: suppress_night}
+    """
+
+    def __init__(self) -> None:
+        self.buckets: dict[tuple[str, int], dict[str, bool]] = defaultdict(dict)
+        self.users: dict[str, dict[str, int]] = defaultdict(dict)
+
+    def load(self, settings: list[tuple[str, str, int, bool]]) -> None:
+        for tg_id, group, remind_before, suppress in settings:
+            self.add(tg_id, group, remind_before, suppress)
+
+    def add(
+        self, tg_id: int | str, group: str, remind_before: int, suppress: bool
+    ) -> None:
+        tg_id = str(tg_id)
+        self.remove(tg_id, group)
+        self.buckets[(group, remind_before)][tg_id] = suppress
+        self.users[tg_id][group] = remind_before
+
+    def remove(self, tg_id: int | str, group: str) -> None:
+        tg_id = str(tg_id)
+        remind_before = self.users.get(tg_id, {}).pop(group, None)
+        if remind_before is None:
+            return
+        bucket = self.buckets[(group, remind_before)]
+        bucket.pop(tg_id, None)
+        if not bucket:
+            del self.buckets[(group, remind_before)]
+        if not self.users[tg_id]:
+            del self.users[tg_id]
+
+    def remove_user(self, tg_id: int | str) -> int:
+        groups = list(self.users.get(str(tg_id), {}))
+        for group in groups:
+            self.remove(tg_id, group)
+        return len(groups)
+
+    def update_user(
+        self,
+        tg_id: int | str,
+        remind_before: int | None = None,
+        suppress: bool | None = None,
+    ) -> None:
+        tg_id = str(tg_id)
+        for group, old_remind in list(self.users.get(tg_id, {}).items()):
+            old_suppress = self.buckets[(group, old_remind)][tg_id]
+            self.add(
+                tg_id,
+                group,
+                old_remind if remind_before is None else remind_before,
+                old_suppress if suppress is None else suppress,
+            )
+
+    def groups_of(self, tg_id: int | str) -> dict[str, int]:
+        return dict(self.users.get(str(tg_id), {}))
+
+    def subscribers(self, group: str, remind_before: int) -> dict[str, bool]:
+        return self.buckets.get((group, remind_before), {})
@@ -0,0 +1,68 @@
+import asyncio
+import hmac
+import logging
+import signal
+
+from telegram import Update
+from telegram.ext import Application
+
+from src.rest.server import Handler, Request, Response
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/telegram"
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def webhook_handler(app: Application, secret: str) -> Handler:
+    """
+    Route putting the Update Telegram posts on app.update_queue, requests
+    without the secret token set in setWebhook are rejected
+    """
+
+    async def handle(request: Request) -> Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return Response("Forbidden", 403)
+        try:
+            update = Update.de_json(request.json(), app.bot)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.error(f"malformed update: {e}")
+            return Response("Bad Request", 400)
+        await app.update_queue.put(update)
+        return Response("OK")
+
+    return handle
+
+
+def run_webhook(app: Application, url: str, secret: str) -> None:
+    """
+    run_polling counterpart without the Updater: Telegram posts updates to
+    url + WEBHOOK_PATH, served by the HTTP server post_init starts with the
+    webhook_handler route. Blocks until SIGINT or SIGTERM.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, loop.stop)
+    try:
+        loop.run_until_complete(app.initialize())
+        if app.post_init:
+            loop.run_until_complete(app.post_init(app))
+        loop.run_until_complete(
+            app.bot.set_webhook(
+                url=url.rstrip("/") + WEBHOOK_PATH,
+                secret_token=secret,
+                allowed_updates=Update.ALL_TYPES,
+            )
+        )
+        loop.run_until_complete(app.start())
+        loop.run_forever()
+    finally:
+        if app.running:
+            loop.run_until_complete(app.stop())
+            if app.post_stop:
+                loop.run_until_complete(app.post_stop(app))
+        loop.run_until_complete(app.shutdown())
+        if app.post_shutdown:
+            loop.run_until_complete(app.post_shutdown(app))
+        loop.close()
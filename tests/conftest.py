@@ -1,9 +1,17 @@
+import pathlib
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Iterator
 
 import pytest
+from assertpy import assert_that
 
+import config
+from src.metrics import UpdateStats, track_update
+from src.sql.async_sql_service import flush
+from src.sql.models import Base
 from src.sql.remind_obj import RemindObj
-from src.sql.sql_service import SqlService
+from src.sql.sql_service import SqlService, DayRepo, ZoneRepo
 from src.tg.outage_bot import OutageBot
 from tests.mock_utils import MockContext, MockApplication, MockBot
 
@@ -25,12 +33,30 @@ def context() -> MockContext:
 @pytest.fixture
 def group5_bot(chat_id: int, context: MockContext) -> OutageBot:
     bot = OutageBot(MockApplication(context))
+    flush()
     SqlService.delete_user_with_subs(chat_id)
     SqlService.subscribe_user(chat_id, GROUP_5)
     SqlService.update_user(chat_id, suppress_night=False, remind_before=15)
     return bot
 
 
+@pytest.fixture
+def empty_db(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """
+    Fresh database with days and zones only, for tests that write schedules
+    """
+    monkeypatch.setenv("BLACKOUT_DB", str(tmp_path.joinpath("blackout-empty.db")))
+    config.dispose_engines()
+    Base.metadata.create_all(config.get_engine())
+    with config.get_session_maker()() as session:
+        for day_name in config.DAYS_OF_WEEK:
+            DayRepo(session).add(day_name)
+        for zone in config.ZONES:
+            ZoneRepo(session).add(zone)
+    yield
+    config.dispose_engines()
+
+
 def to_datetime(date_string: str) -> datetime:
     return datetime.strptime(date_string, DATE_FORMAT)
 
@@ -48,3 +74,17 @@ def get_mock_remind(change_time: str, remind_time: str, now: bool = False) -> Re
         remind_time=to_datetime(remind_time),
         notify_now=now,
     )
+
+
+@contextmanager
+def max_queries(limit: int) -> Iterator[UpdateStats]:
+    """
+    Fail when the block runs more than limit SQL statements, writes it
+    submitted to the sql thread pool included
+    """
+    with track_update() as stats:
+        yield stats
+        flush()
+    assert_that(stats.statements).described_as(
+        "SQL statements"
+    ).is_less_than_or_equal_to(limit)
@@ -1,9 +1,12 @@
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from typing import Optional, Union, Any
 
 from telegram._utils.types import JSONDict
+from telegram.error import RetryAfter
 from telegram.ext._utils.types import JobCallback, CCT
 
+import config
 from src.sql.remind_obj import RemindObj
 
 
@@ -15,10 +18,36 @@ class Job:
 class MockBot:
     sent_messages: list[Any] = []
 
-    async def send_message(self, chat_id: int, text: str) -> None:
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
         self.sent_messages.append({"chat_id": chat_id, "text": text})
 
 
+class FloodMockBot(MockBot):
+    """
+    Answers with RetryAfter when more than chat_limit messages are sent
+    to one chat, or more than global_limit overall, within one second
+    """
+
+    def __init__(self, global_limit: int = 30, chat_limit: int = 1):
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.sent_messages = []
+        self.calls: list[tuple[float, int]] = []
+        self.flood_errors = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs: Any) -> None:
+        now = time.monotonic()
+        recent = [(ts, chat) for ts, chat in self.calls if now - ts < 1]
+        if (
+            len(recent) >= self.global_limit
+            or len([chat for _, chat in recent if chat == chat_id]) >= self.chat_limit
+        ):
+            self.flood_errors += 1
+            raise RetryAfter(1)
+        self.calls.append((now, chat_id))
+        await super().send_message(chat_id, text, **kwargs)
+
+
 class MockJob:
     def __init__(
         self,
@@ -28,6 +57,9 @@ class MockJob:
         when: Union[float, datetime],
     ):
         self.removed = False
+        if not isinstance(when, datetime):
+            # JobQueue turns "seconds from now" into a run time
+            when = datetime.now(config.tz) + timedelta(seconds=when)
         self.job = Job(when)
         self.name = name
         self.data = data
@@ -41,6 +73,7 @@ class MockJobQueue:
     def __init__(self, bot: MockBot):
         self.bot = bot
         self.jobs: list[MockJob] = []
+        self.repeating: list[Optional[str]] = []
 
     def run_once(
         self,
@@ -56,6 +89,15 @@ class MockJobQueue:
         self.jobs.append(job)
         return job
 
+    def run_repeating(
+        self,
+        callback: JobCallback[CCT],
+        interval: Union[float, timedelta],
+        first: Optional[Union[float, timedelta]] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.repeating.append(name)
+
     def get_jobs_by_name(self, name: str) -> list[MockJob]:
         return list(filter(lambda job: job.name == name, self.jobs))
 
@@ -73,6 +115,7 @@ class MockContext:
 class MockApplication:
     def __init__(self, context: MockContext):
         self.context = context
+        self.bot = context.bot
         self.job_queue = context.job_queue
 
 
@@ -81,6 +124,17 @@ class EffectiveUserMock:
         self.id = user_id
 
 
+class MockCallbackQuery:
+    def __init__(self, data: str):
+        self.data = data
+        self.answers: list[str] = []
+
+    async def answer(self, text: str) -> None:
+        self.answers.append(text)
+
+
 class MockUpdate:
-    def __init__(self, user_id: int):
+    def __init__(self, user_id: int, callback_data: Optional[str] = None):
         self.effective_user = EffectiveUserMock(user_id)
+        if callback_data is not None:
+            self.callback_query = MockCallbackQuery(callback_data)
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+from assertpy import assert_that, soft_assertions
+
+from src.sql.async_sql_service import AsyncSqlService
+from src.sql.sql_service import SqlService
+from tests.conftest import GROUP_5
+
+
+class TestAsyncSqlService:
+
+    @pytest.mark.asyncio
+    async def test_same_result_as_sync(self) -> None:
+        schedule = await AsyncSqlService.get_schedule_for("Monday", GROUP_5)
+        assert_that(schedule).is_equal_to(
+            SqlService.get_schedule_for("Monday", GROUP_5)
+        )
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls(self, chat_id: int) -> None:
+        SqlService.delete_user_with_subs(chat_id)
+        subscribed = await AsyncSqlService.subscribe_user(chat_id, GROUP_5)
+        users = await asyncio.gather(
+            *(AsyncSqlService.get_user(chat_id) for _ in range(20))
+        )
+        with soft_assertions():
+            assert_that(subscribed).is_true()
+            assert_that(users).extracting("tg_id").contains_only(str(chat_id))
@@ -52,13 +52,7 @@ class TestChangeRemindTime:
         reminder_after: RemindObj,
         remind_time: str,
     ) -> None:
-        context.job_queue.run_once(
-            group5_bot.actions._notification,
-            name=str(chat_id),
-            when=reminder_before.remind_time,
-            data=reminder_before,
-            chat_id=chat_id,
-        )
+        group5_bot.actions.run_notification_job(chat_id, reminder_before, persist=False)
 
         await group5_bot.actions.upd_notify_time_action(
             chat_id, str(remind_time), context
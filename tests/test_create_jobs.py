@@ -0,0 +1,54 @@
+from assertpy import assert_that, soft_assertions
+from freezegun import freeze_time
+
+import config
+from src.sql.sql_service import SqlService
+from src.tg.outage_bot import OutageBot
+from tests.conftest import GROUP_4, GROUP_5
+from tests.mock_utils import MockContext
+
+OTHER_CHAT_ID = 54321
+
+
+class TestCreateJobs:
+
+    @freeze_time("08-19-2024 20:44:59 +0300")
+    def test_reminder_shared_per_bucket(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        SqlService.delete_user_with_subs(OTHER_CHAT_ID)
+        SqlService.subscribe_user(OTHER_CHAT_ID, GROUP_5)
+        SqlService.subscribe_user(OTHER_CHAT_ID, GROUP_4)
+        SqlService.update_user(OTHER_CHAT_ID, suppress_night=False, remind_before=15)
+
+        group5_bot.actions.create_jobs()
+        jobs = {
+            (job.name, job.data.group): job
+            for job in context.job_queue.jobs
+            if job.name in (str(chat_id), str(OTHER_CHAT_ID))
+        }
+        SqlService.delete_user_with_subs(OTHER_CHAT_ID)
+
+        expected = group5_bot.actions.schedule_cache.get(GROUP_5).find_next_remind_time(
+            notify_before=15
+        )
+        with soft_assertions():
+            assert_that(jobs).is_length(3)
+            assert_that(jobs[(str(chat_id), GROUP_5)].data.__dict__).is_equal_to(
+                jobs[(str(OTHER_CHAT_ID), GROUP_5)].data.__dict__
+            )
+            assert_that(jobs[(str(chat_id), GROUP_5)].data.__dict__).is_equal_to(
+                expected.__dict__
+            )
+            assert_that(
+                jobs[(str(OTHER_CHAT_ID), GROUP_4)].job.next_run_time
+            ).is_equal_to(
+                group5_bot.actions.schedule_cache.get(GROUP_4)
+                .find_next_remind_time(notify_before=15)
+                .remind_time
+            )
+
+    def test_reminder_settings(self, chat_id: int, group5_bot: OutageBot) -> None:
+        assert_that(SqlService.get_reminder_settings()).contains(
+            (str(chat_id), GROUP_5, config.DEFAULT_NOTIF, False)
+        )
@@ -0,0 +1,46 @@
+from typing import Iterator
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from sqlalchemy import text
+
+import config
+
+
+class TestEngine:
+
+    @pytest.fixture(autouse=True)
+    def fresh_engines(self) -> Iterator[None]:
+        config.dispose_engines()
+        yield
+        config.dispose_engines()
+
+    def test_engine_is_shared(self) -> None:
+        with soft_assertions():
+            assert_that(config.get_engine()).is_same_as(config.get_engine())
+            assert_that(config.get_session_maker()).is_same_as(
+                config.get_session_maker()
+            )
+
+    def test_pragmas_applied(self) -> None:
+        with config.get_engine().connect() as conn:
+            journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+            busy_timeout = conn.execute(text("PRAGMA busy_timeout")).scalar()
+        with soft_assertions():
+            assert_that(journal_mode).is_equal_to("wal")
+            assert_that(busy_timeout).is_equal_to(
+                config.SQLITE_PRAGMAS["busy_timeout"]
+            )
+
+    def test_engine_per_db(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        engine = config.get_engine()
+        monkeypatch.setenv("BLACKOUT_DB", "blackout-other.db")
+        other = config.get_engine()
+        with soft_assertions():
+            assert_that(other).is_not_same_as(engine)
+            assert_that(str(other.url)).ends_with("blackout-other.db")
+
+    def test_dispose_rebuilds_engine(self) -> None:
+        engine = config.get_engine()
+        config.dispose_engines()
+        assert_that(config.get_engine()).is_not_same_as(engine)
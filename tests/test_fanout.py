@@ -0,0 +1,107 @@
+from typing import Iterator
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from freezegun import freeze_time
+
+from src.sql.sql_service import SqlService
+from src.tg.bot_actions import FANOUT_JOB_PREFIX
+from src.tg.outage_bot import OutageBot
+from src.tg.subscriber_index import SubscriberIndex
+from tests.conftest import GROUP_4, GROUP_5
+from tests.mock_utils import MockApplication, MockContext, MockJob, MockUpdate
+
+OTHER_CHAT_ID = 54321
+
+
+@pytest.fixture
+def fanout_bot(chat_id: int, context: MockContext) -> Iterator[OutageBot]:
+    for tg_id in (chat_id, OTHER_CHAT_ID):
+        SqlService.delete_user_with_subs(tg_id)
+        SqlService.subscribe_user(tg_id, GROUP_5)
+        SqlService.update_user(tg_id, suppress_night=False, remind_before=15)
+    SqlService.update_user(OTHER_CHAT_ID, suppress_night=True)
+    context.bot.sent_messages.clear()
+    bot = OutageBot(MockApplication(context), fanout=True)
+    yield bot
+    SqlService.delete_user_with_subs(OTHER_CHAT_ID)
+
+
+def fanout_jobs(context: MockContext) -> list[MockJob]:
+    return [
+        job
+        for job in context.job_queue.jobs
+        if job.name.startswith(FANOUT_JOB_PREFIX) and not job.removed
+    ]
+
+
+class TestFanout:
+
+    @freeze_time("08-19-2024 20:40:00 +0300")
+    def test_one_job_per_bucket(
+        self, chat_id: int, fanout_bot: OutageBot, context: MockContext
+    ) -> None:
+        fanout_bot.actions.create_jobs()
+        with soft_assertions():
+            assert_that(
+                [job for job in fanout_jobs(context) if job.data.group == GROUP_5]
+            ).is_length(1)
+            assert_that(
+                fanout_bot.actions.subscribers.subscribers(GROUP_5, 15)
+            ).is_equal_to({str(chat_id): False, str(OTHER_CHAT_ID): True})
+            assert_that(context.job_queue.get_jobs_by_name(str(chat_id))).is_empty()
+
+    @freeze_time("08-19-2024 20:45:00 +0300")
+    @pytest.mark.asyncio
+    async def test_delivers_to_bucket(
+        self, chat_id: int, fanout_bot: OutageBot, context: MockContext
+    ) -> None:
+        fanout_bot.actions.create_jobs()
+        await fanout_bot.actions._fanout_notification(context)
+        text = (
+            f"{GROUP_5} changes to 💡:\n"
+            "Zone is going to change from grey 🌥to white  💡 at 21:00"
+        )
+        with soft_assertions():
+            assert_that(context.bot.sent_messages).contains(
+                {"chat_id": str(chat_id), "text": text},
+                {"chat_id": str(OTHER_CHAT_ID), "text": text},
+            )
+            assert_that(context.job.data.change_time.hour).is_equal_to(0)
+
+    @freeze_time("08-19-2024 23:45:00 +0300")
+    @pytest.mark.asyncio
+    async def test_suppressed_at_night(
+        self, chat_id: int, fanout_bot: OutageBot, context: MockContext
+    ) -> None:
+        fanout_bot.actions.create_jobs()
+        await fanout_bot.actions._fanout_notification(context)
+        assert_that(context.bot.sent_messages).extracting("chat_id").contains(
+            str(chat_id)
+        ).does_not_contain(str(OTHER_CHAT_ID))
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_and_stop(
+        self, chat_id: int, fanout_bot: OutageBot, context: MockContext
+    ) -> None:
+        fanout_bot.actions.create_jobs()
+        await fanout_bot.actions.subscribe_action(chat_id, GROUP_4, context)
+        await fanout_bot.actions.unsubscribe_action(chat_id, GROUP_5, context)
+        assert_that(fanout_bot.actions.subscribers.groups_of(chat_id)).is_equal_to(
+            {GROUP_4: 15}
+        )
+        await fanout_bot.stop_handler(MockUpdate(chat_id), context)
+        assert_that(fanout_bot.actions.subscribers.groups_of(chat_id)).is_empty()
+
+
+class TestSubscriberIndex:
+
+    def test_update_moves_bucket(self) -> None:
+        index = SubscriberIndex()
+        index.add(1, GROUP_5, 15, False)
+        index.add(1, GROUP_4, 15, False)
+        index.update_user(1, remind_before=30, suppress=True)
+        with soft_assertions():
+            assert_that(index.buckets).does_not_contain_key((GROUP_5, 15))
+            assert_that(index.subscribers(GROUP_5, 30)).is_equal_to({"1": True})
+            assert_that(index.subscribers(GROUP_4, 30)).is_equal_to({"1": True})
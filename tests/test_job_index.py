@@ -0,0 +1,64 @@
+import pytest
+from assertpy import assert_that, soft_assertions
+
+from src.tg.job_index import JobIndex
+from src.tg.message_sender import MessageSender
+from src.tg.outage_bot import OutageBot
+from tests.conftest import GROUP_4, GROUP_5
+from tests.mock_utils import MockContext, MockJob, MockUpdate
+
+
+def make_job(name: str) -> MockJob:
+    return MockJob(name=name, data=None, chat_id=None, when=1)  # type: ignore
+
+
+class TestJobIndex:
+
+    def test_add_replaces_and_returns_previous(self) -> None:
+        index = JobIndex()
+        first, second = make_job("1"), make_job("1")
+        with soft_assertions():
+            assert_that(index.add(1, GROUP_5, first)).is_none()
+            assert_that(index.add("1", GROUP_5, second)).is_same_as(first)
+            assert_that(index.jobs_of(1)).is_equal_to([second])
+
+    def test_removed_jobs_are_not_live(self) -> None:
+        index = JobIndex()
+        job = make_job("1")
+        index.add(1, GROUP_5, job)
+        job.schedule_removal()
+        with soft_assertions():
+            assert_that((1, GROUP_5) in index).is_false()
+            assert_that(index.jobs_of(1)).is_empty()
+            assert_that(index.remove(1, GROUP_5)).is_none()
+            assert_that(index.chats).is_empty()
+
+    def test_discard_keeps_newer_job(self) -> None:
+        index = JobIndex()
+        fired, newer = make_job("1"), make_job("1")
+        index.add(1, GROUP_5, fired)
+        index.add(1, GROUP_5, newer)
+        index.discard(1, GROUP_5, fired)
+        index.add(1, GROUP_4, fired)
+        index.discard(1, GROUP_4, fired)
+        assert_that(index.jobs_of(1)).is_equal_to([newer])
+
+    @pytest.mark.asyncio
+    async def test_user_actions_do_not_scan_queue(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        def scan(name: str) -> list:
+            raise AssertionError("job queue scanned")
+
+        context.job_queue.get_jobs_by_name = scan  # type: ignore[method-assign]
+        group5_bot.actions.sender = MessageSender(chat_rate=100)
+        await group5_bot.actions.subscribe_action(chat_id, GROUP_4, context)
+        await group5_bot.actions.upd_notify_time_action(chat_id, "30", context)
+        await group5_bot.actions.suppress_notif_action(chat_id, context)
+        await group5_bot.actions.unsubscribe_action(chat_id, GROUP_4, context)
+        live = group5_bot.actions.reminder_jobs.jobs_of(chat_id)
+        await group5_bot.stop_handler(MockUpdate(chat_id), context)
+        pending = [job for job in context.job_queue.jobs if not job.removed]
+        with soft_assertions():
+            assert_that([job.data.group for job in live]).is_equal_to([GROUP_5])
+            assert_that(pending).is_empty()
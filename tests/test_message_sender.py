@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from telegram.error import RetryAfter
+
+from src.tg.message_sender import MessageSender, TokenBucket
+from tests.mock_utils import FloodMockBot
+
+
+class TestMessageSender:
+
+    def test_token_bucket(self) -> None:
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        delays = [bucket.delay() for _ in range(4)]
+        with soft_assertions():
+            assert_that(delays[:2]).contains_only(0.0)
+            assert_that(delays[2]).is_close_to(1.0, 0.01)
+            assert_that(delays[3]).is_close_to(2.0, 0.01)
+
+    def test_paused_bucket(self) -> None:
+        bucket = TokenBucket(rate=1.0, capacity=2)
+        bucket.pause(1.5)
+        assert_that(bucket.delay()).is_close_to(1.5, 0.01)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_flood_error(self) -> None:
+        bot = FloodMockBot(chat_limit=1)
+        sender = MessageSender(chat_rate=100)
+        await asyncio.gather(*(sender.send(bot, 1, f"msg {i}") for i in range(2)))
+        with soft_assertions():
+            assert_that(bot.sent_messages).extracting("text").contains_only(
+                "msg 0", "msg 1"
+            )
+            assert_that(bot.flood_errors).is_greater_than_or_equal_to(1)
+            assert_that(sender.stats()).contains_entry({"sent": 2}, {"failed": 0})
+            assert_that(sender.stats()["retries"]).is_equal_to(bot.flood_errors)
+
+    @pytest.mark.asyncio
+    async def test_chat_limit_keeps_other_chats_going(self) -> None:
+        bot = FloodMockBot(chat_limit=3)
+        sender = MessageSender()
+        await asyncio.gather(*(sender.send(bot, chat, "msg") for chat in range(20)))
+        with soft_assertions():
+            assert_that(bot.sent_messages).is_length(20)
+            assert_that(bot.flood_errors).is_zero()
+            assert_that(sender.stats()).contains_entry({"pending": 0}, {"sent": 20})
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self) -> None:
+        bot = FloodMockBot(chat_limit=0)
+        sender = MessageSender(max_retries=1)
+        with pytest.raises(RetryAfter):
+            await sender.send(bot, 1, "msg")
+        assert_that(sender.stats()).contains_entry({"failed": 1}, {"retries": 1})
+
+    @pytest.mark.asyncio
+    async def test_throttled_chat_does_not_hold_a_slot(self) -> None:
+        bot = FloodMockBot(chat_limit=10)
+        sender = MessageSender(chat_rate=2, max_concurrent=1)
+        await asyncio.gather(
+            *(sender.send(bot, 1, f"msg {i}") for i in range(4)),
+            sender.send(bot, 2, "other"),
+        )
+        # the fourth message to chat 1 waits for a chat token, not chat 2
+        assert_that(bot.sent_messages).extracting("text").is_equal_to(
+            ["msg 0", "msg 1", "msg 2", "other", "msg 3"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_retry_after_pauses_other_chats(self) -> None:
+        bot = FloodMockBot(chat_limit=1)
+        sender = MessageSender(chat_rate=100)
+        await sender.send(bot, 1, "first")
+        started = time.monotonic()
+        await asyncio.gather(
+            sender.send(bot, 1, "flooded"), sender.send(bot, 2, "other")
+        )
+        other = next(ts for ts, chat in bot.calls if chat == 2)
+        with soft_assertions():
+            assert_that(bot.flood_errors).is_equal_to(1)
+            assert_that(other - started).is_greater_than_or_equal_to(0.9)
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from assertpy import assert_that, soft_assertions
+from freezegun import freeze_time
+from telegram.ext import Application
+
+from src.metrics import (
+    DB_QUERIES,
+    HANDLER_LATENCY,
+    REGISTRY,
+    REMINDERS_FIRED,
+    REMINDERS_LATE,
+    REMINDERS_SCHEDULED,
+    Counter,
+    Histogram,
+    Registry,
+    Sampled,
+    UpdateStats,
+)
+from src.rest.hello import make_server
+from src.sql.remind_obj import RemindObj
+from src.sql.sql_service import SqlService
+from src.tg.bot_actions import BotActions
+from src.tg.outage_bot import OutageBot
+from tests.conftest import to_datetime
+from tests.mock_utils import MockContext, MockUpdate
+
+
+def late_reminder(remind_time: str) -> RemindObj:
+    return RemindObj(
+        group="group5",
+        old_zone="white",
+        new_zone="black",
+        change_time=to_datetime("08-19-2024 21:00:00 +0300"),
+        remind_time=to_datetime(remind_time),
+        notify_now=False,
+    )
+
+
+class TestMetrics:
+
+    def test_text_format(self) -> None:
+        registry = Registry()
+        counter = registry.register(Counter("c_total", "A counter", ("kind",)))
+        histogram = registry.register(
+            Histogram("h_seconds", "A histogram", (), (0.1, 1.0))
+        )
+        registry.register(Sampled("g", "A gauge", lambda: 3))
+        counter.inc('a"b')
+        counter.inc('a"b', amount=2)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        assert_that(registry.render()).is_equal_to(
+            "# HELP c_total A counter\n"
+            "# TYPE c_total counter\n"
+            'c_total{kind="a\\"b"} 3\n'
+            "# HELP g A gauge\n"
+            "# TYPE g gauge\n"
+            "g 3\n"
+            "# HELP h_seconds A histogram\n"
+            "# TYPE h_seconds histogram\n"
+            'h_seconds_bucket{le="0.1"} 1\n'
+            'h_seconds_bucket{le="1"} 2\n'
+            'h_seconds_bucket{le="+Inf"} 3\n'
+            "h_seconds_sum 5.55\n"
+            "h_seconds_count 3\n"
+        )
+
+    def test_update_stats_from_threads(self) -> None:
+        stats = UpdateStats()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for _ in range(1000):
+                executor.submit(stats.add, 1, 2)
+        assert_that([stats.statements, stats.rows]).is_equal_to([1000, 2000])
+
+    def test_db_queries_are_counted(self, chat_id: int) -> None:
+        before = DB_QUERIES.count("SELECT")
+        SqlService.get_user(chat_id)
+        SqlService.get_all_groups()
+        assert_that(DB_QUERIES.count("SELECT") - before).is_equal_to(2)
+
+    @freeze_time("08-19-2024 20:45:00 +0300")
+    @pytest.mark.asyncio
+    async def test_keyboard_latency_per_command(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        status = HANDLER_LATENCY.count("status")
+        unknown = HANDLER_LATENCY.count("unknown")
+        await group5_bot.keyboard_handler(MockUpdate(chat_id, "status"), context)
+        await group5_bot.keyboard_handler(MockUpdate(chat_id, "bogus_1"), context)
+        with soft_assertions():
+            assert_that(HANDLER_LATENCY.count("status") - status).is_equal_to(1)
+            assert_that(HANDLER_LATENCY.count("unknown") - unknown).is_equal_to(1)
+
+    @freeze_time("08-19-2024 20:50:00 +0300")
+    @pytest.mark.asyncio
+    async def test_reminder_counters(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        counts = [
+            REMINDERS_SCHEDULED.get(),
+            REMINDERS_FIRED.get(),
+            REMINDERS_LATE.get(),
+        ]
+        for remind_time in ["08-19-2024 20:49:30 +0300", "08-19-2024 20:45:00 +0300"]:
+            context.job_queue.run_once(
+                group5_bot.actions._notification,
+                when=to_datetime(remind_time),
+                data=late_reminder(remind_time),
+                chat_id=chat_id,
+            )
+            await group5_bot.actions._notification(context=context)
+        assert_that(
+            [
+                REMINDERS_SCHEDULED.get(),
+                REMINDERS_FIRED.get(),
+                REMINDERS_LATE.get(),
+            ]
+        ).is_equal_to([counts[0] + 2, counts[1] + 2, counts[2] + 1])
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self) -> None:
+        app = Application.builder().token("123:TEST").updater(None).build()
+        actions = BotActions(app)
+        actions.sender.pending = 4
+        actions.register_metrics(REGISTRY)
+        server = make_server()
+        port = await server.start("127.0.0.1", 0)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            response = await client.get("/metrics")
+        await server.stop()
+        with soft_assertions():
+            assert_that(response.status_code).is_equal_to(200)
+            assert_that(response.headers["content-type"]).starts_with(
+                "text/plain; version=0.0.4"
+            )
+            assert_that(response.text).contains(
+                "blackout_send_queue_depth 4\n",
+                "blackout_job_queue_size 0\n",
+                "# TYPE blackout_time_finder_cache_total counter\n",
+                "# TYPE blackout_db_query_seconds histogram\n",
+                "# TYPE blackout_reminders_late_total counter\n",
+            )
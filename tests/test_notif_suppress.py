@@ -1,7 +1,11 @@
+from datetime import datetime, timedelta
+
 import pytest
 from assertpy import soft_assertions, assert_that
 from freezegun import freeze_time
 
+import config
+from src.sql.async_sql_service import flush
 from src.sql.remind_obj import RemindObj
 from src.sql.sql_service import SqlService
 from src.tg.outage_bot import OutageBot
@@ -56,12 +60,8 @@ class TestNotifSuppress:
         reminder_before_obj = self.get_remind_obj(*remind_before_time)
         reminder_after_obj = self.get_remind_obj(*remind_after_time)
         SqlService.update_user(chat_id, suppress_night=False)
-        context.job_queue.run_once(
-            group5_bot.actions._notification,
-            name=str(chat_id),
-            when=reminder_before_obj.remind_time,
-            data=reminder_before_obj,
-            chat_id=chat_id,
+        group5_bot.actions.run_notification_job(
+            chat_id, reminder_before_obj, persist=False
         )
 
         await group5_bot.actions.suppress_notif_action(chat_id, context)
@@ -108,12 +108,8 @@ class TestNotifSuppress:
         reminder_before_obj = self.get_remind_obj(*reminder_before)
         reminder_after_obj = self.get_remind_obj(*reminder_after)
         SqlService.update_user(chat_id, suppress_night=True)
-        context.job_queue.run_once(
-            group5_bot.actions._notification,
-            name=str(chat_id),
-            when=reminder_before_obj.remind_time,
-            data=reminder_before_obj,
-            chat_id=chat_id,
+        group5_bot.actions.run_notification_job(
+            chat_id, reminder_before_obj, persist=False
         )
 
         await group5_bot.actions.suppress_notif_action(chat_id, context)
@@ -124,3 +120,32 @@ class TestNotifSuppress:
             assert_that(running_jobs[0].data.__dict__).is_equal_to(
                 reminder_after_obj.__dict__
             )
+
+    # next change at 00:00 is reminded at 23:45, past the reminder horizon
+    @freeze_time("08-19-2024 21:30:00 +0300")
+    @pytest.mark.asyncio
+    async def test_enable_suppress_past_horizon(
+        self, chat_id: int, context: MockContext, group5_bot: OutageBot
+    ) -> None:
+        SqlService.save_reminders(
+            [
+                (
+                    str(chat_id),
+                    self.get_remind_obj(
+                        "08-20-2024 00:00:00 +0300", "08-19-2024 23:45:00 +0300"
+                    ),
+                )
+            ]
+        )
+
+        await group5_bot.actions.suppress_notif_action(chat_id, context)
+        flush()
+
+        now = datetime.now(config.tz)
+        due = SqlService.get_due_reminders(now, now + timedelta(days=1))
+        with soft_assertions():
+            assert_that(context.job_queue.jobs).is_empty()
+            assert_that(due).is_length(1)
+            assert_that(due[0][1].remind_time).is_equal_to(
+                to_datetime("08-20-2024 08:45:00 +0300")
+            )
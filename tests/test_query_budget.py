@@ -0,0 +1,142 @@
+import logging
+from typing import Any, Callable, Coroutine
+
+import pytest
+from assertpy import assert_that, soft_assertions
+
+import config
+from src.metrics import UPDATE_STATEMENTS
+from src.sql.schedule_cache import ScheduleCache
+from src.sql.sql_service import SqlService
+from src.tg.bot_actions import BotActions
+from src.tg.message_sender import MessageSender
+from src.tg.outage_bot import OutageBot
+from tests.conftest import GROUP_4, max_queries
+from tests.mock_utils import MockContext, MockUpdate
+
+Call = Callable[[OutageBot, int, MockContext], Coroutine[Any, Any, None]]
+
+# SQL statements per handler, schedule loads of a cold time finder included
+BUDGETS: dict[str, tuple[int, Call]] = {
+    "start": (0, lambda bot, chat, ctx: bot.start_handler(MockUpdate(chat), ctx)),
+    "subscribe": (
+        1,
+        lambda bot, chat, ctx: bot.subscribe_handler(MockUpdate(chat), ctx),
+    ),
+    "subscribe_group": (
+        9,
+        lambda bot, chat, ctx: bot.actions.subscribe_action(chat, GROUP_4, ctx),
+    ),
+    "status": (6, lambda bot, chat, ctx: bot.status_handler(MockUpdate(chat), ctx)),
+    "today": (6, lambda bot, chat, ctx: bot.today_handler(MockUpdate(chat), ctx)),
+    "config": (1, lambda bot, chat, ctx: bot.config_handler(MockUpdate(chat), ctx)),
+    "notify": (
+        10,
+        lambda bot, chat, ctx: bot.actions.upd_notify_time_action(chat, "30", ctx),
+    ),
+    "suppress": (
+        10,
+        lambda bot, chat, ctx: bot.actions.suppress_notif_action(chat, ctx),
+    ),
+    "unsubscribe": (
+        2,
+        lambda bot, chat, ctx: bot.unsubscribe_handler(MockUpdate(chat), ctx),
+    ),
+    "unsubscribe_group": (
+        7,
+        lambda bot, chat, ctx: bot.actions.unsubscribe_action(chat, GROUP_4, ctx),
+    ),
+    "stop": (4, lambda bot, chat, ctx: bot.stop_handler(MockUpdate(chat), ctx)),
+}
+
+
+@pytest.fixture
+def budget_bot(
+    chat_id: int, group5_bot: OutageBot, monkeypatch: pytest.MonkeyPatch
+) -> OutageBot:
+    """
+    group5 subscriber also subscribed to group4, cold time finder cache
+    and no send throttling
+    """
+    SqlService.subscribe_user(chat_id, GROUP_4)
+    monkeypatch.setattr(
+        BotActions, "schedule_cache", ScheduleCache(config.tz, check_interval=3600)
+    )
+    group5_bot.actions.sender = MessageSender(global_rate=1e6, chat_rate=1e6)
+    return group5_bot
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize("handler", BUDGETS)
+    @pytest.mark.asyncio
+    async def test_handler_budget(
+        self, handler: str, chat_id: int, budget_bot: OutageBot, context: MockContext
+    ) -> None:
+        limit, call = BUDGETS[handler]
+        with max_queries(limit):
+            await call(budget_bot, chat_id, context)
+
+    @pytest.mark.asyncio
+    async def test_rows_are_counted(
+        self, chat_id: int, budget_bot: OutageBot, context: MockContext
+    ) -> None:
+        with max_queries(6) as stats:
+            await budget_bot.status_handler(MockUpdate(chat_id), context)
+        with soft_assertions():
+            assert_that(stats.statements).is_equal_to(6)
+            # two subscriptions and a week of hours for each group
+            assert_that(stats.rows).is_greater_than_or_equal_to(2 + 2 * 7 * 24)
+
+    @pytest.mark.asyncio
+    async def test_today_reads_revision_off_the_loop(
+        self, chat_id: int, budget_bot: OutageBot, context: MockContext
+    ) -> None:
+        await budget_bot.today_handler(MockUpdate(chat_id), context)
+        assert_that(budget_bot.actions.schedule_cache.stats()).contains_entry(
+            {"misses": 0}, {"reloads": 0}
+        )
+
+    def test_budget_exceeded(self, chat_id: int) -> None:
+        with pytest.raises(AssertionError, match="SQL statements"):
+            with max_queries(1):
+                SqlService.get_user(chat_id)
+                SqlService.get_user(chat_id)
+
+    @pytest.mark.asyncio
+    async def test_nested_action_is_recorded(
+        self, chat_id: int, budget_bot: OutageBot, context: MockContext
+    ) -> None:
+        names = ["OutageBot.keyboard_handler", "BotActions.subscribe_action"]
+        before = [
+            (UPDATE_STATEMENTS.count(name), UPDATE_STATEMENTS.sum(name))
+            for name in names
+        ]
+        await budget_bot.keyboard_handler(
+            MockUpdate(chat_id, f"subscribe_{GROUP_4}"), context
+        )
+        (handler_calls, handler_sql), (action_calls, action_sql) = [
+            (UPDATE_STATEMENTS.count(name) - calls, UPDATE_STATEMENTS.sum(name) - sql)
+            for name, (calls, sql) in zip(names, before)
+        ]
+        with soft_assertions():
+            assert_that([handler_calls, action_calls]).is_equal_to([1, 1])
+            assert_that(action_sql).is_positive()
+            # the update of the handler includes the action it dispatched to
+            assert_that(handler_sql).is_greater_than_or_equal_to(action_sql)
+
+    @pytest.mark.asyncio
+    async def test_slow_update_is_logged(
+        self,
+        chat_id: int,
+        budget_bot: OutageBot,
+        context: MockContext,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        monkeypatch.setattr(config, "SLOW_UPDATE_SECONDS", 0.0)
+        with caplog.at_level(logging.WARNING, logger="src.tg.instrumentation"):
+            await budget_bot.status_handler(MockUpdate(chat_id), context)
+        assert_that(caplog.text).contains(
+            "slow update OutageBot.status_handler", "6 statements"
+        )
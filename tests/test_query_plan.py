@@ -0,0 +1,108 @@
+import re
+from typing import Any, Callable, Iterator
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+import config
+from src.sql.models import Base
+from src.sql.sql_service import (
+    DayRepo,
+    GroupRepo,
+    HourRepo,
+    SqlService,
+    SubsRepo,
+    UsersRepo,
+    ZoneRepo,
+)
+from tests.conftest import GROUP_5
+
+
+def lookups(session: Session) -> list[Callable[[], Any]]:
+    group = GroupRepo(session).get_group(GROUP_5)
+    day = DayRepo(session).get_day("Monday")
+    user = UsersRepo(session).get_user(12345)
+    return [
+        lambda: ZoneRepo(session).get_zone(config.BLACK_ZONE),
+        lambda: GroupRepo(session).get_group(GROUP_5),
+        lambda: DayRepo(session).get_day("Monday"),
+        lambda: DayRepo(session).get(1),
+        lambda: UsersRepo(session).get_user(12345),
+        lambda: SubsRepo(session).get_subs_for_tgid(12345),
+        lambda: SubsRepo(session).get_subs_for_user_grp(user, group),
+        lambda: HourRepo(session).get_hours_for_day_group(day, group),
+        lambda: HourRepo(session).get_hours_for_day(day),
+        lambda: HourRepo(session).get_hours_for_group(group),
+        lambda: HourRepo(session).get_week_zones(group),
+        lambda: SqlService.get_schedule_for("Monday", GROUP_5),
+    ]
+
+
+class TestQueryPlan:
+
+    @pytest.fixture
+    def statements(self, group5_bot: Any) -> Iterator[list[tuple[str, Any]]]:
+        captured: list[tuple[str, Any]] = []
+
+        def capture(
+            conn: Any,
+            cursor: Any,
+            statement: str,
+            parameters: Any,
+            context: Any,
+            executemany: bool,
+        ) -> None:
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        engine = config.get_engine()
+        with config.get_session_maker()() as session:
+            queries = lookups(session)
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                for query in queries:
+                    query()
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+        yield captured
+
+    def test_lookups_use_index(self, statements: list[tuple[str, Any]]) -> None:
+        tables = Base.metadata.tables.keys()
+        with config.get_engine().connect() as conn:
+            cursor = conn.connection.cursor()
+            with soft_assertions():
+                for statement, parameters in statements:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                    plan = [row[3] for row in cursor.fetchall()]
+                    full_scans = [
+                        step
+                        for step in plan
+                        if step.startswith("SCAN")
+                        and "INDEX" not in step
+                        and re.sub(r"_\d+$", "", step.split()[1]) in tables
+                    ]
+                    assert_that(full_scans).described_as(statement).is_empty()
+            cursor.close()
+
+    def test_hours_for_day_group(self) -> None:
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).get_group(GROUP_5)
+            day = DayRepo(session).get_day("Monday")
+            hours = HourRepo(session).get_hours_for_day_group(day, group)
+        assert_that(hours).is_length(24)
+        assert_that(hours).extracting("group_id").contains_only(group.group_id)
+
+    def test_unique_index_exists(self) -> None:
+        with config.get_engine().connect() as conn:
+            indexes = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type='index'")
+            ).scalars()
+            assert_that(list(indexes)).contains(
+                "ix_groups_group_name",
+                "ix_days_day_name",
+                "ix_zones_zone_name",
+                "ix_hours_group_version_day_hour",
+                "ix_subscriptions_group_id",
+            )
@@ -0,0 +1,85 @@
+import copy
+import csv
+import pathlib
+
+import numpy as np
+import pytest
+from assertpy import assert_that
+from img2table.document import Image
+
+import config
+from src.group_reader import read_group
+from src.group_reader.read_group import GRID_CLASSIFIER, ReadDtekGroup
+
+RESOURCES = pathlib.Path(config.BASE_PATH, "resources")
+GOLDEN = pathlib.Path(config.BASE_PATH, "benchmarks", "golden")
+
+
+class TestReadDtekGroup:
+
+    @pytest.mark.parametrize("image", sorted(RESOURCES.glob("group*.jpg")))
+    def test_classifiers_match_golden(self, image: pathlib.Path) -> None:
+        tables = Image(src=str(image), detect_rotation=True).extract_tables(
+            implicit_rows=True, borderless_tables=True, min_confidence=50
+        )
+        kmeans = ReadDtekGroup(str(image))
+        kmeans.extracted_table = copy.deepcopy(tables)
+        kmeans.read_table()
+        grid = ReadDtekGroup(str(image), classifier=GRID_CLASSIFIER)
+        grid.extracted_table = tables
+        grid.read_table()
+        with open(GOLDEN.joinpath(f"{image.stem}.csv"), encoding="UTF-8") as golden:
+            expected = list(csv.reader(golden))[1:]
+        assert_that(kmeans.outage_table).is_equal_to(expected)
+        assert_that(grid.outage_table).is_equal_to(expected)
+
+    def test_classify_cells(self) -> None:
+        reader = ReadDtekGroup("group.jpg")
+        colours = np.array([[reader.black_cell, (240, 240, 240), (250, 253, 255)]])
+        day: list[str] = []
+        reader.determine_cell_type((128, 128, 128), day)
+        assert_that(reader.classify_cells(colours)).is_equal_to(
+            [["black", "grey", "white"]]
+        )
+        assert_that(reader.classify_cells(np.array([[(128, 128, 128)]]))).is_equal_to(
+            [day]
+        )
+
+
+class TestExtractionCache:
+
+    def test_unchanged_image_is_read_from_cache(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        image = str(RESOURCES.joinpath("group5.jpg"))
+        first = ReadDtekGroup(image, GRID_CLASSIFIER, cache_dir=str(tmp_path))
+        first.extract()
+
+        def no_extraction(*args: object, **kwargs: object) -> None:
+            raise AssertionError("image extracted again")
+
+        monkeypatch.setattr(read_group, "Image", no_extraction)
+        cached = ReadDtekGroup(image, GRID_CLASSIFIER, cache_dir=str(tmp_path))
+        cached.extract()
+        assert_that(list(tmp_path.iterdir())).is_length(1)
+        assert_that(cached.outage_table).is_equal_to(first.outage_table)
+        assert_that(cached.cells).is_equal_to(first.cells)
+
+    def test_changed_image_is_not_served_stale(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        image = tmp_path.joinpath("group.jpg")
+        image.write_bytes(RESOURCES.joinpath("group5.jpg").read_bytes())
+        cache_dir = str(tmp_path.joinpath("cache"))
+        ReadDtekGroup(str(image), GRID_CLASSIFIER, cache_dir=cache_dir).extract()
+        kmeans = ReadDtekGroup(str(image), cache_dir=cache_dir)
+        image.write_bytes(RESOURCES.joinpath("group4.jpg").read_bytes())
+        changed = ReadDtekGroup(str(image), GRID_CLASSIFIER, cache_dir=cache_dir)
+
+        def extraction(*args: object, **kwargs: object) -> None:
+            raise RuntimeError("extracted")
+
+        monkeypatch.setattr(read_group, "Image", extraction)
+        for reader in (changed, kmeans):
+            with pytest.raises(RuntimeError):
+                reader.extract()
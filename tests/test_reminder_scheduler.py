@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+from assertpy import assert_that, soft_assertions
+
+from src.sql.sql_service import SqlService
+from src.tg.outage_bot import OutageBot
+from src.tg.reminder_scheduler import HEAP_BACKEND, HeapScheduler, ReminderContext
+from tests.conftest import GROUP_4
+from tests.mock_utils import MockApplication, MockContext
+
+
+async def noop(context: ReminderContext) -> None:
+    pass
+
+
+class TestHeapScheduler:
+
+    def test_pop_due_in_time_order(self, context: MockContext) -> None:
+        scheduler = HeapScheduler(MockApplication(context))
+        now = time.time()
+        late = scheduler.run_once(noop, when=30, name="late")
+        early = scheduler.run_once(noop, when=10, name="early")
+        cancelled = scheduler.run_once(noop, when=20, name="cancelled")
+        cancelled.schedule_removal()
+
+        due = scheduler.pop_due(now + 25)
+        with soft_assertions():
+            assert_that(due).is_equal_to([early])
+            assert_that(scheduler.jobs()).is_equal_to([late])
+            assert_that(scheduler.get_jobs_by_name("cancelled")).is_empty()
+            assert_that(len(scheduler)).is_equal_to(1)
+
+    def test_cancelled_entries_are_compacted(self, context: MockContext) -> None:
+        scheduler = HeapScheduler(MockApplication(context))
+        handles = [scheduler.run_once(noop, when=i + 1) for i in range(10)]
+        for handle in handles[:6]:
+            handle.schedule_removal()
+        with soft_assertions():
+            assert_that(scheduler.heap).is_length(4)
+            assert_that(len(scheduler)).is_equal_to(4)
+
+    @pytest.mark.asyncio
+    async def test_fires_callbacks(self, context: MockContext) -> None:
+        scheduler = HeapScheduler(MockApplication(context))
+        fired = []
+
+        async def callback(ctx: ReminderContext) -> None:
+            fired.append(ctx.job.data)
+
+        scheduler.start()
+        scheduler.run_once(callback, when=0.05, data="second")
+        scheduler.run_once(callback, when=0.01, data="first")
+        scheduler.run_once(callback, when=0.02, data="cancelled").schedule_removal()
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        assert_that(fired).is_equal_to(["first", "second"])
+
+    @pytest.mark.asyncio
+    async def test_bot_uses_heap_backend(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        bot = OutageBot(MockApplication(context), scheduler_backend=HEAP_BACKEND)
+        await bot.actions.subscribe_action(chat_id, GROUP_4, context)
+        reminders = bot.actions.scheduler.get_jobs_by_name(str(chat_id))
+        await bot.actions.unsubscribe_action(chat_id, GROUP_4, context)
+        SqlService.delete_user_with_subs(chat_id)
+        with soft_assertions():
+            assert_that(context.job_queue.jobs).is_empty()
+            assert_that([job.data.group for job in reminders]).is_equal_to([GROUP_4])
+            assert_that(bot.actions.scheduler.jobs()).is_empty()
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from freezegun import freeze_time
+from sqlalchemy import select
+
+import config
+from src.sql.async_sql_service import flush
+from src.sql.models.scheduled_reminder import ScheduledReminder
+from src.sql.remind_obj import RemindObj
+from src.sql.sql_service import SqlService
+from src.tg.outage_bot import OutageBot
+from tests.conftest import GROUP_5
+from tests.mock_utils import MockApplication, MockContext
+
+NOW = "08-19-2024 20:44:59 +0300"
+
+
+def make_remind(change_in: timedelta, remind_before: int = 15) -> RemindObj:
+    now = datetime.now(config.tz)
+    change_time = now + change_in
+    return RemindObj(
+        group=GROUP_5,
+        old_zone="white",
+        new_zone="black",
+        change_time=change_time,
+        remind_time=change_time - timedelta(minutes=remind_before),
+        notify_now=False,
+    )
+
+
+class TestReminderStore:
+
+    @freeze_time(NOW)
+    def test_due_within_horizon(self, chat_id: int, group5_bot: OutageBot) -> None:
+        now = datetime.now(config.tz)
+        SqlService.save_reminders([(str(chat_id), make_remind(timedelta(hours=1)))])
+        soon = SqlService.get_due_reminders(now, now + config.REMINDER_HORIZON)
+        later = SqlService.get_due_reminders(now, now + timedelta(minutes=30))
+        with soft_assertions():
+            assert_that([chat for chat, _ in soon]).contains(str(chat_id))
+            assert_that([chat for chat, _ in later]).does_not_contain(str(chat_id))
+
+    @freeze_time(NOW)
+    def test_sent_reminder_is_recomputed(
+        self, chat_id: int, group5_bot: OutageBot
+    ) -> None:
+        now = datetime.now(config.tz)
+        SqlService.save_reminders([(str(chat_id), make_remind(timedelta(hours=5)))])
+        pending = SqlService.get_unscheduled_settings(now)
+        SqlService.mark_reminder_sent(chat_id, GROUP_5)
+        sent = SqlService.get_unscheduled_settings(now)
+        with soft_assertions():
+            assert_that([row[0] for row in pending]).does_not_contain(str(chat_id))
+            assert_that([row[0] for row in sent]).contains(str(chat_id))
+
+    @freeze_time(NOW)
+    def test_restart_loads_stored_reminders(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        group5_bot.actions.create_jobs()
+        stored = SqlService.get_unscheduled_settings(datetime.now(config.tz))
+
+        restarted = OutageBot(MockApplication(context))
+        context.job_queue.jobs.clear()
+        restarted.actions.create_jobs()
+        jobs = [job for job in context.job_queue.jobs if job.name == str(chat_id)]
+        with soft_assertions():
+            assert_that([row[0] for row in stored]).does_not_contain(str(chat_id))
+            assert_that(jobs).is_length(1)
+            assert_that(jobs[0].data.group).is_equal_to(GROUP_5)
+            assert_that(context.job_queue.repeating).contains("load_due_reminders")
+
+    @freeze_time(NOW)
+    @pytest.mark.asyncio
+    async def test_unsubscribe_deletes_reminder(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        now = datetime.now(config.tz)
+        SqlService.save_reminders([(str(chat_id), make_remind(timedelta(hours=1)))])
+        await group5_bot.actions.unsubscribe_action(chat_id, GROUP_5, context)
+        due = SqlService.get_due_reminders(now, now + config.REMINDER_HORIZON)
+        assert_that([chat for chat, _ in due]).does_not_contain(str(chat_id))
+
+    @freeze_time(NOW)
+    @pytest.mark.asyncio
+    async def test_queued_save_does_not_outlive_unsubscribe(
+        self, chat_id: int, group5_bot: OutageBot, context: MockContext
+    ) -> None:
+        group5_bot.actions.run_notification_job(
+            chat_id, make_remind(timedelta(hours=1))
+        )
+        await group5_bot.actions.unsubscribe_action(chat_id, GROUP_5, context)
+        flush()
+        with config.get_session_maker()() as session:
+            rows = session.execute(
+                select(ScheduledReminder).where(
+                    ScheduledReminder.chat_id == str(chat_id)
+                )
+            ).all()
+        assert_that(rows).is_empty()
+
+    @freeze_time(NOW)
+    def test_orphaned_reminder_is_not_due(
+        self, chat_id: int, group5_bot: OutageBot
+    ) -> None:
+        now = datetime.now(config.tz)
+        SqlService.save_reminders(
+            [
+                (str(chat_id), make_remind(timedelta(hours=1))),
+                ("404", make_remind(timedelta(hours=1))),
+            ]
+        )
+        due = SqlService.get_due_reminders(now, now + config.REMINDER_HORIZON)
+        assert_that([chat for chat, _ in due]).contains(str(chat_id)).does_not_contain(
+            "404"
+        )
@@ -0,0 +1,100 @@
+import threading
+from typing import Any
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from sqlalchemy import event
+
+import config
+from src.sql.schedule_cache import ScheduleCache
+from src.sql.sql_service import GroupRepo, ScheduleRepo
+
+WHITE_WEEK = [[config.WHITE_ZONE] * 12 + [config.BLACK_ZONE] * 12] * 7
+GREY_WEEK = [[config.GREY_ZONE] * 12 + [config.BLACK_ZONE] * 12] * 7
+
+
+def write_schedule(group_name: str, table: list[list[str]]) -> None:
+    with config.get_session_maker()() as session:
+        group = GroupRepo(session).get_group(group_name)
+        if group is None:
+            group = GroupRepo(session).add(group_name, custom=True)
+        ScheduleRepo(session).replace_group_schedule(group, table)
+
+
+@pytest.mark.usefixtures("empty_db")
+class TestScheduleCache:
+
+    def test_hit_and_miss(self) -> None:
+        write_schedule("cached", WHITE_WEEK)
+        cache = ScheduleCache(config.tz, check_interval=0)
+        finder = cache.get("cached")
+        with soft_assertions():
+            assert_that(cache.get("cached")).is_same_as(finder)
+            assert_that(cache.stats()).contains_entry({"hits": 1}, {"misses": 1})
+
+    def test_reload_on_new_revision(self) -> None:
+        write_schedule("cached", WHITE_WEEK)
+        cache = ScheduleCache(config.tz, check_interval=0)
+        assert_that(cache.get("cached").get_hour(0, 0)[1]).is_equal_to(
+            config.WHITE_ZONE
+        )
+        write_schedule("cached", GREY_WEEK)
+        finder = cache.get("cached")
+        with soft_assertions():
+            assert_that(finder.get_hour(0, 0)[1]).is_equal_to(config.GREY_ZONE)
+            assert_that(cache.stats()).contains_entry({"reloads": 1})
+
+    def test_revision_checked_after_interval(self) -> None:
+        write_schedule("cached", WHITE_WEEK)
+        cache = ScheduleCache(config.tz, check_interval=3600)
+        finder = cache.get("cached")
+        write_schedule("cached", GREY_WEEK)
+        assert_that(cache.get("cached")).is_same_as(finder)
+
+    def test_checked_revision(self) -> None:
+        write_schedule("cached", WHITE_WEEK)
+        trusted = ScheduleCache(config.tz, check_interval=3600)
+        due = ScheduleCache(config.tz, check_interval=0)
+        cold = trusted.checked_revision("cached")
+        finder = trusted.get("cached")
+        due.get("cached")
+        with soft_assertions():
+            assert_that(cold).is_none()
+            assert_that(trusted.checked_revision("cached")).is_equal_to(finder.revision)
+            assert_that(due.checked_revision("cached")).is_none()
+
+    def test_lru_eviction(self) -> None:
+        write_schedule("first", WHITE_WEEK)
+        write_schedule("second", GREY_WEEK)
+        cache = ScheduleCache(config.tz, max_size=1, check_interval=0)
+        cache.get("first")
+        cache.get("second")
+        with soft_assertions():
+            assert_that(cache.finders).does_not_contain_key("first")
+            assert_that(cache.stats()).contains_entry({"size": 1}, {"evictions": 1})
+
+    @pytest.mark.asyncio
+    async def test_async_get_runs_off_the_loop(self) -> None:
+        write_schedule("cached", WHITE_WEEK)
+        cache = ScheduleCache(config.tz, check_interval=0)
+        threads = []
+
+        def record(*_: Any) -> None:
+            threads.append(threading.current_thread())
+
+        engine = config.get_engine()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            finder = await cache.get_async("cached")
+            write_schedule("cached", GREY_WEEK)
+            threads.clear()
+            reloaded = await cache.get_async("cached")
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        with soft_assertions():
+            assert_that(reloaded).is_not_same_as(finder)
+            assert_that(reloaded.get_hour(0, 0)[1]).is_equal_to(config.GREY_ZONE)
+            assert_that(cache.stats()).contains_entry({"misses": 1}, {"reloads": 1})
+            assert_that(threads).is_not_empty().does_not_contain(
+                threading.main_thread()
+            )
@@ -0,0 +1,44 @@
+import pytest
+from assertpy import assert_that, soft_assertions
+
+import config
+from src.sql.sql_service import GroupRepo, HourRepo, ScheduleRepo
+
+WEEK = [
+    [config.ZONES[(day + hour) % len(config.ZONES)] for hour in range(24)]
+    for day in range(7)
+]
+
+
+class TestScheduleRepo:
+
+    @pytest.mark.usefixtures("empty_db")
+    def test_replace_group_schedule(self) -> None:
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).add("bulk_group", custom=True)
+            ScheduleRepo(session).replace_group_schedule(
+                group, [[config.WHITE_ZONE] * 24] * 7
+            )
+            inserted = ScheduleRepo(session).replace_group_schedule(group, WEEK)
+            hours = HourRepo(session).get_hours_for_group(group)
+        with soft_assertions():
+            assert_that(inserted).is_equal_to(7 * 24)
+            assert_that(hours).is_length(7 * 24)
+            assert_that([hour.zone.zone_name for hour in hours]).is_equal_to(
+                [zone for day in WEEK for zone in day]
+            )
+            assert_that(hours[25].day.day_name).is_equal_to("Tuesday")
+            assert_that(hours[25].hour).is_equal_to(1)
+
+    @pytest.mark.usefixtures("empty_db")
+    def test_unknown_zone(self) -> None:
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).add("bulk_group", custom=True)
+            ScheduleRepo(session).replace_group_schedule(group, WEEK)
+            with pytest.raises(ValueError):
+                ScheduleRepo(session).replace_group_schedule(
+                    group, [[config.UNDEFINED_ZONE] * 24] * 7
+                )
+            session.rollback()
+            hours = HourRepo(session).get_hours_for_group(group)
+        assert_that(hours).is_length(7 * 24)
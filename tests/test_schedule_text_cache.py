@@ -0,0 +1,46 @@
+import pytest
+from assertpy import assert_that, soft_assertions
+
+from src.tg.schedule_text_cache import ScheduleTextCache
+from tests.conftest import GROUP_5
+
+MONDAY = "Monday"
+
+
+class TestScheduleTextCache:
+
+    @pytest.mark.asyncio
+    async def test_rendered_once_per_revision(self) -> None:
+        cache = ScheduleTextCache()
+        first = await cache.get(MONDAY, GROUP_5, revision=1)
+        second = await cache.get(MONDAY, GROUP_5, revision=1)
+        reloaded = await cache.get(MONDAY, GROUP_5, revision=2)
+        with soft_assertions():
+            assert_that(second).is_same_as(first)
+            assert_that(reloaded).is_not_same_as(first)
+            assert_that(reloaded.lines).is_equal_to(first.lines)
+            assert_that(cache.stats()).contains_entry(
+                {"hits": 1}, {"misses": 2}, {"size": 1}
+            )
+            assert_that(cache.stats()["hit_rate"]).is_close_to(1 / 3, 1e-9)
+
+    @pytest.mark.asyncio
+    async def test_overlay_marks_next_zone(self) -> None:
+        rendered = await ScheduleTextCache().get(MONDAY, GROUP_5, revision=1)
+        marked = rendered.overlay(20)
+        late = rendered.overlay(23)
+        with soft_assertions():
+            assert_that(rendered.lines[0]).is_equal_to("🌚 0:00 black")
+            assert_that([line for line in marked if line.startswith("→")]).is_equal_to(
+                ["→💡 21:00 white"]
+            )
+            assert_that(late).is_equal_to(rendered.lines)
+            assert_that(rendered.lines).does_not_contain("→💡 21:00 white")
+
+    @pytest.mark.asyncio
+    async def test_invalidate_group(self) -> None:
+        cache = ScheduleTextCache()
+        await cache.get(MONDAY, GROUP_5, revision=1)
+        await cache.get("Tuesday", GROUP_5, revision=1)
+        cache.invalidate(GROUP_5)
+        assert_that(cache.days).is_empty()
@@ -0,0 +1,159 @@
+from datetime import datetime
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from freezegun import freeze_time
+
+import config
+from src.sql.async_sql_service import flush
+from src.sql.sql_service import (
+    GroupRepo,
+    HourRepo,
+    ScheduleRepo,
+    SqlService,
+    to_ranges,
+)
+from src.sql.sql_time_finder import touches_changes
+from src.tg.bot_actions import BotActions
+from src.tg.outage_bot import OutageBot
+from tests.mock_utils import MockApplication, MockContext
+
+GROUP = "update_group"
+# Monday
+NOW = "08-19-2024 20:30:00 +0300"
+# white before noon, black after, changes at 00:00 and 12:00
+WEEK = [[config.WHITE_ZONE] * 12 + [config.BLACK_ZONE] * 12 for _ in range(7)]
+
+
+def changed_week(cells: dict[tuple[int, int], str]) -> list[list[str]]:
+    week = [list(day) for day in WEEK]
+    for (day, hour), zone in cells.items():
+        week[day][hour] = zone
+    return week
+
+
+@pytest.fixture
+def group_db(empty_db: None) -> None:
+    with config.get_session_maker()() as session:
+        group = GroupRepo(session).add(GROUP, custom=True)
+        ScheduleRepo(session).replace_group_schedule(group, WEEK)
+    BotActions.schedule_cache.invalidate(GROUP)
+    BotActions.schedule_text.invalidate(GROUP)
+
+
+class TestUpdateGroupSchedule:
+
+    @pytest.mark.usefixtures("group_db")
+    def test_changed_table_becomes_new_version(self) -> None:
+        new_week = changed_week({(0, 23): config.GREY_ZONE, (1, 0): config.GREY_ZONE})
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).get_group(GROUP)
+            before = {
+                hour.hour_id for hour in HourRepo(session).get_hours_for_group(group)
+            }
+            revision = GroupRepo(session).get_revision(GROUP)
+        unchanged = SqlService.update_group_schedule(GROUP, WEEK)
+        changed = SqlService.update_group_schedule(GROUP, new_week)
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).get_group(GROUP)
+            hours = HourRepo(session).get_hours_for_group(group)
+            new_revision = GroupRepo(session).get_revision(GROUP)
+        with soft_assertions():
+            assert_that(unchanged).is_empty()
+            assert_that(changed).is_equal_to([(23, 25)])
+            assert_that(new_revision).is_equal_to(revision + 1)
+            # the previous version was written over by a full new week
+            assert_that({hour.hour_id for hour in hours} & before).is_empty()
+            assert_that([hour.zone.zone_name for hour in hours]).is_equal_to(
+                [zone for day in new_week for zone in day]
+            )
+            assert_that(
+                [row.zone_name for row in SqlService.get_schedule_for("Tuesday", GROUP)]
+            ).is_equal_to(
+                [
+                    row.zone_name
+                    for row in SqlService.get_schedule_from_hours("Tuesday", GROUP)
+                ]
+            )
+
+    @pytest.mark.usefixtures("group_db")
+    def test_unknown_group(self) -> None:
+        with pytest.raises(ValueError):
+            SqlService.update_group_schedule("no_such_group", WEEK)
+
+    def test_to_ranges(self) -> None:
+        assert_that(to_ranges([1, 2, 3, 7, 9, 10])).is_equal_to(
+            [(1, 4), (7, 8), (9, 11)]
+        )
+
+    @freeze_time(NOW)
+    def test_touches_changes(self) -> None:
+        now = datetime.now(config.tz)
+        tuesday_noon = now.replace(day=20, hour=12, minute=0)
+        with soft_assertions():
+            # Tuesday 05:00 lies before the change
+            assert_that(touches_changes([(29, 30)], now, tuesday_noon)).is_true()
+            # the changed hour itself, its zone is in the reminder text
+            assert_that(touches_changes([(36, 37)], now, tuesday_noon)).is_true()
+            assert_that(touches_changes([(37, 40)], now, tuesday_noon)).is_false()
+            # Monday morning is in the past until next week
+            assert_that(touches_changes([(0, 12)], now, tuesday_noon)).is_false()
+
+
+class TestRescheduleGroup:
+
+    @freeze_time(NOW)
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("group_db")
+    async def test_only_affected_users_are_rescheduled(
+        self, context: MockContext
+    ) -> None:
+        SqlService.subscribe_user(1, GROUP)
+        SqlService.subscribe_user(2, GROUP)
+        SqlService.update_user(1, suppress_night=False, remind_before=15)
+        # Tuesday 00:00 is reminded at 23:45, inside the silent period
+        SqlService.update_user(2, suppress_night=True, remind_before=15)
+        bot = OutageBot(MockApplication(context))
+        bot.actions.create_jobs()
+        before = dict(
+            (chat, change_time)
+            for chat, _, _, change_time in SqlService.get_group_reminders(GROUP)
+        )
+
+        changed = await bot.actions.update_group_schedule(
+            GROUP, changed_week({(1, 9): config.GREY_ZONE})
+        )
+        flush()
+        after = dict(
+            (chat, change_time)
+            for chat, _, _, change_time in SqlService.get_group_reminders(GROUP)
+        )
+        with soft_assertions():
+            assert_that(changed).is_equal_to([(33, 34)])
+            assert_that(before["1"].hour).is_equal_to(0)
+            assert_that(before["2"].hour).is_equal_to(12)
+            assert_that(after["1"]).is_equal_to(before["1"])
+            assert_that(after["2"].hour).is_equal_to(9)
+            assert_that(after["2"].day).is_equal_to(20)
+
+    @freeze_time(NOW)
+    @pytest.mark.asyncio
+    @pytest.mark.usefixtures("group_db")
+    async def test_live_job_is_replaced(self, context: MockContext) -> None:
+        SqlService.subscribe_user(1, GROUP)
+        SqlService.update_user(1, suppress_night=False, remind_before=15)
+        bot = OutageBot(MockApplication(context))
+        bot.actions.create_jobs()
+        # a change at 21:00 is reminded at 20:45, within the horizon
+        await bot.actions.update_group_schedule(
+            GROUP, changed_week({(0, 21): config.GREY_ZONE})
+        )
+        flush()
+        job = bot.actions.reminder_jobs.get(1, GROUP)
+        with soft_assertions():
+            assert_that(job).is_not_none()
+            assert_that(job.data.change_time.hour).is_equal_to(21)
+            assert_that(job.data.new_zone).is_equal_to(config.GREY_ZONE)
+            assert_that(
+                [queued for queued in context.job_queue.jobs if not queued.removed]
+            ).is_length(1)
@@ -0,0 +1,123 @@
+import pytest
+from assertpy import assert_that, soft_assertions
+from sqlalchemy import select, update
+
+import config
+from src.sql.models.group import Group
+from src.sql.models.hour import Hour
+from src.sql.models.zone_segment import ZoneSegment
+from src.sql.schedule_cache import ScheduleCache
+from src.sql.sql_service import (
+    GroupRepo,
+    HourRepo,
+    ScheduleRepo,
+    SqlService,
+    ZoneSegmentRepo,
+)
+from src.sql.sql_time_finder import SqlTimeFinder
+
+GROUP = "versioned"
+WHITE_WEEK = [[config.WHITE_ZONE] * 12 + [config.BLACK_ZONE] * 12] * 7
+GREY_WEEK = [[config.GREY_ZONE] * 12 + [config.BLACK_ZONE] * 12] * 7
+
+
+def monday_zones() -> list[str]:
+    return [row.zone_name for row in SqlService.get_schedule_for("Monday", GROUP)]
+
+
+def finder_zone() -> str:
+    finder = SqlTimeFinder(GROUP, config.tz)
+    finder.read_schedule()
+    return finder.get_hour(0, 0)[1]
+
+
+@pytest.fixture
+def white_group(empty_db: None) -> int:
+    """
+    :return: active version of the group
+    """
+    with config.get_session_maker()() as session:
+        group = GroupRepo(session).add(GROUP, custom=True)
+        version, _ = ScheduleRepo(session).write_version(group, WHITE_WEEK)
+    return version
+
+
+class TestScheduleVersions:
+
+    def test_written_version_is_hidden_until_activated(self, white_group: int) -> None:
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).get_group(GROUP)
+            HourRepo(session).add_many(group, GREY_WEEK, version=white_group + 1)
+            ZoneSegmentRepo(session).rebuild_for_group(group, white_group + 1)
+            session.commit()
+            before = (monday_zones(), finder_zone())
+            session.execute(
+                update(Group)
+                .where(Group.group_id == group.group_id)
+                .values(schedule_revision=white_group + 1)
+            )
+            session.commit()
+        with soft_assertions():
+            assert_that(before).is_equal_to(
+                ([config.WHITE_ZONE, config.BLACK_ZONE], config.WHITE_ZONE)
+            )
+            assert_that(monday_zones()).is_equal_to(
+                [config.GREY_ZONE, config.BLACK_ZONE]
+            )
+            assert_that(finder_zone()).is_equal_to(config.GREY_ZONE)
+
+    def test_readers_do_not_wait_for_writer(self, white_group: int) -> None:
+        with config.get_session_maker()() as writer:
+            group = GroupRepo(writer).get_group(GROUP)
+            # everything write_version does before its commit, the write
+            # lock is held from here on
+            HourRepo(writer).add_many(
+                group, GREY_WEEK, commit=False, version=white_group + 1
+            )
+            ZoneSegmentRepo(writer).rebuild_for_group(group, white_group + 1)
+            writer.execute(
+                update(Group)
+                .where(Group.group_id == group.group_id)
+                .values(schedule_revision=white_group + 1)
+            )
+            during = (monday_zones(), finder_zone())
+            writer.commit()
+        with soft_assertions():
+            assert_that(during).is_equal_to(
+                ([config.WHITE_ZONE, config.BLACK_ZONE], config.WHITE_ZONE)
+            )
+            assert_that(finder_zone()).is_equal_to(config.GREY_ZONE)
+
+    def test_old_versions_are_collected(self, white_group: int) -> None:
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).get_group(GROUP)
+            ScheduleRepo(session).write_version(group, GREY_WEEK)
+            version, _ = ScheduleRepo(session).write_version(group, WHITE_WEEK)
+            versions = {
+                model.__tablename__: set(
+                    session.execute(
+                        select(model.version).where(model.group_id == group.group_id)
+                    ).scalars()
+                )
+                for model in (Hour, ZoneSegment)
+            }
+        with soft_assertions():
+            assert_that(version).is_equal_to(white_group + 2)
+            assert_that(versions).is_equal_to(
+                {"hours": {version}, "zone_segments": {version}}
+            )
+            assert_that(monday_zones()).is_equal_to(
+                [config.WHITE_ZONE, config.BLACK_ZONE]
+            )
+
+    def test_cache_reload_swaps_finder(self, white_group: int) -> None:
+        cache = ScheduleCache(config.tz, check_interval=3600)
+        old = cache.get(GROUP)
+        SqlService.update_group_schedule(GROUP, GREY_WEEK)
+        new = cache.reload(GROUP)
+        with soft_assertions():
+            assert_that(old.revision).is_equal_to(white_group)
+            assert_that(new.revision).is_equal_to(white_group + 1)
+            assert_that(cache.get(GROUP)).is_same_as(new)
+            assert_that(old.get_hour(0, 0)[1]).is_equal_to(config.WHITE_ZONE)
+            assert_that(new.get_hour(0, 0)[1]).is_equal_to(config.GREY_ZONE)
@@ -0,0 +1,71 @@
+import pathlib
+from typing import Iterator
+
+import pytest
+from assertpy import assert_that, soft_assertions
+from sqlalchemy import inspect
+
+import config
+from migration import seed
+from migration.seed import RESOURCES, delete_groups, read_group_tables, seed_groups
+from src.sql.models import Base
+from src.sql.models.scheduled_reminder import ScheduledReminder
+from src.sql.models.zone_segment import ZoneSegment
+from src.sql.sql_service import SqlService
+
+WEEK = [[config.WHITE_ZONE] * 12 + [config.BLACK_ZONE] * 12] * 7
+
+
+@pytest.fixture
+def head_schema(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[None]:
+    """
+    Empty database with the current models, nothing seeded
+    """
+    monkeypatch.setenv("BLACKOUT_DB", str(tmp_path.joinpath("blackout-seed.db")))
+    config.dispose_engines()
+    Base.metadata.create_all(config.get_engine())
+    monkeypatch.setattr(
+        seed,
+        "read_group_tables",
+        lambda files, workers: iter([(pathlib.Path("group1.jpg"), WEEK)]),
+    )
+    yield
+    config.dispose_engines()
+
+
+class TestSeed:
+
+    def test_parallel_tables_keep_file_order(self) -> None:
+        files = [
+            pathlib.Path(RESOURCES, "group3.jpg"),
+            pathlib.Path(RESOURCES, "group1.jpg"),
+        ]
+        parallel = list(read_group_tables(files, workers=2))
+        sequential = list(read_group_tables(files, workers=1))
+        assert_that([file for file, _ in parallel]).is_equal_to(files)
+        assert_that(parallel).is_equal_to(sequential)
+
+    def test_seed_head_schema(self, head_schema: None) -> None:
+        seed_groups(workers=1)
+        monday = [
+            row.zone_name for row in SqlService.get_schedule_for("Monday", "group1")
+        ]
+        with config.get_session_maker()() as session:
+            segments = session.query(ZoneSegment).count()
+        with soft_assertions():
+            assert_that(monday).is_equal_to([config.WHITE_ZONE, config.BLACK_ZONE])
+            assert_that(segments).is_equal_to(14)
+
+    def test_delete_skips_missing_tables(self, head_schema: None) -> None:
+        seed_groups(workers=1)
+        engine = config.get_engine()
+        for model in (ZoneSegment, ScheduledReminder):
+            model.__table__.drop(engine)
+        delete_groups()
+        with soft_assertions():
+            assert_that(inspect(engine).get_table_names()).does_not_contain(
+                "zone_segments"
+            )
+            assert_that(SqlService.get_all_groups()).is_empty()
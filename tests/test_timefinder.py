@@ -1,10 +1,12 @@
+from datetime import timedelta
+
 import pytest
-from assertpy import assert_that
+from assertpy import assert_that, soft_assertions
 from freezegun import freeze_time
 
 import config
 from src.sql.remind_obj import RemindObj
-from src.sql.sql_time_finder import SqlTimeFinder
+from src.sql.sql_time_finder import SqlTimeFinder, in_quiet_window, quiet_window_end
 from tests.conftest import to_datetime, GROUP_5
 
 
@@ -84,3 +86,155 @@ class TestTimeFinder:
         tf.read_schedule()
         remind = tf.find_next_remind_time(15)
         assert_that(remind.__dict__).is_equal_to(expected_remind.__dict__)
+
+    def test_next_change_matches_linear_search(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.read_schedule()
+        week = [tf.get_hour(day, hour)[1] for day in range(7) for hour in range(24)]
+        for ind, zone in enumerate(week):
+            hours = next(
+                step
+                for step in range(1, len(week) + 1)
+                if week[(ind + step) % len(week)] != zone
+            )
+            hours_to_change, index = tf.next_change(ind)
+            assert_that(hours_to_change).is_equal_to(hours)
+            assert_that(tf.change_zones(index)).is_equal_to(
+                (zone, week[(ind + hours) % len(week)])
+            )
+
+    def test_change_wraps_around_week(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.load_week([config.WHITE_ZONE] + [config.BLACK_ZONE] * 167)
+        assert_that(tf.next_change(167)).is_equal_to((1, 0))
+        assert_that(tf.next_change(1)).is_equal_to((167, 0))
+        assert_that(tf.change_zones(0)).is_equal_to(
+            (config.BLACK_ZONE, config.WHITE_ZONE)
+        )
+
+    @freeze_time("08-19-2024 20:44:59 +0300")
+    def test_no_change_in_week(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.load_week([config.WHITE_ZONE] * 168)
+        with pytest.raises(ValueError):
+            tf.find_next_remind_time(15)
+
+
+QUIET = (config.SILENT_PERIOD_START, config.SILENT_PERIOD_STOP)
+
+
+class TestNextAllowedReminder:
+
+    @pytest.fixture()
+    def monday_morning(self) -> SqlTimeFinder:
+        # black Monday 00:00-10:00, white the rest of the week
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.load_week([config.BLACK_ZONE] * 10 + [config.WHITE_ZONE] * 158)
+        return tf
+
+    @pytest.mark.parametrize(
+        "time,quiet,end",
+        [
+            ("08-19-2024 22:59:59 +0300", False, "08-20-2024 08:00:00 +0300"),
+            ("08-19-2024 23:00:00 +0300", True, "08-20-2024 08:00:00 +0300"),
+            ("08-20-2024 00:30:00 +0300", True, "08-20-2024 08:00:00 +0300"),
+            ("08-20-2024 07:59:59 +0300", True, "08-20-2024 08:00:00 +0300"),
+            ("08-20-2024 08:00:00 +0300", False, "08-21-2024 08:00:00 +0300"),
+        ],
+    )
+    def test_quiet_window_across_midnight(
+        self, time: str, quiet: bool, end: str
+    ) -> None:
+        moment = to_datetime(time)
+        assert_that(in_quiet_window(moment, QUIET)).is_equal_to(quiet)
+        assert_that(quiet_window_end(moment, QUIET)).is_equal_to(to_datetime(end))
+
+    def test_skips_reminders_after_midnight(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.read_schedule()
+        after = to_datetime("08-19-2024 22:30:00 +0300")
+        quiet = tf.next_allowed_reminder(after, 15, QUIET)
+        plain = tf.next_allowed_reminder(after, 15)
+        with soft_assertions():
+            assert_that(quiet.remind_time).is_equal_to(
+                to_datetime("08-20-2024 08:45:00 +0300")
+            )
+            assert_that(quiet.notify_now).is_false()
+            assert_that(plain.remind_time).is_equal_to(
+                to_datetime("08-19-2024 23:45:00 +0300")
+            )
+
+    def test_wraps_around_week(self, monday_morning: SqlTimeFinder) -> None:
+        after = to_datetime("08-25-2024 22:30:00 +0300")
+        quiet = monday_morning.next_allowed_reminder(after, 15, QUIET)
+        plain = monday_morning.next_allowed_reminder(after, 15)
+        with soft_assertions():
+            assert_that(quiet.__dict__).is_equal_to(
+                {
+                    "group": GROUP_5,
+                    "old_zone": config.BLACK_ZONE,
+                    "new_zone": config.WHITE_ZONE,
+                    "remind_time": to_datetime("08-26-2024 09:45:00 +0300"),
+                    "change_time": to_datetime("08-26-2024 10:00:00 +0300"),
+                    "notify_now": False,
+                }
+            )
+            assert_that(plain.change_time).is_equal_to(
+                to_datetime("08-26-2024 00:00:00 +0300")
+            )
+
+    def test_due_reminder_is_sent_now(self, monday_morning: SqlTimeFinder) -> None:
+        after = to_datetime("08-25-2024 23:50:00 +0300")
+        remind = monday_morning.next_allowed_reminder(after, 15)
+        quiet = monday_morning.next_allowed_reminder(after, 15, QUIET)
+        with soft_assertions():
+            assert_that(remind.notify_now).is_true()
+            assert_that(remind.change_time).is_equal_to(
+                to_datetime("08-26-2024 00:00:00 +0300")
+            )
+            assert_that(quiet.change_time).is_equal_to(
+                to_datetime("08-26-2024 10:00:00 +0300")
+            )
+
+    def test_options_are_precompiled(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.read_schedule()
+        minutes, indexes = tf.remind_timeline(15)
+        with soft_assertions():
+            assert_that(tf.reminders).contains_only(*config.NOTIFY_BEFORE_OPTIONS)
+            assert_that(list(minutes)).is_sorted()
+            assert_that(sorted(indexes)).is_equal_to(list(range(len(tf.changes))))
+
+    @pytest.mark.parametrize("notify_before", config.NOTIFY_BEFORE_OPTIONS + [7])
+    def test_bisect_matches_next_change(self, notify_before: int) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.read_schedule()
+        monday = to_datetime("08-19-2024 00:50:00 +0300")
+        for hour_ind in range(7 * 24):
+            after = monday + timedelta(hours=hour_ind)
+            hours, index = tf.next_change(hour_ind)
+            remind = tf.next_allowed_reminder(after, notify_before)
+            change_time = after.replace(minute=0) + timedelta(hours=hours)
+            assert_that(remind.change_time).is_equal_to(change_time)
+            assert_that((remind.old_zone, remind.new_zone)).is_equal_to(
+                tf.change_zones(index)
+            )
+            assert_that(remind.notify_now).is_equal_to(
+                change_time - timedelta(minutes=notify_before) <= after
+            )
+
+    def test_all_changes_in_quiet_window(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.load_week([config.WHITE_ZONE] * 2 + [config.BLACK_ZONE] * 166)
+        remind = tf.next_allowed_reminder(
+            to_datetime("08-19-2024 12:00:00 +0300"), 15, QUIET
+        )
+        assert_that(remind.change_time).is_equal_to(
+            to_datetime("08-26-2024 00:00:00 +0300")
+        )
+
+    def test_no_change_in_week(self) -> None:
+        tf = SqlTimeFinder(GROUP_5, config.tz)
+        tf.load_week([config.WHITE_ZONE] * 168)
+        with pytest.raises(ValueError, match="No change in zone found"):
+            tf.next_allowed_reminder(to_datetime("08-19-2024 12:00:00 +0300"), 15)
@@ -0,0 +1,190 @@
+import asyncio
+from typing import Any, AsyncIterator
+
+import httpx
+import pytest
+import pytest_asyncio
+from assertpy import assert_that, soft_assertions
+from telegram import Update
+from telegram.ext import Application
+
+import config
+from src.rest.hello import hello, make_server
+from src.rest.server import MAX_HEADERS, HttpServer
+from src.tg import outage_bot
+from src.tg.webhook import SECRET_HEADER, WEBHOOK_PATH, webhook_handler
+
+SECRET = "webhook-secret"
+# update Telegram posts when a user sends /start
+START_UPDATE: dict[str, Any] = {
+    "update_id": 10001,
+    "message": {
+        "message_id": 42,
+        "date": 1724089499,
+        "chat": {"id": 12345, "type": "private", "first_name": "Test"},
+        "from": {"id": 12345, "is_bot": False, "first_name": "Test"},
+        "text": "/start",
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+    },
+}
+
+
+@pytest.fixture
+def app() -> Application:
+    return Application.builder().token("123:TEST").updater(None).build()
+
+
+@pytest_asyncio.fixture
+async def client(app: Application) -> AsyncIterator[httpx.AsyncClient]:
+    server = make_server()
+    server.route("POST", WEBHOOK_PATH, webhook_handler(app, SECRET))
+    port = await server.start("127.0.0.1", 0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        yield client
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def raw_port() -> AsyncIterator[int]:
+    """
+    Port of a health check server with short timeouts, for raw clients
+    """
+    server = HttpServer(idle_timeout=0.2, read_timeout=0.2)
+    server.route("GET", "/", hello)
+    yield await server.start("127.0.0.1", 0)
+    await server.stop()
+
+
+async def exchange(port: int, data: bytes) -> str:
+    """
+    Send data on a new connection and read until the server closes it
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    try:
+        return (await asyncio.wait_for(reader.read(), 5)).decode("latin-1")
+    finally:
+        writer.close()
+
+
+class TestWebhook:
+
+    @pytest.mark.asyncio
+    async def test_update_is_queued(
+        self, app: Application, client: httpx.AsyncClient
+    ) -> None:
+        response = await client.post(
+            WEBHOOK_PATH, json=START_UPDATE, headers={SECRET_HEADER: SECRET}
+        )
+        update = app.update_queue.get_nowait()
+        with soft_assertions():
+            assert_that(response.status_code).is_equal_to(200)
+            assert_that(update).is_instance_of(Update)
+            assert_that(update.update_id).is_equal_to(10001)
+            assert_that(update.message.text).is_equal_to("/start")
+            assert_that(update.effective_user.id).is_equal_to(12345)
+
+    @pytest.mark.asyncio
+    async def test_wrong_secret_is_rejected(
+        self, app: Application, client: httpx.AsyncClient
+    ) -> None:
+        missing = await client.post(WEBHOOK_PATH, json=START_UPDATE)
+        wrong = await client.post(
+            WEBHOOK_PATH, json=START_UPDATE, headers={SECRET_HEADER: "guess"}
+        )
+        with soft_assertions():
+            assert_that(missing.status_code).is_equal_to(403)
+            assert_that(wrong.status_code).is_equal_to(403)
+            assert_that(app.update_queue.empty()).is_true()
+
+    def test_secret_is_required(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(config, "WEBHOOK_URL", "https://bot.example.com")
+        monkeypatch.setattr(config, "HTTP_PORT", 8080)
+        monkeypatch.setattr(config, "WEBHOOK_SECRET", None)
+        with pytest.raises(ValueError, match="BLACKOUT_WEBHOOK_SECRET"):
+            outage_bot.main("123:TEST")
+
+    @pytest.mark.asyncio
+    async def test_malformed_update(
+        self, app: Application, client: httpx.AsyncClient
+    ) -> None:
+        response = await client.post(
+            WEBHOOK_PATH, content=b"{not json", headers={SECRET_HEADER: SECRET}
+        )
+        with soft_assertions():
+            assert_that(response.status_code).is_equal_to(400)
+            assert_that(app.update_queue.empty()).is_true()
+
+    @pytest.mark.asyncio
+    async def test_routes_share_one_connection(self, client: httpx.AsyncClient) -> None:
+        hello = await client.get("/")
+        missing = await client.get("/nowhere")
+        wrong_method = await client.get(WEBHOOK_PATH)
+        with soft_assertions():
+            assert_that(hello.status_code).is_equal_to(200)
+            assert_that(hello.text).is_equal_to("Hello!")
+            assert_that(missing.status_code).is_equal_to(404)
+            assert_that(wrong_method.status_code).is_equal_to(405)
+            assert_that(hello.headers["connection"]).is_equal_to("keep-alive")
+
+
+class TestHttpLimits:
+
+    @pytest.mark.asyncio
+    async def test_too_many_headers(self, raw_port: int) -> None:
+        headers = b"".join(b"X-%d: 1\r\n" % i for i in range(MAX_HEADERS + 1))
+        response = await exchange(raw_port, b"GET / HTTP/1.1\r\n" + headers + b"\r\n")
+        assert_that(response).starts_with("HTTP/1.1 431 ")
+
+    @pytest.mark.asyncio
+    async def test_header_line_over_limit(self, raw_port: int) -> None:
+        response = await exchange(
+            raw_port, b"GET / HTTP/1.1\r\nX-Big: " + b"a" * 70_000 + b"\r\n\r\n"
+        )
+        assert_that(response).starts_with("HTTP/1.1 431 ")
+
+    @pytest.mark.asyncio
+    async def test_body_over_limit(self, raw_port: int) -> None:
+        response = await exchange(
+            raw_port, b"POST / HTTP/1.1\r\nContent-Length: 1000000000\r\n\r\n"
+        )
+        assert_that(response).starts_with("HTTP/1.1 413 ")
+
+    @pytest.mark.asyncio
+    async def test_slow_request_times_out(self, raw_port: int) -> None:
+        response = await exchange(raw_port, b"GET / HTTP/1.1\r\nHost: slow")
+        assert_that(response).starts_with("HTTP/1.1 408 ")
+
+    @pytest.mark.asyncio
+    async def test_idle_connection_is_closed(self, raw_port: int) -> None:
+        response = await exchange(raw_port, b"GET / HTTP/1.1\r\n\r\n")
+        with soft_assertions():
+            assert_that(response).starts_with("HTTP/1.1 200 ")
+            assert_that(response).ends_with("Hello!")
+
+    @pytest.mark.asyncio
+    async def test_chunked_body_is_refused(self, raw_port: int) -> None:
+        smuggled = b"GET / HTTP/1.1\r\n\r\n"
+        response = await exchange(
+            raw_port,
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+            + b"%x\r\n" % len(smuggled)
+            + smuggled
+            + b"\r\n0\r\n\r\n",
+        )
+        with soft_assertions():
+            assert_that(response).starts_with("HTTP/1.1 501 ")
+            assert_that(response).contains("Connection: close")
+            assert_that(response.count("HTTP/1.1")).is_equal_to(1)
+
+    @pytest.mark.asyncio
+    async def test_repeated_content_length(self, raw_port: int) -> None:
+        response = await exchange(
+            raw_port,
+            b"POST / HTTP/1.1\r\nContent-Length: 0\r\nContent-Length: 19\r\n\r\n"
+            b"GET / HTTP/1.1\r\n\r\n",
+        )
+        with soft_assertions():
+            assert_that(response).starts_with("HTTP/1.1 400 ")
+            assert_that(response.count("HTTP/1.1")).is_equal_to(1)
@@ -0,0 +1,52 @@
+import pytest
+from assertpy import assert_that, soft_assertions
+
+import config
+from src.sql.models.zone_segment import build_segments
+from src.sql.sql_service import GroupRepo, ScheduleRepo, SqlService
+
+
+def as_tuples(schedule: list) -> list[tuple[str, int, int]]:
+    return [(row.zone_name, row.hour, row.outage_hours) for row in schedule]
+
+
+class TestZoneSegments:
+
+    def test_build_segments(self) -> None:
+        hours = [(1, 0, 1), (1, 1, 1), (1, 2, 2), (2, 0, 2), (2, 1, 2)]
+        assert_that(build_segments(hours)).is_equal_to(
+            [(1, 0, 2, 1), (1, 2, 1, 2), (2, 0, 2, 2)]
+        )
+
+    def test_matches_hours_query(self) -> None:
+        with soft_assertions():
+            for group in SqlService.get_all_groups():
+                for day in config.DAYS_OF_WEEK:
+                    assert_that(
+                        as_tuples(SqlService.get_schedule_for(day, group.group_name))
+                    ).described_as(f"{group.group_name} {day}").is_equal_to(
+                        as_tuples(
+                            SqlService.get_schedule_from_hours(day, group.group_name)
+                        )
+                    )
+
+    @pytest.mark.usefixtures("empty_db")
+    def test_rebuilt_on_replace(self) -> None:
+        with config.get_session_maker()() as session:
+            group = GroupRepo(session).add("segment_group", custom=True)
+            ScheduleRepo(session).replace_group_schedule(
+                group, [[config.WHITE_ZONE] * 24] * 7
+            )
+            ScheduleRepo(session).replace_group_schedule(
+                group,
+                [[config.BLACK_ZONE] * 6 + [config.GREY_ZONE] * 18] * 7,
+            )
+        with soft_assertions():
+            assert_that(
+                as_tuples(SqlService.get_schedule_for("Sunday", "segment_group"))
+            ).is_equal_to([(config.BLACK_ZONE, 0, 6), (config.GREY_ZONE, 6, 18)])
+            assert_that(
+                as_tuples(SqlService.get_schedule_for("Sunday", "segment_group"))
+            ).is_equal_to(
+                as_tuples(SqlService.get_schedule_from_hours("Sunday", "segment_group"))
+            )